@@ -0,0 +1,108 @@
+"""
+Time to evaluate characters x lightcones x relic builds x scenarios at once
+with `DamageCalculator`, checked against a plain Python calculation of sampled
+combinations, whose time per combination is extrapolated to the full grid.
+
+Usage:
+    python benchmark/bench_damage.py [--characters 8] [--lightcones 100] [--builds 50] [--scenarios 8]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.bench_modifiers import synthetic_texts
+from benchmark.synthetic import vocabulary, random_characters, random_relics
+from src.estimator.damage import (DamageCalculator, SCENARIO_DEFAULTS, BASE_CRIT_RATE, BASE_CRIT_DMG,
+                                  UNBROKEN_MULTIPLIER)
+from src.estimator.modifiers import compile_modifiers
+
+
+def reference(calculator: DamageCalculator, vectors, always, conditional, builds, scenarios,
+              n: int, m: int, k: int, b: int) -> float:
+    # Crit-averaged damage of one combination, stat by stat
+    table = calculator.table
+    scenario = {**SCENARIO_DEFAULTS, **scenarios[b]}
+    totals = dict()
+    sources = [vectors["stats"][n], builds[k], always[m]]
+    if scenario["conditional"]:
+        sources.append(conditional[m] - always[m])
+    for source in sources:
+        for s, value in enumerate(source):
+            totals[table.stats[s]] = totals.get(table.stats[s], 0.0) + value
+    for name, value in scenarios[b].items():
+        if name in table.stat_index and name not in SCENARIO_DEFAULTS:
+            totals[name] = totals.get(name, 0.0) + value
+
+    atk = vectors["base"][n][1] * (1 + totals.get("atk%", 0) / 100) + totals.get("atk", 0)
+    element = table.stats[vectors["element"][n]] if vectors["element"][n] >= 0 else None
+    bonus = 1 + (totals.get("dmg%", 0) + totals.get(element, 0)) / 100
+    defense = (calculator.level + 20) / ((scenario["enemy_level"] + 20) * (1 - scenario["def_reduction%"] / 100)
+                                         + calculator.level + 20)
+    resistance = 1 - (scenario["enemy_res%"] - scenario["res_penetration%"]) / 100
+    toughness = 1.0 if scenario["broken"] else UNBROKEN_MULTIPLIER
+    damage = atk * bonus * defense * resistance * (1 + scenario["vulnerability%"] / 100) * toughness
+    crit_rate = min(max((BASE_CRIT_RATE + totals.get("crit_rate%", 0)) / 100, 0), 1)
+    return damage * (1 + crit_rate * (BASE_CRIT_DMG + totals.get("crit_dmg%", 0)) / 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--characters", type=int, default=8)
+    parser.add_argument("--lightcones", type=int, default=100)
+    parser.add_argument("--builds", type=int, default=50)
+    parser.add_argument("--scenarios", type=int, default=8)
+    parser.add_argument("--samples", type=int, default=200, help="Combinations checked one by one")
+    args = parser.parse_args()
+
+    vocab = vocabulary()
+    relic_info, lightcone_info = synthetic_texts(36, args.lightcones)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, "relic_info.json"), os.path.join(tmp, "lightcone_info.json")]
+        for path, data in zip(paths, (relic_info, lightcone_info)):
+            with open(path, 'w', encoding="utf-8") as f:
+                json.dump(data, f)
+        table = compile_modifiers(vocab, *paths)
+
+    rng = np.random.default_rng(0)
+    calculator = DamageCalculator(vocab, table)
+    characters = random_characters(args.characters)
+    lightcones = list(lightcone_info)
+    relics = random_relics(vocab, 6 * args.builds)
+    builds = calculator.build_vectors(relics, [range(6 * i, 6 * i + 6) for i in range(args.builds)], list(relic_info))
+    scenarios = [{"atk%": float(rng.choice([0, 24, 48])), "dmg%": float(rng.choice([0, 20])),
+                  "def_reduction%": float(rng.choice([0, 20, 40])), "broken": bool(rng.integers(2)),
+                  "conditional": bool(rng.integers(2))} for _ in range(args.scenarios)]
+
+    start = time.perf_counter()
+    result = calculator.evaluate(characters, lightcones, builds, scenarios)
+    seconds = time.perf_counter() - start
+    combinations = result["expected"].size
+
+    samples = [tuple(int(rng.integers(size)) for size in result["expected"].shape) for _ in range(args.samples)]
+    start = time.perf_counter()
+    vectors = calculator.character_vectors(characters)
+    always = table.vectors(lightcones)
+    conditional = table.vectors(lightcones, conditional=True)
+    expected = [reference(calculator, vectors, always, conditional, builds, scenarios, *sample)
+                for sample in samples]
+    loop_seconds = (time.perf_counter() - start) / len(samples) * combinations
+    error = max(abs(result["expected"][sample] / value - 1) for sample, value in zip(samples, expected))
+
+    print(f"{args.characters} characters x {args.lightcones} lightcones x {args.builds} builds x "
+          f"{args.scenarios} scenarios = {combinations} combinations")
+    print(f"one call: {seconds:.3f} s ({combinations / seconds / 1e6:.1f} M combinations/s), "
+          f"one by one: {loop_seconds:.0f} s estimated, max relative error on {len(samples)} samples {error:.1e}")
+
+    best = int(np.argmax(result["expected"][0].mean(axis=(1, 2))))
+    print(f"best lightcone of {next(iter(characters))} over builds and scenarios: {lightcones[best]}")
+
+
+if __name__ == "__main__":
+    main()
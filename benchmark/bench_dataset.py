@@ -0,0 +1,123 @@
+"""
+Time and memory to load synthetic character.json, lightcone_info.json,
+relic_info.json and relic_status.json files with `json.load`, next to
+`load_dataset` building the snapshots and then mapping them. Memory is what
+tracemalloc counts for the loaded objects. The arrays of the snapshots are
+mapped, not allocated: their pages are only read into the (shared) page cache
+when they are used, so they are reported apart, in full.
+
+Usage:
+    python benchmark/bench_dataset.py [--characters 2000] [--lightcones 4000] [--relic-sets 1000] [--repeat 5]
+"""
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.bench_modifiers import synthetic_texts
+from benchmark.synthetic import RELIC_STATUS, random_characters
+from src.dataset import load_dataset
+from src.dataset.snapshot import DATA_FILES
+
+
+def load_json(data_dir: str):
+    data = dict()
+    for kind, name in DATA_FILES.items():
+        with open(os.path.join(data_dir, name), 'r', encoding="utf-8") as f:
+            data[kind] = json.load(f)
+    return data
+
+
+def timed(load, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def allocated(load) -> int:
+    # Bytes still allocated by the loaded objects
+    gc.collect()
+    tracemalloc.start()
+    data = load()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--characters", type=int, default=2000)
+    parser.add_argument("--lightcones", type=int, default=4000)
+    parser.add_argument("--relic-sets", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    characters = random_characters(args.characters)
+    for name, character in characters.items():
+        character["image"] = f"https://example.com/images/characters/{name}.webp"
+    relic_info, lightcone_info = synthetic_texts(args.relic_sets, args.lightcones)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind, data in zip(DATA_FILES, (characters, lightcone_info, relic_info, RELIC_STATUS)):
+            with open(os.path.join(tmp, DATA_FILES[kind]), 'w', encoding="utf-8") as f:
+                json.dump(data, f, indent=4)
+        json_size = sum(os.path.getsize(os.path.join(tmp, name)) for name in DATA_FILES.values())
+
+        start = time.perf_counter()
+        dataset = load_dataset(tmp)
+        build_seconds = time.perf_counter() - start
+        snapshot_size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp)
+                            if name.endswith(".snapshot"))
+        if (dataset.characters.to_json() != characters or dataset.lightcones.to_json() != lightcone_info
+                or dataset.relic_sets.to_json() != relic_info or dataset.relic_stats.to_json() != RELIC_STATUS):
+            raise AssertionError("The tables differ from the JSON files")
+
+        json_seconds = timed(lambda: load_json(tmp), args.repeat)
+        snapshot_seconds = timed(lambda: load_dataset(tmp), args.repeat)
+        json_bytes = allocated(lambda: load_json(tmp))
+        dataset_bytes = allocated(lambda: load_dataset(tmp))
+        mapped_bytes = load_dataset(tmp).nbytes
+
+        # Typical access: rarity of every character and the ability of every lightcone
+        data = load_json(tmp)
+        start = time.perf_counter()
+        [entry["rate"] == "4" for entry in data["characters"].values()]
+        [entry["ability"] for entry in data["lightcones"].values()]
+        json_access = time.perf_counter() - start
+        dataset = load_dataset(tmp)
+        start = time.perf_counter()
+        dataset.characters.column("rarity") == 4
+        dataset.lightcones.column("ability")
+        dataset_access = time.perf_counter() - start
+
+        # A changed file rebuilds its snapshot
+        name = next(iter(characters))
+        characters[name]["rate"] = "4" if characters[name]["rate"] == "5" else "5"
+        with open(os.path.join(tmp, DATA_FILES["characters"]), 'w', encoding="utf-8") as f:
+            json.dump(characters, f, indent=4)
+        if load_dataset(tmp).characters[name].rarity != int(characters[name]["rate"]):
+            raise AssertionError("The snapshot was not rebuilt after a change")
+
+    print(f"{args.characters} characters, {args.lightcones} lightcones, {args.relic_sets} relic sets: "
+          f"JSON {json_size / 2 ** 20:.1f} MiB, snapshots {snapshot_size / 2 ** 20:.1f} MiB")
+    print(f"load: json.load {json_seconds * 1000:.1f} ms, snapshots {snapshot_seconds * 1000:.2f} ms "
+          f"({json_seconds / snapshot_seconds:.0f}x), first load building them {build_seconds * 1000:.0f} ms")
+    print(f"memory: dicts {json_bytes / 2 ** 20:.1f} MiB, tables {dataset_bytes / 1024:.0f} KiB "
+          f"({json_bytes / dataset_bytes:.0f}x), {json_bytes / (dataset_bytes + mapped_bytes):.1f}x with all "
+          f"{mapped_bytes / 2 ** 20:.1f} MiB of mapped arrays read")
+    print(f"rarities and abilities: dicts {json_access * 1000:.2f} ms, tables {dataset_access * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Throughput of `extract_lightcone` against the local mock server
+(benchmark/mock_openai.py) in serial, concurrent and batched mode.
+
+Reports items per second, p50/p95 request latency, number of requests, 429
+and 5xx answers next to the retries of the scheduler, and token totals for
+every mode. Without --lightcones, synthetic lightcones are
+generated. No response cache is used, so every mode calls the server.
+
+Usage:
+    python benchmark/bench_extract.py [--lightcones data/lightcone_info.json] [--items 60]
+        [--workers 4] [--batch-size 8] [--latency lognormal:0.5,0.3] [--rate-limit-rate 0.02]
+        [--error-rate 0.02]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.mock_openai import MockOpenAIServer
+from configs.prompt.prompt import EXTRACT_SUB_STAT_FROM_LIGHTCONE, EXTRACT_SUB_STAT_FROM_LIGHTCONE_BATCH
+from src.extractor.extract import extract_lightcone
+from src.extractor.metrics import ExtractionMetrics
+
+
+MODEL = "gemini-2.0-flash"
+
+
+def synthetic_lightcones(count: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    stats = ["ATK", "CRIT Rate", "CRIT DMG", "Break Effect", "Effect Hit Rate", "Energy Regeneration Rate"]
+    lightcones = dict()
+    for i in range(count):
+        stat = rng.choice(stats)
+        base = rng.choice([8, 12, 16, 20, 24])
+        values = "/".join(f"{base + base // 4 * k}%" for k in range(5))
+        lightcones[f"Lightcone {i}"] = {
+            "ability": f"Increases the wearer's {stat} by {values}. When the wearer uses their Ultimate, "
+                       f"increases DMG dealt by {values} for {i % 3 + 1} turn(s) and regenerates {i + 4} Energy."
+        }
+    return lightcones
+
+
+def run_mode(server: MockOpenAIServer, lightcone_path: str, items: int, **kwargs) -> dict:
+    server.reset_stats()
+    metrics = ExtractionMetrics()
+    start = time.perf_counter()
+    extract_lightcone("mock-key", server.url, MODEL, lightcone_path=lightcone_path, metrics=metrics, **kwargs)
+    seconds = time.perf_counter() - start
+    summary = metrics.summary(items=items)
+    return {
+        "seconds": seconds,
+        "items_per_second": items / seconds,
+        "requests": server.stats["requests"],
+        "rate_limited": server.stats["rate_limited"],
+        "errors": server.stats["errors"],
+        # Failed attempts: the scheduler retried each of them, as the run completed
+        "retries": sum(summary["errors"].values()),
+        "p50": summary["latency_p50"],
+        "p95": summary["latency_p95"],
+        "prompt_tokens": server.stats["prompt_tokens"],
+        "completion_tokens": server.stats["completion_tokens"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lightcones", default=None, help="lightcone_info.json, synthetic if omitted")
+    parser.add_argument("--items", type=int, default=60, help="Number of synthetic lightcones")
+    parser.add_argument("--workers", type=int, default=4, help="Requests in flight in concurrent modes")
+    parser.add_argument("--batch-size", type=int, default=8, help="Lightcones per request in batched mode")
+    parser.add_argument("--latency", default="lognormal:0.3,0.3", help="Mock latency distribution")
+    parser.add_argument("--latency-per-token", type=float, default=0.002, help="Mock seconds per completion token")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of 429 answers")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 answers")
+    parser.add_argument("--modes", default="serial,concurrent,batched", help="Comma-separated modes to run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        lightcone_path = args.lightcones
+        if lightcone_path is None:
+            lightcone_path = os.path.join(tmp, "lightcone_info.json")
+            with open(lightcone_path, 'w', encoding='utf-8') as f:
+                json.dump(synthetic_lightcones(args.items, args.seed), f)
+        with open(lightcone_path, 'r', encoding='utf-8') as f:
+            items = len(json.load(f))
+
+        modes = {
+            "serial": dict(prompt=EXTRACT_SUB_STAT_FROM_LIGHTCONE, max_workers=1),
+            "concurrent": dict(prompt=EXTRACT_SUB_STAT_FROM_LIGHTCONE, max_workers=args.workers),
+            "batched": dict(prompt=EXTRACT_SUB_STAT_FROM_LIGHTCONE_BATCH, max_workers=args.workers,
+                            batch_size=args.batch_size)
+        }
+
+        results = dict()
+        with MockOpenAIServer(latency=args.latency, latency_per_token=args.latency_per_token,
+                              rate_limit_rate=args.rate_limit_rate, error_rate=args.error_rate,
+                              retry_after=0.1, seed=args.seed) as server:
+            for mode in args.modes.split(","):
+                results[mode] = run_mode(server, lightcone_path, items, **modes[mode])
+
+    print(f"\n{items} lightcones, latency {args.latency} + {args.latency_per_token}s/token")
+    print(f"{'mode':<12}{'time (s)':>10}{'items/s':>10}{'requests':>10}{'429':>6}{'5xx':>6}{'retries':>9}"
+          f"{'p50 (s)':>10}{'p95 (s)':>10}{'prompt tok':>12}{'compl. tok':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<12}{r['seconds']:>10.2f}{r['items_per_second']:>10.2f}{r['requests']:>10}"
+              f"{r['rate_limited']:>6}{r['errors']:>6}{r['retries']:>9}"
+              f"{r['p50'] or 0:>10.3f}{r['p95'] or 0:>10.3f}{r['prompt_tokens']:>12}{r['completion_tokens']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Import time, peak memory and filter/score time of `RelicInventory` on synthetic
+JSON exports, compared with loading the same export with `json.load`.
+
+Usage:
+    python benchmark/bench_inventory.py [--relics 10000,100000] [--characters 80]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.synthetic import vocabulary, set_names, random_characters, random_relics, to_relic_dicts
+from src.estimator.inventory import RelicInventory, import_json
+from src.estimator.scoring import RelicScorer
+
+
+def write_export(path: str, vocab, count: int, block: int = 10000) -> None:
+    # Written block by block, so the benchmark itself does not hold the export
+    relics = random_relics(vocab, count)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("[\n")
+        for start in range(0, count, block):
+            items = to_relic_dicts(vocab, relics, start, min(start + block, count))
+            f.write(",\n".join(json.dumps(item) for item in items))
+            f.write(",\n" if start + block < count else "\n")
+        f.write("]\n")
+
+
+def measure(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--relics", default="10000,100000", help="Comma-separated inventory sizes")
+    parser.add_argument("--characters", type=int, default=80)
+    parser.add_argument("--dir", default=None, help="Working directory, a temporary one by default")
+    args = parser.parse_args()
+
+    vocab = vocabulary()
+    names = set_names()
+    seeded = [name.replace("_", " ").title() for name in names["relic"] + names["planar"]]
+    scorer = RelicScorer(vocab, random_characters(args.characters))
+    work_dir = args.dir or tempfile.mkdtemp()
+    os.makedirs(work_dir, exist_ok=True)
+
+    print(f"{'relics':>8}{'export (MB)':>13}{'json.load (s)':>15}{'peak (MB)':>11}"
+          f"{'import (s)':>12}{'peak (MB)':>11}{'store (MB)':>12}{'filter (ms)':>13}{'score (ms)':>12}")
+    try:
+        for count in map(int, args.relics.split(",")):
+            export_path = os.path.join(work_dir, f"export_{count}.json")
+            inventory_path = os.path.join(work_dir, f"inventory_{count}")
+            write_export(export_path, vocab, count)
+            shutil.rmtree(inventory_path, ignore_errors=True)
+
+            _, load_seconds, load_peak = measure(lambda: json.load(open(export_path, 'r', encoding='utf-8')))
+            inventory = RelicInventory(inventory_path, vocab, seeded)
+            _, import_seconds, import_peak = measure(lambda: import_json(export_path, inventory, vocab, account="bench"))
+            assert len(inventory) == count
+
+            inventory = RelicInventory(inventory_path, vocab)
+            start = time.perf_counter()
+            indices = inventory.filter(slot="body", main=["crit_rate%", "crit_dmg%"], set=seeded[:4])
+            filter_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            records = inventory.take(inventory.filter(slot="body"))
+            scorer.score_sparse(records["sub"], records["sub_value"])
+            score_ms = (time.perf_counter() - start) * 1000
+
+            print(f"{count:>8}{os.path.getsize(export_path) / 2 ** 20:>13.1f}{load_seconds:>15.2f}{load_peak:>11.1f}"
+                  f"{import_seconds:>12.2f}{import_peak:>11.1f}"
+                  f"{os.path.getsize(inventory.records_path) / 2 ** 20:>12.1f}{filter_ms:>13.2f}{score_ms:>12.2f}")
+            if not np.all(np.isin(inventory.records["main"][indices], [vocab.index["crit_rate%"], vocab.index["crit_dmg%"]])):
+                raise AssertionError("Filter returned relics with other main stats")
+    finally:
+        if args.dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Time to compile synthetic relic set effects and lightcone abilities into a
+`ModifierTable`, to load it again from its cache, and to get set bonus vectors
+from the table compared to parsing the texts for every evaluation.
+
+Usage:
+    python benchmark/bench_modifiers.py [--relic-sets 60] [--lightcones 400] [--evaluations 1000]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.synthetic import vocabulary
+from src.estimator.modifiers import compile_modifiers, parse_effect
+from src.extractor.validate import SubStatNormalizer
+
+
+STATS = ["ATK", "Max HP", "DEF", "CRIT Rate", "CRIT DMG", "Break Effect", "Effect Hit Rate", "Effect RES",
+         "SPD", "Energy Regeneration Rate", "Quantum DMG", "Outgoing Healing"]
+
+
+def synthetic_texts(relic_sets: int, lightcones: int, seed: int = 0):
+    rng = random.Random(seed)
+    relic_info = dict()
+    for i in range(relic_sets):
+        planar = i % 3 == 0
+        relic_info[f"set_{i:03d}"] = {
+            "type": "planar_set" if planar else "relic_set",
+            "image": "",
+            "2_piece_effect": f"Increases the wearer's {rng.choice(STATS)} by {rng.choice([6, 8, 10, 12])}%.",
+            "4_piece_effect": None if planar else
+            f"{rng.choice(STATS)} increases by {rng.choice([8, 12, 16])}%. When the wearer uses their Ultimate, "
+            f"increases {rng.choice(STATS)} by {rng.choice([10, 20])}% for 2 turn(s)."
+        }
+    lightcone_info = dict()
+    for i in range(lightcones):
+        base = rng.choice([8, 12, 16, 20, 24])
+        values = "/".join(f"{base + base // 4 * k}%" for k in range(5))
+        lightcone_info[f"lightcone_{i:03d}"] = {
+            "image": "", "rate": "5", "type": "hunt",
+            "ability": f"Increases the wearer's {rng.choice(STATS)} by {values}. After the wearer attacks, "
+                       f"increases DMG dealt by {values} for {i % 3 + 1} turn(s) and regenerates {i % 5 + 4} Energy."
+        }
+    return relic_info, lightcone_info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--relic-sets", type=int, default=60)
+    parser.add_argument("--lightcones", type=int, default=400)
+    parser.add_argument("--evaluations", type=int, default=1000, help="Set bonus lookups timed")
+    args = parser.parse_args()
+
+    vocab = vocabulary()
+    relic_info, lightcone_info = synthetic_texts(args.relic_sets, args.lightcones)
+    with tempfile.TemporaryDirectory() as tmp:
+        relic_path = os.path.join(tmp, "relic_info.json")
+        lightcone_path = os.path.join(tmp, "lightcone_info.json")
+        cache_path = os.path.join(tmp, "modifiers.npz")
+        for path, data in ((relic_path, relic_info), (lightcone_path, lightcone_info)):
+            with open(path, 'w', encoding="utf-8") as f:
+                json.dump(data, f)
+
+        start = time.perf_counter()
+        table = compile_modifiers(vocab, relic_path, lightcone_path, cache_path)
+        compile_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        cached = compile_modifiers(vocab, relic_path, lightcone_path, cache_path)
+        cached_seconds = time.perf_counter() - start
+        if cached.fingerprint != table.fingerprint or len(cached) != len(table):
+            raise AssertionError("The cached table differs from the compiled one")
+
+        # A changed text compiles the table again
+        name = next(iter(relic_info))
+        relic_info[name]["2_piece_effect"] = "Increases the wearer's SPD by 6%."
+        with open(relic_path, 'w', encoding="utf-8") as f:
+            json.dump(relic_info, f)
+        changed = compile_modifiers(vocab, relic_path, lightcone_path, cache_path)
+        if changed.fingerprint == table.fingerprint or changed.set_bonuses()[name][2] != {"spd%": 6.0}:
+            raise AssertionError("The table was not compiled again after a change")
+
+        print(f"{len(relic_info)} relic sets, {len(lightcone_info)} lightcones: {len(table)} modifiers, "
+              f"{int(table.conditional.sum())} conditional, {len(table.stats)} stats, "
+              f"{os.path.getsize(cache_path) / 1024:.0f} KiB")
+        print(f"compile: {compile_seconds * 1000:.1f} ms, from the cache: {cached_seconds * 1000:.1f} ms")
+
+    # A scorer needing the 2 and 4 piece vectors of every set, per evaluation
+    names = list(relic_info)
+    normalizer = SubStatNormalizer(vocab.names)
+    evaluations = max(1, args.evaluations // 100)
+    start = time.perf_counter()
+    for _ in range(evaluations):
+        for relic_set in relic_info.values():
+            parse_effect(relic_set["2_piece_effect"], normalizer, vocab)
+            parse_effect(relic_set["4_piece_effect"], normalizer, vocab)
+    parse_seconds = (time.perf_counter() - start) / evaluations
+    start = time.perf_counter()
+    for _ in range(args.evaluations):
+        changed.vectors(names, pieces=2)
+        changed.vectors(names, pieces=4)
+    table_seconds = (time.perf_counter() - start) / args.evaluations
+    print(f"set vectors per evaluation: parsing {parse_seconds * 1000:.2f} ms, table {table_seconds * 1000:.3f} ms "
+          f"({parse_seconds / table_seconds:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Time to find the best builds of a character in synthetic inventories with
+`BuildOptimizer`, serially and over a process pool, checked against brute force
+on a small inventory.
+
+Usage:
+    python benchmark/bench_optimizer.py [--relics 1000,5000] [--k 10] [--spd 134]
+"""
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+from itertools import product
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.synthetic import vocabulary, set_names, random_characters, random_relics, random_set_bonuses
+from src.estimator.optimizer import BuildOptimizer, relic_stat_columns
+from src.estimator.scoring import RelicScorer
+
+
+def brute_force(optimizer: BuildOptimizer, relics, k: int, constraints) -> list:
+    # Reference: every combination of one relic per slot
+    vocab = optimizer.vocab
+    values = optimizer.score(relics)
+    columns = [vocab.index[name] for name in constraints]
+    stats = relic_stat_columns(relics, columns)
+    per_unit = optimizer.weights / optimizer.units
+    by_slot = [np.flatnonzero((relics["slot"] == s) & vocab.main_mask[s, relics["main"]]) for s in range(len(vocab.slots))]
+    scores = list()
+    for build in product(*by_slot):
+        bonus = np.zeros(len(vocab))
+        for s, count in Counter(int(relics["set"][i]) for i in build).items():
+            bonus += optimizer.bonus_vectors[0, s] * (count >= 2) + optimizer.bonus_vectors[1, s] * (count >= 4)
+        totals = stats[list(build)].sum(axis=0) + bonus[columns] + [optimizer.base.get(n, 0) for n in constraints]
+        if all((low is None or total >= low) and (high is None or total <= high)
+               for total, (low, high) in zip(totals, constraints.values())):
+            scores.append(values[list(build)].sum() + bonus @ per_unit)
+    return sorted(scores, reverse=True)[:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--relics", default="1000,5000", help="Comma-separated inventory sizes")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--spd", type=float, default=134, help="Minimum SPD of the builds")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--check", type=int, default=48, help="Inventory size checked against brute force")
+    args = parser.parse_args()
+
+    vocab = vocabulary()
+    names = set_names()
+    sets = names["relic"] + names["planar"]
+    character = random_characters(1, seed=4)
+    name, info = next(iter(character.items()))
+    scorer = RelicScorer(vocab, character, overrides={name: {"spd": 1.0}})
+    optimizer = BuildOptimizer(vocab, scorer.weights[0], sets, random_set_bonuses(),
+                               base={"spd": float(info["basic_stat"]["spd"])})
+    constraints = {"spd": (args.spd, None)}
+
+    # Looser constraint, few builds of a small inventory reach the full one
+    check_constraints = {"spd": (args.spd - 20, None)}
+    relics = random_relics(vocab, args.check, seed=2)
+    reference = brute_force(optimizer, relics, args.k, check_constraints)
+    builds = optimizer.optimize(relics, k=args.k, constraints=check_constraints, max_workers=1)
+    error = max((abs(b["score"] - r) for b, r in zip(builds, reference)), default=0.0)
+    print(f"{args.check} relics: {len(builds)} builds, {len(reference)} by brute force, "
+          f"max score difference {error:.2e}")
+
+    print(f"\n{'relics':>8}{'serial (s)':>12}{'workers (s)':>13}{'best score':>12}{'k-th score':>12}{'best SPD':>10}")
+    for count in map(int, args.relics.split(",")):
+        relics = random_relics(vocab, count)
+        start = time.perf_counter()
+        serial = optimizer.optimize(relics, k=args.k, constraints=constraints, max_workers=1)
+        serial_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        parallel = optimizer.optimize(relics, k=args.k, constraints=constraints, max_workers=args.workers)
+        parallel_seconds = time.perf_counter() - start
+        if [round(b["score"], 4) for b in serial] != [round(b["score"], 4) for b in parallel]:
+            raise AssertionError("Serial and parallel searches found different builds")
+        print(f"{count:>8}{serial_seconds:>12.2f}{parallel_seconds:>13.2f}{serial[0]['score']:>12.2f}"
+              f"{serial[-1]['score']:>12.2f}{serial[0]['stats']['spd']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Parse time and peak memory of every scraper page for each parser backend,
+with and without the scraper's SoupStrainer.
+
+Fixtures are saved pages named after the keys of `src.crawl.STRAINERS`
+(relic_sets.html, relic_stats.html, lightcones.html, lightcone_images.html,
+characters.html, character_info.html). Missing fixtures are skipped. Defaults
+to the small pages of tests/fixtures/pages; tests/test_parse.py checks that the
+strainers and backends don't change what the scrapers read from them.
+
+Usage:
+    python benchmark/bench_parse.py [--fixtures tests/fixtures/pages] [--repeat 5]
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+from statistics import median
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.crawl import STRAINERS
+from src.utils.parse import make_soup, available_backends
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "fixtures", "pages")
+
+# The container lookup each scraper does right after parsing
+LOOKUPS = {
+    "relic_sets": lambda soup: soup.find('div', class_='relic-set-container row row-cols-xxl-2 row-cols-1'),
+    "relic_stats": lambda soup: soup.find_all('table', {'class': 'wikitable'}),
+    "lightcones": lambda soup: soup.find('div', class_='relic-set-container row row-cols-xxl-2 row-cols-1'),
+    "lightcone_images": lambda soup: soup.find("div", class_="clearfix"),
+    "characters": lambda soup: soup.find('div', class_='employees-container hsr-cards'),
+    "character_info": lambda soup: soup.find("div", class_="stat-box")
+}
+
+
+def measure(content: bytes, key: str, backend: str, strained: bool, repeat: int):
+    parse_only = STRAINERS[key] if strained else None
+
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        LOOKUPS[key](make_soup(content, parse_only, backend))
+        times.append(time.perf_counter() - start)
+
+    # Memory is traced in a separate run, tracing slows parsing down
+    tracemalloc.start()
+    soup = make_soup(content, parse_only, backend)
+    LOOKUPS[key](soup)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del soup
+    return median(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES, help="Directory with the saved pages")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    args = parser.parse_args()
+
+    print(f"{'page':<18}{'backend':<13}{'mode':<10}{'size (KB)':>10}{'time (ms)':>12}{'peak (MB)':>12}")
+    for key in STRAINERS:
+        path = os.path.join(args.fixtures, f"{key}.html")
+        if not os.path.exists(path):
+            print(f"{key:<18}missing fixture {path}")
+            continue
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        for backend in available_backends():
+            for strained in (False, True):
+                seconds, peak = measure(content, key, backend, strained, args.repeat)
+                mode = "strained" if strained else "full"
+                print(f"{key:<18}{backend:<13}{mode:<10}{len(content) / 1024:>10.1f}"
+                      f"{seconds * 1000:>12.2f}{peak / 1024 / 1024:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
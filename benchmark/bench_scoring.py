@@ -0,0 +1,76 @@
+"""
+Time to score synthetic inventories against every character with `RelicScorer`,
+compared with scoring relic by relic in Python.
+
+Usage:
+    python benchmark/bench_scoring.py [--relics 1000,10000,100000] [--characters 80]
+"""
+import os
+import sys
+import time
+import argparse
+from statistics import median
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.synthetic import vocabulary, random_characters, random_relics
+from src.estimator.scoring import RelicScorer, scatter_stats
+
+
+def timed(function, repeat: int) -> float:
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return median(times)
+
+
+def score_loop(scorer: RelicScorer, relics, count: int) -> np.ndarray:
+    # Reference: one Python loop iteration per relic and character
+    vocab = scorer.vocab
+    scores = np.zeros((count, len(scorer.names)), dtype=np.float32)
+    for i in range(count):
+        for c in range(len(scorer.names)):
+            total = 0.0
+            for column, value in zip(relics["sub"][i], relics["sub_value"][i]):
+                total += scorer.weights[c, column] * value / vocab.roll_values[column]
+            scores[i, c] = total
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--relics", default="1000,10000,100000", help="Comma-separated inventory sizes")
+    parser.add_argument("--characters", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    vocab = vocabulary()
+    characters = random_characters(args.characters)
+    start = time.perf_counter()
+    scorer = RelicScorer(vocab, characters)
+    print(f"{len(vocab)} stats, {args.characters} characters, weights built in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+    check = random_relics(vocab, 200, seed=1)
+    reference = score_loop(scorer, check, 200)
+    error = np.abs(scorer.score_sparse(check["sub"], check["sub_value"]) - reference).max()
+    print(f"Max difference to the per-relic loop: {error:.2e}")
+    loop_seconds = timed(lambda: score_loop(scorer, check, 200), 1) / 200
+
+    print(f"\n{'relics':>8}{'scatter (ms)':>14}{'product (ms)':>14}{'total (ms)':>12}{'loop est. (s)':>15}")
+    for count in map(int, args.relics.split(",")):
+        relics = random_relics(vocab, count)
+        dense = scatter_stats(relics["sub"], relics["sub_value"], len(vocab))
+        scatter = timed(lambda: scatter_stats(relics["sub"], relics["sub_value"], len(vocab)), args.repeat)
+        product = timed(lambda: scorer.score(dense), args.repeat)
+        total = timed(lambda: scorer.score_sparse(relics["sub"], relics["sub_value"]), args.repeat)
+        print(f"{count:>8}{scatter * 1000:>14.2f}{product * 1000:>14.2f}{total * 1000:>12.2f}"
+              f"{loop_seconds * count:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Offline regression suite and benchmark of the scrapers in src/crawl.py.
+
+Pages are recorded once into a `Fetcher` cache directory with --record, then
+replayed with an offline `Fetcher`, so no run after the recording touches the
+network. Every scraper writes to a fresh temporary directory, its output is
+checked for the expected structure, and the following are reported:
+    wall     time of the whole scraper call
+    parse    time spent in `make_soup`, summed over threads
+    requests pages served by the fetcher
+    peak     peak traced memory, measured in a second run
+
+A failed check means the markup changed or a code change broke parsing; a
+slower time with passing checks means a code change slowed it down. The exit
+code is 1 if any check failed.
+
+With --pages, the pages are recorded from a directory of saved pages served by
+a local `PageServer` instead of the network, e.g. the small pages of
+tests/fixtures/pages (use --min-items 2 with those). tests/test_scrapers.py
+runs the same scrapers on them under pytest.
+
+Usage:
+    python benchmark/bench_scrapers.py --fixtures data/fixtures/pages --record
+    python benchmark/bench_scrapers.py --fixtures data/fixtures/pages [--only lightcones]
+    python benchmark/bench_scrapers.py --pages tests/fixtures/pages --min-items 2
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import tracemalloc
+import contextlib
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.page_server import PageServer
+from src import crawl
+from src.utils.fetch import Fetcher
+
+
+URLS = {
+    "relic_sets": "https://www.prydwen.gg/star-rail/guides/relic-sets/",
+    "relic_stats": "https://honkai-star-rail.fandom.com/wiki/Relic/Stats",
+    "lightcones": "https://www.prydwen.gg/star-rail/light-cones/",
+    "lightcone_images": "https://the-astral-express-archive.tumblr.com/lcgallery",
+    "characters": "https://www.prydwen.gg/star-rail/characters"
+}
+
+SLOTS = ["head", "hands", "body", "feet", "planarsphere", "linkrope"]
+
+SUB_STATS = ['spd', 'hp', 'atk', 'def', 'hp%', 'atk%', 'def%', 'break_effect%',
+             'effect_hit_rate%', 'effect_res%', 'crit_rate%', 'crit_dmg%']
+
+
+def check_entities(data: Dict, fields: Dict[str, Callable], min_items: int) -> List[str]:
+    """
+    Checks that `data` maps at least `min_items` names to dicts whose `fields`
+    all pass their check. Returns the problems found.
+    """
+    problems = list()
+    if not isinstance(data, dict) or len(data) < min_items:
+        return [f"expected at least {min_items} entries, got {len(data) if isinstance(data, dict) else data!r}"]
+    for name, entity in data.items():
+        for field, check in fields.items():
+            if field not in entity:
+                problems.append(f"{name}: missing \"{field}\"")
+            elif not check(entity[field]):
+                problems.append(f"{name}: unexpected {field} {entity[field]!r}")
+    return problems
+
+
+def non_empty_str(value) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+
+def check_relic_sets(data: Dict, min_items: int) -> List[str]:
+    return check_entities(data, {
+        "type": non_empty_str,
+        "image": lambda v: isinstance(v, str) and v.startswith("https://"),
+        "2_piece_effect": non_empty_str,
+        "4_piece_effect": lambda v: v is None or non_empty_str(v)
+    }, min_items)
+
+
+def check_relic_stats(data: Dict, min_items: int) -> List[str]:
+    problems = list()
+    main_stat = data.get("main_stat", dict())
+    for slot in SLOTS:
+        if not main_stat.get(slot):
+            problems.append(f"main_stat: no stats for \"{slot}\"")
+    missing = sorted(set(SUB_STATS) - set(data.get("sub_stat", [])))
+    if missing:
+        problems.append(f"sub_stat: missing {missing}")
+    return problems
+
+
+def check_lightcones(data: Dict, min_items: int) -> List[str]:
+    problems = check_entities(data, {
+        "image": lambda v: v is None or (isinstance(v, str) and v.startswith("http")),
+        "rate": lambda v: v in ("3", "4", "5"),
+        "type": non_empty_str,
+        "ability": non_empty_str
+    }, min_items)
+    unmatched = [name for name, lightcone in data.items() if lightcone.get("image") is None]
+    if data and len(unmatched) > 0.1 * len(data):
+        problems.append(f"{len(unmatched)} of {len(data)} lightcones have no image")
+    return problems
+
+
+def check_characters(data: Dict, min_items: int) -> List[str]:
+    return check_entities(data, {
+        "image": non_empty_str,
+        "rate": lambda v: v in ("4", "5"),
+        "element": non_empty_str,
+        "path": non_empty_str,
+        "sub_stat": lambda v: isinstance(v, dict),
+        "basic_stat": lambda v: isinstance(v, dict) and bool(v)
+    }, min_items)
+
+
+# Each scraper is called with a fetcher, the output path and the URLs to scrape
+SCRAPERS = {
+    "relic_sets": (lambda fetcher, path, urls: crawl.scrape_relic_sets(urls["relic_sets"], path, fetcher=fetcher),
+                   check_relic_sets),
+    "relic_stats": (lambda fetcher, path, urls: crawl.scrape_relic_stats(urls["relic_stats"], path,
+                                                                         fetcher=fetcher),
+                    check_relic_stats),
+    "lightcones": (lambda fetcher, path, urls: crawl.scrape_lightcones(urls["lightcones"], urls["lightcone_images"],
+                                                                       path, fetcher=fetcher),
+                   check_lightcones),
+    "characters": (lambda fetcher, path, urls: crawl.scrape_characters(urls["characters"], path, fetcher=fetcher),
+                   check_characters)
+}
+
+
+class ParseTimer:
+    """
+    Wraps `src.crawl.make_soup` to add up the time spent parsing.
+    """
+
+    def __init__(self) -> None:
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+        self._make_soup = crawl.make_soup
+
+    def __enter__(self) -> "ParseTimer":
+        def timed_make_soup(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return self._make_soup(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.seconds += time.perf_counter() - start
+        crawl.make_soup = timed_make_soup
+        return self
+
+    def __exit__(self, *exc) -> None:
+        crawl.make_soup = self._make_soup
+
+
+def run_scraper(name: str, fixtures: str, record: bool, verbose: bool, traced: bool,
+                urls: Dict[str, str] = URLS) -> Dict:
+    scrape, _ = SCRAPERS[name]
+    fetcher = Fetcher(cache_dir=fixtures, offline=not record, rate_limit=2.0 if record else None)
+    log = io.StringIO()
+    with tempfile.TemporaryDirectory() as tmp:
+        save_path = os.path.join(tmp, f"{name}.json")
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(log)
+        with output, ParseTimer() as timer:
+            if traced:
+                tracemalloc.start()
+            error = None
+            start = time.perf_counter()
+            try:
+                scrape(fetcher, save_path, urls)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            finally:
+                fetcher.close()
+            wall = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if traced else None
+            if traced:
+                tracemalloc.stop()
+
+        data = None
+        if os.path.exists(save_path):
+            with open(save_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+    return {
+        "wall": wall,
+        "parse": timer.seconds,
+        "requests": fetcher.stats["requests"] + fetcher.stats["cache_hits"],
+        "peak": peak,
+        "data": data,
+        "error": error,
+        "log": log.getvalue()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=None, help="Fetcher cache directory holding the recorded pages")
+    parser.add_argument("--record", action="store_true", help="Fetch the pages from the network into --fixtures")
+    parser.add_argument("--pages", default=None,
+                        help="Record from saved pages served locally instead (see benchmark/page_server.py)")
+    parser.add_argument("--only", default=None, help="Comma-separated scrapers to run: " + ",".join(SCRAPERS))
+    parser.add_argument("--min-items", type=int, default=10, help="Minimum number of entities per scraper")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced run measuring peak memory")
+    parser.add_argument("--verbose", action="store_true", help="Show the scrapers' own output")
+    args = parser.parse_args()
+    if args.fixtures is None and args.pages is None:
+        parser.error("--fixtures is required without --pages")
+
+    with contextlib.ExitStack() as stack:
+        urls, fixtures = URLS, args.fixtures
+        if args.pages is not None:
+            # Record the served pages, the scrapers then replay them offline as usual
+            server = stack.enter_context(PageServer(args.pages))
+            urls = {name: server.local_url(url) for name, url in URLS.items()}
+            fixtures = fixtures or stack.enter_context(tempfile.TemporaryDirectory())
+        names = args.only.split(",") if args.only else list(SCRAPERS)
+        failed = False
+        rows = list()
+        for name in names:
+            if args.pages is not None:
+                run_scraper(name, fixtures, True, False, traced=False, urls=urls)
+            result = run_scraper(name, fixtures, args.record, args.verbose, traced=False, urls=urls)
+            if not args.no_memory:
+                result["peak"] = run_scraper(name, fixtures, False, False, traced=True, urls=urls)["peak"]
+
+            _, check = SCRAPERS[name]
+            if result["error"] is not None:
+                problems = [f"raised {result['error']}"]
+            elif result["data"] is None:
+                problems = ["no output written"]
+            else:
+                problems = check(result["data"], args.min_items)
+            failed = failed or bool(problems)
+            rows.append((name, result, problems))
+
+            for problem in problems[:20]:
+                print(f"[{name}] {problem}")
+            if len(problems) > 20:
+                print(f"[{name}] ... {len(problems) - 20} more problems")
+            if problems and result["log"]:
+                print(f"[{name}] scraper output:\n{result['log'][-2000:]}")
+
+    print(f"\n{'scraper':<14}{'status':<8}{'items':>7}{'wall (s)':>10}{'parse (s)':>11}{'requests':>10}{'peak (MB)':>11}")
+    for name, result, problems in rows:
+        items = len(result["data"]) if isinstance(result["data"], dict) else 0
+        peak = f"{result['peak'] / 1024 / 1024:>11.1f}" if result["peak"] is not None else f"{'-':>11}"
+        print(f"{name:<14}{'FAIL' if problems else 'ok':<8}{items:>7}{result['wall']:>10.2f}"
+              f"{result['parse']:>11.2f}{result['requests']:>10}{peak}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Time to share a synthetic inventory between a team with `TeamOptimizer`, next to
+one character's search, and the score it keeps compared to solving the
+characters one after the other, each without the relics taken before.
+
+Usage:
+    python benchmark/bench_team.py [--relics 5000] [--characters 4] [--k 20]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.synthetic import vocabulary, set_names, random_characters, random_relics, random_set_bonuses
+from src.estimator.team import TeamOptimizer
+
+
+def sequential(team: TeamOptimizer, relics) -> float:
+    # Reference: each character in turn takes its best build among the relics left
+    taken, total = list(), 0.0
+    for name in team.names:
+        builds = team.optimizers[name].optimize(relics, k=1, constraints=team.constraints.get(name), max_workers=1,
+                                                exclude=taken)
+        if builds:
+            total += builds[0]["score"]
+            taken.extend(builds[0]["relics"].values())
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--relics", type=int, default=5000)
+    parser.add_argument("--characters", type=int, default=4)
+    parser.add_argument("--k", type=int, default=20, help="Builds listed per character")
+    parser.add_argument("--spd", type=float, default=120, help="Minimum SPD of every character")
+    args = parser.parse_args()
+
+    vocab = vocabulary()
+    names = set_names()
+    characters = random_characters(args.characters, seed=1)
+    # Characters sharing a path compete for the same relics
+    for character in characters.values():
+        character["path"] = "hunt"
+    team = TeamOptimizer.from_characters(vocab, characters, names["relic"] + names["planar"], random_set_bonuses(),
+                                         constraints={name: {"spd": (args.spd, None)} for name in characters})
+    relics = random_relics(vocab, args.relics)
+
+    first = team.names[0]
+    start = time.perf_counter()
+    team.optimizers[first].optimize(relics, k=args.k, constraints=team.constraints[first], max_workers=1)
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = team.allocate(relics, k=args.k, max_workers=1)
+    team_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    team.allocate(relics, k=args.k, max_workers=1)
+    cached_seconds = time.perf_counter() - start
+
+    print(f"{args.relics} relics, {args.characters} characters, {args.k} builds listed each")
+    print(f"one character: {single_seconds:.2f} s, team: {team_seconds:.2f} s "
+          f"({team_seconds / single_seconds:.1f}x), team again from the cache: {cached_seconds:.3f} s")
+    print(f"team score: {result['score']:.2f}, one after the other: {sequential(team, relics):.2f}, "
+          f"without conflicts: {sum(score for score in result['solo'].values() if score is not None):.2f}")
+
+    print(f"\n{'character':<16}{'solo':>8}{'team':>8}{'loss':>8}")
+    for name in team.names:
+        build = result["builds"][name]
+        print(f"{name:<16}{result['solo'][name] or 0:>8.2f}{build['score'] if build else 0:>8.2f}"
+              f"{result['loss'].get(name, 0):>8.2f}")
+    for conflict in result["conflicts"]:
+        a, b = conflict["characters"]
+        print(f"conflict {a} / {b}: {len(conflict['relics'])} relics, team loss {conflict['loss']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Time to estimate the +15 score distributions of synthetic +0 relics with
+`UpgradeEstimator`, checked against a Monte Carlo simulation relic by relic,
+at a few starting levels.
+
+Usage:
+    python benchmark/bench_upgrade.py [--relics 10000,100000] [--characters 10] [--levels 0,1,2,4,13]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.synthetic import vocabulary, random_characters, random_new_relics
+from src.estimator.scoring import RelicScorer
+from src.estimator.upgrade import UpgradeEstimator, MAX_LEVEL, LEVELS_PER_UPGRADE
+
+
+def simulate(estimator: UpgradeEstimator, relics, i: int, runs: int, rng: np.random.Generator) -> np.ndarray:
+    # Reference: upgrades one relic `runs` times following the game's rules
+    vocab, weights = estimator.vocab, estimator.weights
+    start = estimator.current(relics["sub"][i:i + 1], relics["sub_value"][i:i + 1])[0]
+    held = [s for s in relics["sub"][i] if s >= 0]
+    candidates = [c for c in np.flatnonzero(vocab.sub_chance) if c not in held and c != relics["main"][i]]
+    chances = vocab.sub_chance[candidates] / vocab.sub_chance[candidates].sum()
+    scores = np.empty(runs)
+    for run in range(runs):
+        subs, score = list(held), start
+        # One upgrade at each multiple of 3 passed on the way to +15
+        upgrades = sum(1 for level in range(int(relics["level"][i]) + 1, MAX_LEVEL + 1)
+                       if level % LEVELS_PER_UPGRADE == 0)
+        if len(subs) == 3 and upgrades > 0:
+            subs.append(rng.choice(candidates, p=chances))
+            score += weights[subs[-1]] * rng.integers(8, 11) / 10
+            upgrades -= 1
+        for _ in range(upgrades):
+            score += weights[subs[rng.integers(4)]] * rng.integers(8, 11) / 10
+        scores[run] = score
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--relics", default="10000,100000", help="Comma-separated inventory sizes")
+    parser.add_argument("--characters", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=20000, help="Monte Carlo runs per checked relic")
+    parser.add_argument("--check", type=int, default=5, help="Relics checked against Monte Carlo, per level")
+    parser.add_argument("--levels", default="0,1,2,4,13", help="Comma-separated levels of the checked relics")
+    parser.add_argument("--target", type=float, default=3.0)
+    args = parser.parse_args()
+
+    vocab = vocabulary()
+    scorer = RelicScorer(vocab, random_characters(args.characters))
+    estimator = UpgradeEstimator(vocab, scorer.weights[0])
+
+    levels = [int(level) for level in args.levels.split(",")]
+    relics = random_new_relics(vocab, args.check * len(levels), seed=1)
+    relics["level"] = np.repeat(levels, args.check).astype(np.int8)
+    estimates = estimator.estimate(relics, quantiles=(0.5,), target=args.target)
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    print(f"{'relic':>6}{'level':>6}{'subs':>6}{'expected':>10}{'simulated':>11}{'median':>8}{'simulated':>11}"
+          f"{'chance':>8}{'simulated':>11}")
+    for i in range(len(relics["level"])):
+        scores = simulate(estimator, relics, i, args.runs, rng)
+        print(f"{i:>6}{int(relics['level'][i]):>6}{int((relics['sub'][i] >= 0).sum()):>6}{estimates['expected'][i]:>10.3f}{scores.mean():>11.3f}"
+              f"{estimates['quantiles'][i, 0]:>8.3f}{np.median(scores):>11.3f}"
+              f"{estimates['chance'][i]:>8.3f}{(scores >= args.target - 1e-6).mean():>11.3f}")
+    simulate_seconds = (time.perf_counter() - start) / len(relics["level"])
+
+    print(f"\n{'relics':>8}{'per character (ms)':>20}{'all characters (s)':>20}{'Monte Carlo est. (s)':>22}")
+    for count in map(int, args.relics.split(",")):
+        relics = random_new_relics(vocab, count)
+        start = time.perf_counter()
+        for weights in scorer.weights:
+            UpgradeEstimator(vocab, weights).estimate(relics, target=args.target)
+        seconds = time.perf_counter() - start
+        print(f"{count:>8}{seconds / len(scorer.names) * 1000:>20.1f}{seconds:>20.2f}"
+              f"{simulate_seconds * count * len(scorer.names):>22.0f}")
+
+
+if __name__ == "__main__":
+    main()
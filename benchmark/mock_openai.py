@@ -0,0 +1,241 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions endpoint, to run and
+measure the extractor without an API key.
+
+Every POST to a path ending in /chat/completions is answered after a latency
+drawn from a distribution, plus an optional delay per completion token. Requests
+can fail with 500 or 429 (with Retry-After) at a given rate, and an RPM limit
+rejects requests beyond the budget with 429 like the real API.
+
+Response modes:
+    auto    JSON in the format of the extraction prompts, built from the
+            percentages in the input. Inputs that are JSON arrays of {"id", ...}
+            (batch prompts) get a keyed array back
+    echo    the user message
+    canned  a fixed answer (--canned)
+
+Latency distributions, in seconds:
+    fixed:S  uniform:A,B  normal:MEAN,STD  lognormal:MEDIAN,SIGMA  exponential:MEAN
+
+Usage:
+    python benchmark/mock_openai.py --port 8000 --latency lognormal:0.8,0.4 --rate-limit-rate 0.05
+    then use url = "http://127.0.0.1:8000/v1" with any api key
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, Optional
+
+
+STATS = ["ATK", "HP", "DEF", "CRIT Rate", "CRIT DMG", "Break Effect", "Effect Hit Rate", "Effect RES", "SPD"]
+
+
+def parse_latency(spec: str, rng: random.Random) -> Callable[[], float]:
+    """
+    Turns a latency spec such as "lognormal:0.8,0.4" into a sampler drawing from `rng`.
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    samplers = {
+        "fixed": lambda: values[0],
+        "uniform": lambda: rng.uniform(values[0], values[1]),
+        "normal": lambda: rng.gauss(values[0], values[1]),
+        "lognormal": lambda: values[0] * rng.lognormvariate(0.0, values[1]),
+        "exponential": lambda: rng.expovariate(1.0 / values[0])
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution \"{kind}\"")
+    return lambda: max(0.0, samplers[kind]())
+
+
+def auto_answer(text: str) -> Dict:
+    """
+    Builds a sub stat answer from the percentages found in an ability text.
+    """
+    values = re.findall(r"\d+(?:\.\d+)?%", text)
+    stat = STATS[sum(map(ord, text)) % len(STATS)]
+    return {stat: {"values": "/".join(values[:5]) or "0", "notes": ""}}
+
+
+class MockOpenAIServer:
+    """
+    Mock chat completions server running in a background thread.
+
+    Args:
+        port (int): Port to listen on, 0 for any free port
+        latency (str): Latency distribution spec (see module docstring)
+        latency_per_token (float): Extra seconds per completion token
+        error_rate (float): Fraction of requests answered with 500
+        rate_limit_rate (float): Fraction of requests answered with 429
+        rpm (int, optional): Requests per minute accepted before answering 429
+        mode (str): "auto", "echo" or "canned"
+        canned (str): Answer of the "canned" mode
+        retry_after (float): Retry-After header of 429 answers, in seconds
+        seed (int, optional): Seed of the latency and error draws
+    """
+
+    def __init__(self, port: int = 0,
+                 latency: str = "fixed:0.05",
+                 latency_per_token: float = 0.0,
+                 error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0,
+                 rpm: Optional[int] = None,
+                 mode: str = "auto",
+                 canned: str = "{}",
+                 retry_after: float = 1.0,
+                 seed: Optional[int] = None) -> None:
+        self.latency_per_token = latency_per_token
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rpm = rpm
+        self.mode = mode
+        self.canned = canned
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.sample_latency = parse_latency(latency, self.random)
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0,
+                      "prompt_tokens": 0, "completion_tokens": 0}
+        self._accepted = deque()
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+                    return
+                status, payload = server.handle(body)
+                self._send(status, payload)
+
+            def _send(self, status: int, payload: Dict) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", str(server.retry_after))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}/v1"
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+            self._accepted.clear()
+
+    def handle(self, body: Dict):
+        with self._lock:
+            self.stats["requests"] += 1
+            draw = self.random.random()
+            latency = self.sample_latency()
+            now = time.monotonic()
+            while self._accepted and now - self._accepted[0] >= 60.0:
+                self._accepted.popleft()
+            over_budget = self.rpm is not None and len(self._accepted) >= self.rpm
+            if draw < self.rate_limit_rate or over_budget:
+                self.stats["rate_limited"] += 1
+                return 429, {"error": {"message": "Resource has been exhausted", "type": "rate_limit_error"}}
+            if draw < self.rate_limit_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return 500, {"error": {"message": "Internal error", "type": "server_error"}}
+            self._accepted.append(now)
+
+        messages = body.get("messages", [])
+        user = messages[-1]["content"] if messages else ""
+        answer = self.answer(user)
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4 + 1
+        completion_tokens = len(answer) // 4 + 1
+        time.sleep(latency + completion_tokens * self.latency_per_token)
+
+        with self._lock:
+            self.stats["ok"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+        return 200, {
+            "id": f"chatcmpl-mock-{self.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": answer}
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def answer(self, user: str) -> str:
+        if self.mode == "echo":
+            return user
+        if self.mode == "canned":
+            return self.canned
+        try:
+            items = json.loads(user)
+        except json.JSONDecodeError:
+            items = None
+        if isinstance(items, list) and all(isinstance(item, dict) and "id" in item for item in items):
+            answer = [{"id": item["id"], "sub_stat": auto_answer(json.dumps(item))} for item in items]
+        else:
+            answer = auto_answer(user)
+        return "```json\n" + json.dumps(answer, indent=4) + "\n```"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", default="lognormal:0.8,0.4", help="Latency distribution")
+    parser.add_argument("--latency-per-token", type=float, default=0.0, help="Seconds per completion token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 answers")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of 429 answers")
+    parser.add_argument("--rpm", type=int, default=None, help="Requests per minute before 429")
+    parser.add_argument("--mode", choices=["auto", "echo", "canned"], default="auto")
+    parser.add_argument("--canned", default="{}", help="Answer of the canned mode")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(args.port, args.latency, args.latency_per_token, args.error_rate,
+                              args.rate_limit_rate, args.rpm, args.mode, args.canned, seed=args.seed)
+    print(f"Mock OpenAI server listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Local stand-in for the sites the scrapers read, serving saved pages so the
+scrapers can run and be measured without touching the network.
+
+A directory of pages holds routes.json, mapping URL paths to the files served
+for them (e.g. "/star-rail/characters": "characters.html"). Pages are sent with
+an ETag and a matching If-None-Match gets a 304, like the real sites, so a
+caching `Fetcher` revalidates them. tests/fixtures/pages holds small pages with
+the markup of every scraper.
+
+Usage:
+    python benchmark/page_server.py --pages tests/fixtures/pages --port 8001
+    then scrape e.g. http://127.0.0.1:8001/star-rail/characters
+"""
+import os
+import json
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+class PageServer:
+    """
+    Page server running in a background thread.
+
+    Args:
+        pages_dir (str): Directory of the pages and their routes.json
+        port (int): Port to listen on, 0 for any free port
+    """
+
+    def __init__(self, pages_dir: str, port: int = 0) -> None:
+        self.pages_dir = pages_dir
+        with open(os.path.join(pages_dir, "routes.json"), 'r', encoding='utf-8') as f:
+            self.routes: Dict[str, str] = json.load(f)
+        self.stats = {"requests": 0, "not_modified": 0}
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                with server._lock:
+                    server.stats["requests"] += 1
+                name = server.routes.get(self.path)
+                if name is None:
+                    self.send_error(404)
+                    return
+                with open(os.path.join(server.pages_dir, name), 'rb') as f:
+                    body = f.read()
+                etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    with server._lock:
+                        server.stats["not_modified"] += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._thread: Optional[threading.Thread] = None
+
+    def local_url(self, url: str) -> str:
+        """
+        URL of this server serving the path of `url`, e.g.
+        "https://www.prydwen.gg/star-rail/characters" -> "http://127.0.0.1:PORT/star-rail/characters".
+        """
+        return self.url + urlparse(url).path
+
+    def start(self) -> "PageServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "PageServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", required=True, help="Directory of the pages and their routes.json")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+
+    server = PageServer(args.pages, args.port)
+    print(f"Serving {len(server.routes)} pages of {args.pages} on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
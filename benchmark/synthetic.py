@@ -0,0 +1,177 @@
+"""
+Synthetic relic data shared by the estimator benchmarks, so they run without
+scraped files or a real inventory.
+
+RELIC_STATUS has the structure of relic_status.json (see `scrape_relic_stats`)
+with the game's slot to main stat rules. Relics are 5-star +15 relics rolled
+with the game's sub stat weights and roll tiers.
+"""
+import os
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.estimator.stats import StatVocabulary, main_stat_value
+
+
+RELIC_STATUS = {
+    "main_stat": {
+        "head": ["hp"],
+        "hands": ["atk"],
+        "body": ["hp%", "atk%", "def%", "effect_hit_rate%", "outgoing_healing_boost%", "crit_rate%", "crit_dmg%"],
+        "feet": ["hp%", "atk%", "def%", "spd"],
+        "planarsphere": ["hp%", "atk%", "def%", "physical_dmg_boost%", "fire_dmg_boost%", "ice_dmg_boost%",
+                         "lightning_dmg_boost%", "wind_dmg_boost%", "quantum_dmg_boost%", "imaginary_dmg_boost%"],
+        "linkrope": ["hp%", "atk%", "def%", "break_effect%", "energy_regeneration_rate%"]
+    },
+    "sub_stat": ["spd", "hp", "atk", "def", "hp%", "atk%", "def%", "break_effect%",
+                 "effect_hit_rate%", "effect_res%", "crit_rate%", "crit_dmg%"]
+}
+
+PATHS = ["destruction", "hunt", "erudition", "nihility", "harmony", "preservation", "abundance"]
+ELEMENTS = ["physical", "fire", "ice", "lightning", "wind", "quantum", "imaginary"]
+TRACES = ["crit_rate", "crit_dmg", "atk", "hp", "def", "spd", "break_effect", "effect_hit_rate", "effect_res"]
+
+
+def vocabulary() -> StatVocabulary:
+    return StatVocabulary(RELIC_STATUS["sub_stat"], RELIC_STATUS["main_stat"])
+
+
+def set_names(relic_sets: int = 24, planar_sets: int = 12) -> Dict[str, List[str]]:
+    return {
+        "relic": [f"relic_set_{i:02d}" for i in range(relic_sets)],
+        "planar": [f"planar_set_{i:02d}" for i in range(planar_sets)]
+    }
+
+
+def random_characters(count: int, seed: int = 0) -> Dict[str, Dict]:
+    """
+    Characters with the structure of character.json entries.
+    """
+    rng = np.random.default_rng(seed)
+    characters = dict()
+    for i in range(count):
+        traces = rng.choice(TRACES, size=2, replace=False)
+        characters[f"character_{i:03d}"] = {
+            "rate": str(rng.choice(["4", "5"])),
+            "element": str(rng.choice(ELEMENTS)),
+            "path": str(rng.choice(PATHS)),
+            "sub_stat": {str(trace): f"{rng.integers(10, 30)}{'' if trace == 'spd' else '%'}" for trace in traces},
+            "basic_stat": {"hp": str(rng.integers(900, 1400)), "atk": str(rng.integers(500, 750)),
+                           "def": str(rng.integers(400, 650)), "spd": str(rng.integers(94, 115))}
+        }
+    return characters
+
+
+def _draw_stats(vocab: StatVocabulary, count: int, rng: np.random.Generator):
+    slots = rng.integers(0, len(vocab.slots), size=count).astype(np.int8)
+
+    # Main stat: uniform among the main stats allowed in the slot
+    allowed = vocab.main_mask[slots]
+    main = np.argmax(np.where(allowed, rng.random(allowed.shape), -1.0), axis=1).astype(np.int16)
+
+    # Four distinct sub stats, weighted, never the main stat (Gumbel top-k, which
+    # orders them like successive draws)
+    weights = vocab.sub_chance
+    keys = np.log(np.where(weights > 0, weights, 1e-300)) - np.log(-np.log(rng.random((count, len(vocab)))))
+    keys[:, weights == 0] = -np.inf
+    keys[np.arange(count), main] = -np.inf
+    sub = np.argsort(-keys, axis=1)[:, :4].astype(np.int16)
+    return slots, main, sub
+
+
+def random_relics(vocab: StatVocabulary, count: int, seed: int = 0,
+                  relic_sets: int = 24, planar_sets: int = 12) -> Dict[str, np.ndarray]:
+    """
+    Random +15 5-star relics, in the encoding of `encode_relics` plus a "set" column
+    (index into the relic sets for head to feet, into the planar sets for the sphere
+    and rope, offset by `relic_sets`).
+    """
+    rng = np.random.default_rng(seed)
+    slots, main, sub = _draw_stats(vocab, count, rng)
+
+    # 4 initial rolls plus 4 or 5 upgrade rolls, each of tier 8, 9 or 10 tenths of a high roll
+    extra = rng.integers(4, 6, size=count)
+    upgrades = rng.integers(0, 4, size=(count, 5))
+    upgrades = np.where(np.arange(5) < extra[:, None], upgrades, -1)
+    rolls = 1 + (upgrades[:, :, None] == np.arange(4)).sum(axis=1)
+    tiers = rng.integers(8, 11, size=(count, 4, 6))
+    tier_sum = np.where(np.arange(6) < rolls[:, :, None], tiers, 0).sum(axis=2)
+    sub_value = (vocab.roll_values[sub] * tier_sum / 10).astype(np.float32)
+
+    planar = np.isin(slots, [vocab.slot_index("planarsphere"), vocab.slot_index("linkrope")])
+    sets = np.where(planar, relic_sets + rng.integers(0, planar_sets, size=count),
+                    rng.integers(0, relic_sets, size=count)).astype(np.int16)
+    return {
+        "slot": slots,
+        "set": sets,
+        "main": main,
+        "main_value": vocab.main_max[main],
+        "sub": sub,
+        "sub_value": sub_value
+    }
+
+
+def random_new_relics(vocab: StatVocabulary, count: int, seed: int = 0,
+                      four_sub_rate: float = 0.2) -> Dict[str, np.ndarray]:
+    """
+    Random +0 5-star relics, in the encoding of `encode_relics` plus a "level"
+    column. A relic drops with 4 sub stats at `four_sub_rate`, else with 3.
+    """
+    rng = np.random.default_rng(seed)
+    slots, main, sub = _draw_stats(vocab, count, rng)
+    sub[rng.random(count) >= four_sub_rate, 3] = -1
+    tiers = rng.integers(8, 11, size=(count, 4))
+    sub_value = np.where(sub >= 0, vocab.roll_values[sub] * tiers / 10, 0).astype(np.float32)
+    return {
+        "slot": slots,
+        "level": np.zeros(count, dtype=np.int8),
+        "main": main,
+        "main_value": main_stat_value(vocab.main_max[main], 0),
+        "sub": sub,
+        "sub_value": sub_value
+    }
+
+
+def to_relic_dicts(vocab: StatVocabulary, relics: Dict[str, np.ndarray], start: int = 0, end: int = None,
+                   relic_sets: int = 24) -> List[Dict]:
+    """
+    Writes encoded relics (see `random_relics`) as the dicts of a JSON export, with
+    display names and string values the way exports usually have them.
+    """
+    names = set_names(relic_sets, 0)["relic"] + set_names(0, 1000)["planar"]
+    display = {name: name.replace("_", " ").title().replace("%", "") for name in vocab.names}
+    dicts = list()
+    for i in range(start, len(relics["slot"]) if end is None else end):
+        dicts.append({
+            "set": names[relics["set"][i]].replace("_", " ").title(),
+            "slot": vocab.slots[relics["slot"][i]],
+            "rarity": 5,
+            "level": 15,
+            "main_stat": vocab.names[relics["main"][i]],
+            "sub_stats": {display[vocab.names[s]]: f"{v:.1f}%" if vocab.names[s].endswith("%") else round(float(v), 1)
+                          for s, v in zip(relics["sub"][i], relics["sub_value"][i])}
+        })
+    return dicts
+
+
+def random_set_bonuses(relic_sets: int = 24, planar_sets: int = 12, seed: int = 0) -> Dict[str, Dict[int, Dict]]:
+    """
+    Set bonuses in the format of `BuildOptimizer`: a stat for the 2 piece effect
+    and one for the 4 piece effect of relic sets, a stat for planar sets.
+    """
+    rng = np.random.default_rng(seed)
+    effects = [("atk%", 12), ("hp%", 12), ("def%", 15), ("crit_rate%", 8), ("crit_dmg%", 16),
+               ("break_effect%", 16), ("effect_hit_rate%", 10), ("effect_res%", 10), ("spd%", 6),
+               ("energy_regeneration_rate%", 5), ("quantum_dmg_boost%", 10), ("fire_dmg_boost%", 10)]
+    names = set_names(relic_sets, planar_sets)
+    bonuses = dict()
+    for name in names["relic"]:
+        two, four = rng.choice(len(effects), size=2, replace=False)
+        bonuses[name] = {2: dict([effects[two]]), 4: dict([effects[four]])}
+    for name in names["planar"]:
+        bonuses[name] = {2: dict([effects[rng.integers(len(effects))]])}
+    return bonuses
@@ -32,4 +32,38 @@ You are given one or more information of a lightcone, weapon from a game. Each o
 EXTRACT_SUB_STAT_FROM_RELIC = \
 """
 
-""".strip()
\ No newline at end of file
+""".strip()
+
+EXTRACT_SUB_STAT_FROM_LIGHTCONE_BATCH = \
+"""
+You are given a list of lightcones, weapons from a game, as a JSON array. Each of them contains an id, which is the name of the lightcone, and a description of the ability of that lightcone. You need to identify and extract the sub stat of every lightcone based on the available sub stat.
+
+### Steps
+1. Analyze the ability's description of each lightcone separately.
+2. Identify the lightcone's sub-stat appear in available list and extract values and sign of these values of this sub-stat.
+3. Identify the lightcone's sub-stat not appear in available list, extract values and sign of these values of this sub-stat.
+4. If the identifed sub-stat has any condition to activate, add notes to this.
+5. Return in format.
+- The result should return as one JSON array below, with exactly one element for each input lightcone
+- Copy the "id" of each input lightcone unchanged into its element
+
+### JSON Format:
+```json
+[
+    {
+        "id": "id of the lightcone",
+        "sub_stat": {
+            "sub_stat_name": {
+                "values": "values of sub-stat",
+                "notes": "note of sub-stat"
+            }
+        }
+    }
+]
+```
+
+### Input:
+<JSON array of lightcones>
+
+### Response:
+""".strip()
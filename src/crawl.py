@@ -1,29 +1,57 @@
 import os
 import json
-import time
-import random
 import string
 import re
-from typing import Optional, Dict, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple, Union
+from urllib.parse import urljoin
 
 import requests
 from bs4 import BeautifulSoup
 from tqdm import tqdm
-from Levenshtein import ratio
-import numpy as np
 
-from src.utils.check import check_exist_json_file
 from src.utils.print import print_title
-
-def scrape_relic_sets(url: str, save_path: str) -> None:
+from src.utils.fetch import Fetcher
+from src.utils.download import ImageDownloader
+from src.utils.parse import make_soup, class_strainer
+from src.utils.match import NameIndex, print_match_report
+from src.utils.fingerprint import fingerprint, new_change_report, print_change_report
+from src.utils.store import open_store
+
+
+# Parser backend used by every scraper: "auto", "lxml" or "html.parser"
+PARSER = "auto"
+
+# Only the containers each scraper reads are built into a tree
+STRAINERS = {
+    "relic_sets": class_strainer("div", "relic-set-container"),
+    "relic_stats": class_strainer("table", "wikitable"),
+    "lightcones": class_strainer("div", "relic-set-container"),
+    "lightcone_images": class_strainer("div", "clearfix"),
+    "characters": class_strainer("div", "employees-container"),
+    "character_info": class_strainer("div", "right-image", "character-intro",
+                                     "content-header", "smaller-traces", "stat-box")
+}
+
+def scrape_relic_sets(url: str, save_path: str,
+                      fetcher: Optional[Fetcher] = None) -> Dict[str, List[str]]:
     """
     Scrapes relic set data from a given URL and saves it to a JSON file.
 
     Args:
         url (str): The URL to scrape relic set data from
         save_path (str): Path where the JSON file will be saved
+        fetcher (Fetcher, optional): Fetch layer used for the request. Defaults
+            to an uncached `Fetcher`
+        
+    Returns:
+        dict: Names of the relic sets that were "added", "changed" or "removed"
         
-    The data is saved as a JSON file with the following structure:
+    Each relic set is committed to a SQLite store next to the JSON file as soon as it
+    is parsed (see `src.utils.store`), together with a fingerprint of its HTML block.
+    A rerun, e.g. after a crash, only parses the sets whose block changed. Sets no
+    longer listed are deleted from the store, and the JSON file is exported from the
+    store at the end, so it matches a fresh scrape. The data is saved as a JSON file with the following structure:
     {
         "relic_name": {
             "type": str,
@@ -37,22 +65,19 @@ def scrape_relic_sets(url: str, save_path: str) -> None:
     if not os.path.exists(parent_path):
         os.makedirs(parent_path)
 
-    relics = check_exist_json_file(save_path)
-    relic_name_list = list(relics.keys())
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    store = open_store(save_path)
+    changes = new_change_report()
+    fetcher = fetcher or Fetcher()
 
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = make_soup(fetcher.get(url), STRAINERS["relic_sets"], PARSER)
 
         # Find the table with relic sets
         relic_sets = soup.find('div', class_='relic-set-container row row-cols-xxl-2 row-cols-1')
         relic_cols = relic_sets.find_all('div', class_='col')
         
         print_title("Scraping relic sets")
+        seen = set()
         for i, relic in tqdm(
             enumerate(relic_cols, start=1), 
             total=len(relic_cols)
@@ -63,10 +88,10 @@ def scrape_relic_sets(url: str, save_path: str) -> None:
             relic_name = re.split(r'[^a-zA-Z0-9\s]', relic_name)
             relic_name = list(filter(lambda x: x.strip(), relic_name))
             relic_name = '_'.join(relic_name)
-            if (len(relic_name_list) > 0) and (relic_name in relic_name_list):
+            seen.add(relic_name)
+            relic_fingerprint = fingerprint(relic)
+            if store.get_fingerprint(relic_name) == relic_fingerprint:
                 continue
-            else:
-                print(f"{i}. \"{relic_name}\" doesn't exist. ADDING")
 
             relic_type = relic_data.find("div", class_="hsr-relic-info").find("strong").get_text(strip=True).lower().replace(' ', '_')
             relic_content = relic.find("div", class_="hsr-relic-content").find("div").find_all("div")
@@ -75,86 +100,92 @@ def scrape_relic_sets(url: str, save_path: str) -> None:
             if len(relic_content) == 2:
                 relic_4_set = relic_content[1].get_text(strip=True)
             
-            relics[relic_name] = {
+            relic = {
                 "type": relic_type,
                 "image": relic_image_url,
                 "2_piece_effect": relic_2_set,
                 "4_piece_effect": relic_4_set if len(relic_content) == 2 else None
             }
+            stored_relic = store.get(relic_name)
+            if stored_relic is None:
+                print(f"{i}. \"{relic_name}\" doesn't exist. ADDING")
+                changes["added"].append(relic_name)
+            elif stored_relic != relic:
+                print(f"{i}. \"{relic_name}\" has changed. UPDATING")
+                changes["changed"].append(relic_name)
+            store.put(relic_name, relic, relic_fingerprint)
             # break
+        changes["removed"] = [name for name in store.names() if name not in seen]
+        store.delete_many(changes["removed"])
+
         # Save to JSON file
-        with open(save_path, 'w', encoding='utf-8') as f:
-            json.dump(relics, f, indent=4, ensure_ascii=False)
+        store.export_json(save_path)
 
+        print_change_report(changes)
         print("Relic data has been successfully scraped and saved!")
 
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+    finally:
+        store.close()
+    return changes
 
 
-def download_images(json_path: str, save_dir: str) -> None:
+def download_images(json_path: str, save_dir: str,
+                    max_workers: int = 8,
+                    rate: float = 4.0) -> Dict[str, float]:
     """
     Downloads images from URLs specified in a JSON file and saves them to a directory.
     
     Args:
         json_path (str): Path to the JSON file containing image URLs
         save_dir (str): Directory where the images will be saved
+        max_workers (int): Number of concurrent downloads
+        rate (float): Maximum number of downloads started per second
+        
+    Returns:
+        dict: Summary with the number of "downloaded", "skipped" and "failed"
+            images, the downloaded "bytes" and the elapsed "time" in seconds
         
     The JSON file should have a structure where each entry contains an 'image' field
     with the URL to download. Images are saved with the key name from the JSON file,
-    with special characters removed. Adds random delays between downloads to avoid
-    overwhelming the server.
+    with special characters removed. Downloads run in parallel under a token-bucket
+    rate limit, are resumed after interruptions and are stored content-addressed, so
+    a URL that was already downloaded is never fetched again (see `ImageDownloader`).
     """
     # Load the JSON file
     with open(json_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
 
-    # Ensure the save directory exists
-    exist_images = list()
-    if not os.path.exists(save_dir):
-        os.makedirs(save_dir)
-    else:
-        exist_images = os.listdir(save_dir)
-
-    print_title("Downloading images")
-    # Iterate through the relic sets and download images
-    for i, (name, info) in enumerate(data.items(), start=1):
+    images = dict()
+    for name, info in data.items():
         name = re.split(r'[^a-zA-Z0-9\s]', name)
         name = list(filter(lambda x: x.strip(), name))
         name = '_'.join(name)
-        if (len(exist_images) > 0) and (f"{name}.png" in exist_images):
-            continue
-
         image_url = info.get("image")
         if image_url:
-            try:
-                # Random delay between 3 and 6 seconds
-                delay = random.uniform(1, 3)
-                time.sleep(delay)
+            images[name] = image_url
 
-                # Get the image content
-                response = requests.get(image_url, stream=True)
-                response.raise_for_status()
-
-                # Save the image to the specified directory
-                image_path = os.path.join(save_dir, f"{name}.png")
-                with open(image_path, 'wb') as img_file:
-                    for chunk in response.iter_content(1024):
-                        img_file.write(chunk)
+    print_title("Downloading images")
+    downloader = ImageDownloader(save_dir, max_workers=max_workers, rate=rate)
+    summary = downloader.download(images)
 
-                print(f"{i}. Downloaded: {name} (Delay: {delay:.2f} seconds)")
-            except Exception as e:
-                print(f"Failed to download {name}: {e}")
+    print(f"Downloaded {summary['downloaded']}, skipped {summary['skipped']}, "
+          f"failed {summary['failed']} ({summary['bytes'] / 1024:.1f} KB in {summary['time']:.2f} seconds)")
     print(f"All images have been downloaded at \"{save_dir}\"!")
+    return summary
 
 
-def scrape_relic_stats(url: str, save_path: str) -> None:
+def scrape_relic_stats(url: str, save_path: str,
+                       fetcher: Optional[Fetcher] = None) -> None:
     """
     Scrapes relic stat information from a given URL and saves it to a JSON file.
     
     Args:
         url (str): The URL to scrape relic stat data from
         save_path (str): Path where the JSON file will be saved
+        fetcher (Fetcher, optional): Fetch layer used for the request. Defaults
+            to an uncached `Fetcher`
         
     Extracts information about main stats available for each relic slot and possible
     sub stats. The data is saved as a JSON file with the structure:
@@ -167,15 +198,11 @@ def scrape_relic_stats(url: str, save_path: str) -> None:
         "sub_stat": [list of all possible sub stats]
     }
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    fetcher = fetcher or Fetcher()
 
     try:
         # Send a GET request to the URL
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = make_soup(fetcher.get(url), STRAINERS["relic_stats"], PARSER)
 
         # Find the table containing "Main Stat" and "Sub Stat"
         table = soup.find_all('table', {'class': 'wikitable'})
@@ -217,7 +244,8 @@ def scrape_relic_stats(url: str, save_path: str) -> None:
         print(f"An error occurred: {e}")
 
 
-def scrape_lightcones(url_info: str, url_image: str, save_path: str) -> None:
+def scrape_lightcones(url_info: str, url_image: str, save_path: str,
+                      fetcher: Optional[Fetcher] = None) -> Dict[str, List[str]]:
     """
     Scrapes lightcone data from two URLs (info and images) and saves it to a JSON file.
     
@@ -225,10 +253,19 @@ def scrape_lightcones(url_info: str, url_image: str, save_path: str) -> None:
         url_info (str): URL to scrape lightcone information from
         url_image (str): URL to scrape lightcone images from
         save_path (str): Path where the JSON file will be saved
+        fetcher (Fetcher, optional): Fetch layer used for the requests. Defaults
+            to an uncached `Fetcher`
+        
+    Returns:
+        dict: Names of the lightcones that were "added", "changed" or "removed"
         
     First collects image URLs from url_image, then matches them with lightcone
-    information from url_info using name similarity. The data is saved as a JSON
-    file with the structure:
+    information from url_info using name similarity (see `NameIndex`). Lightcones
+    without a confident match are reported and saved with image None. Each
+    lightcone is committed to the store as soon as it is parsed, and only the
+    lightcones whose HTML block or image changed since the last run are parsed
+    again (see `scrape_relic_sets`). The data is saved as a JSON file with the
+    structure:
     {
         "lightcone_name": {
             "image": str,
@@ -242,81 +279,97 @@ def scrape_lightcones(url_info: str, url_image: str, save_path: str) -> None:
     if not os.path.exists(parent_path):
         os.makedirs(parent_path)
 
-    lightcones = check_exist_json_file(save_path)
-    exist_lightcone_list = list(lightcones.keys())
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    store = open_store(save_path)
+    changes = new_change_report()
+    fetcher = fetcher or Fetcher()
 
-    # Get lightcone
-    lightcone_image_dict = dict()
-    response = requests.get(url_image, headers=headers)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.content, 'html.parser')
-    lightcone_body_html = soup.find("div", class_="clearfix")
-    lightcone_list_html = lightcone_body_html.find_all("div")
-    for i in range(0, len(lightcone_list_html), 3):
-        lightcone_image_url = lightcone_list_html[i].find("img")["src"]
-        lightcone_name = lightcone_list_html[i + 2].get_text().strip().split('\n')[0].strip()
-        lightcone_name = lightcone_name.replace(' ', '_').lower()
-        lightcone_image_dict[lightcone_name] = lightcone_image_url
-        # break
-    lightcone_name_list = list(lightcone_image_dict.keys())
-
-    # Get lightcone info
-    response = requests.get(url_info, headers=headers)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.content, 'html.parser')
+    try:
+        # Get lightcone
+        lightcone_image_dict = dict()
+        soup = make_soup(fetcher.get(url_image), STRAINERS["lightcone_images"], PARSER)
+        lightcone_body_html = soup.find("div", class_="clearfix")
+        lightcone_list_html = lightcone_body_html.find_all("div")
+        for i in range(0, len(lightcone_list_html), 3):
+            lightcone_image_url = lightcone_list_html[i].find("img")["src"]
+            lightcone_name = lightcone_list_html[i + 2].get_text().strip().split('\n')[0].strip()
+            lightcone_name = lightcone_name.replace(' ', '_').lower()
+            lightcone_image_dict[lightcone_name] = lightcone_image_url
+            # break
+        image_index = NameIndex(lightcone_image_dict.keys())
+        matches = list()
+
+        # Get lightcone info
+        soup = make_soup(fetcher.get(url_info), STRAINERS["lightcones"], PARSER)
     
-    lightcone_sets = soup.find('div', class_='relic-set-container row row-cols-xxl-2 row-cols-1')
-    lightcone_cols = lightcone_sets.find_all('div', class_='col')
-
-    print_title("Scraping lightcones")
-    for i, lightcone in tqdm(
-        enumerate(lightcone_cols, start=1), 
-        total=len(lightcone_cols)
-    ):
+        lightcone_sets = soup.find('div', class_='relic-set-container row row-cols-xxl-2 row-cols-1')
+        lightcone_cols = lightcone_sets.find_all('div', class_='col')
+
+        print_title("Scraping lightcones")
+        seen = set()
+        for i, lightcone in tqdm(
+            enumerate(lightcone_cols, start=1), 
+            total=len(lightcone_cols)
+        ):
         
-        lightcone_data = lightcone.find("div", class_="hsr-cone-data")
-        lightcone_name = lightcone_data.find("h4").get_text(strip=True).lower().replace(' ', '_')
-        lightcone_name = re.split(r'[^a-zA-Z0-9\s]', lightcone_name)
-        lightcone_name = list(filter(lambda x: x.strip(), lightcone_name))
-        lightcone_name = '_'.join(lightcone_name)
-        if (len(exist_lightcone_list) > 0) and (lightcone_name in exist_lightcone_list):
+            lightcone_data = lightcone.find("div", class_="hsr-cone-data")
+            lightcone_name = lightcone_data.find("h4").get_text(strip=True).lower().replace(' ', '_')
+            lightcone_name = re.split(r'[^a-zA-Z0-9\s]', lightcone_name)
+            lightcone_name = list(filter(lambda x: x.strip(), lightcone_name))
+            lightcone_name = '_'.join(lightcone_name)
+            seen.add(lightcone_name)
+
+            ## Find closest lightcone name
+            match = image_index.match(lightcone_name)
+            matches.append(match)
+            lightcone_image_url = lightcone_image_dict[match.key] if match.key else None
+
+            lightcone_fingerprint = fingerprint(lightcone, lightcone_image_url)
+            if store.get_fingerprint(lightcone_name) == lightcone_fingerprint:
                 continue
-        else:
-            print(f"{i}. \"{lightcone_name}\" doesn't exist. ADDING")
 
-        lightcone_type = lightcone_data.find("div", class_="hsr-cone-info").find_all("strong")
-        lightcone_rate = lightcone_type[0].get_text(strip=True)[0].lower()
-        lightcone_path = lightcone_type[1].get_text(strip=True).lower()
+            lightcone_type = lightcone_data.find("div", class_="hsr-cone-info").find_all("strong")
+            lightcone_rate = lightcone_type[0].get_text(strip=True)[0].lower()
+            lightcone_path = lightcone_type[1].get_text(strip=True).lower()
 
-        lightcone_content = lightcone.find("div", class_="hsr-cone-content").get_text().strip()
-        
-        ## Find closest lightcone name
-        name_ratio_list = [ratio(lightcone_name, name) for name in lightcone_name_list]
-        max_index = np.argmax(name_ratio_list)
-        lightcone_name_max_ratio = lightcone_name_list[max_index]
+            lightcone_content = lightcone.find("div", class_="hsr-cone-content").get_text().strip()
         
-        lightcones[lightcone_name] = {
-            "image": lightcone_image_dict[lightcone_name_max_ratio],
-            "rate": lightcone_rate,
-            "type": lightcone_path,
-            "ability": lightcone_content,
-        }
-    # Save to JSON file
-    with open(save_path, 'w', encoding='utf-8') as f:
-        json.dump(lightcones, f, indent=4, ensure_ascii=False)
+            lightcone = {
+                "image": lightcone_image_url,
+                "rate": lightcone_rate,
+                "type": lightcone_path,
+                "ability": lightcone_content,
+            }
+            stored_lightcone = store.get(lightcone_name)
+            if stored_lightcone is None:
+                print(f"{i}. \"{lightcone_name}\" doesn't exist. ADDING")
+                changes["added"].append(lightcone_name)
+            elif stored_lightcone != lightcone:
+                print(f"{i}. \"{lightcone_name}\" has changed. UPDATING")
+                changes["changed"].append(lightcone_name)
+            store.put(lightcone_name, lightcone, lightcone_fingerprint)
+        changes["removed"] = [name for name in store.names() if name not in seen]
+        store.delete_many(changes["removed"])
+        print_match_report(matches)
 
+        # Save to JSON file
+        store.export_json(save_path)
+    finally:
+        store.close()
+
+    print_change_report(changes)
     print("Relic data has been successfully scraped and saved!")
+    return changes
 
 
-def scarpe_character_info(url: str) -> Dict[str, Union[str, Dict[str, str]]]:
+def scarpe_character_info(url: str,
+                          fetcher: Optional[Fetcher] = None) -> Dict[str, Union[str, Dict[str, str]]]:
     """
     Scrapes detailed information about a character from a specific URL.
     
     Args:
         url (str): URL of the character page to scrape
+        fetcher (Fetcher, optional): Fetch layer used for the request. Defaults
+            to an uncached `Fetcher`
         
     Returns:
         dict: A dictionary containing character information with the following structure:
@@ -330,18 +383,33 @@ def scarpe_character_info(url: str) -> Dict[str, Union[str, Dict[str, str]]]:
                 "basic_stat": {stat_name: value}
             }
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-
-    character_info = dict()
+    fetcher = fetcher or Fetcher()
 
     try:
         # Send a GET request to the URL
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = make_soup(fetcher.get(url), STRAINERS["character_info"], PARSER)
+    except Exception as e:
+        print(f"Error fetching character page: {e} - URL: {url}")
+        return dict()
+    
+    return parse_character_info(soup, url)
+
+
+def parse_character_info(soup: BeautifulSoup, url: str) -> Dict[str, Union[str, Dict[str, str]]]:
+    """
+    Parses a character page that was already fetched (see `scarpe_character_info`).
+
+    Args:
+        soup (BeautifulSoup): Character page, parsed with STRAINERS["character_info"]
+        url (str): URL of the character page, used for the character name
+
+    Returns:
+        dict: Character information, same structure as `scarpe_character_info`.
+            Parsing stops at the first missing field and returns what was found
+    """
+    character_info = dict()
 
+    try:
         # Name
         character_name = url.split("/")[-1].replace("-", "_").lower()
         character_info["name"] = character_name
@@ -391,17 +459,32 @@ def scarpe_character_info(url: str) -> Dict[str, Union[str, Dict[str, str]]]:
     return character_info
 
 
-def scrape_characters(url: str, save_path: str) -> None:
+def scrape_characters(url: str, save_path: str,
+                      max_workers: int = 8,
+                      rate_limit: Optional[float] = None,
+                      fetcher: Optional[Fetcher] = None) -> Dict[str, List[str]]:
     """
     Scrapes character data from a given URL and saves it to a JSON file.
     
     Args:
         url (str): The URL to scrape character data from
         save_path (str): Path where the JSON file will be saved
+        max_workers (int): Number of character pages fetched and parsed concurrently
+        rate_limit (float, optional): Maximum requests per second sent to one host.
+            None disables limiting. Only used when `fetcher` is not given
+        fetcher (Fetcher, optional): Fetch layer shared by all requests. Defaults
+            to an uncached `Fetcher` limited by `rate_limit`
+        
+    Returns:
+        dict: Names of the characters that were "added", "changed" or "removed"
         
     Scrapes basic information about all characters from the main character list page,
-    then collects detailed information for each character. The data is saved as a JSON
-    file with the structure:
+    then collects detailed information for each character. Character pages are fetched
+    concurrently, but the results are stored in the order of the character list. Each
+    character is committed to the store as soon as it is parsed. Every character page
+    is fetched (cheap with a caching `Fetcher`), but only the pages whose content
+    changed since the last run are parsed again (see `scrape_relic_sets`). The data is
+    saved as a JSON file with the structure:
     {
         "character_name": {
             "image": str,
@@ -417,45 +500,73 @@ def scrape_characters(url: str, save_path: str) -> None:
     if not os.path.exists(parent_path):
         os.makedirs(parent_path)
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    character_dict = check_exist_json_file(save_path)
-    exist_character_list = list(character_dict.keys())
-
-    # Send a GET request to the URL
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.content, 'html.parser')
-    all_characters = soup.find('div', class_='employees-container hsr-cards').find_all("div", class_="avatar-card card")
+    store = open_store(save_path)
+    changes = new_change_report()
+    fetcher = fetcher or Fetcher(rate_limit=rate_limit)
+
+    try:
+        # Send a GET request to the URL
+        soup = make_soup(fetcher.get(url), STRAINERS["characters"], PARSER)
+        all_characters = soup.find('div', class_='employees-container hsr-cards').find_all("div", class_="avatar-card card")
     
-    print_title("Scraping characters")
-    for i, card in tqdm(
-        enumerate(all_characters, start=1), 
-        total=len(all_characters)
-    ):
+        print_title("Scraping characters")
+        character_urls = list()
+        for i, card in enumerate(all_characters, start=1):
         
-        future_character = card.find("span", class_="tag future")
+            future_character = card.find("span", class_="tag future")
 
-        if not future_character:
-            character_url = "https://www.prydwen.gg" + card.find('a')["href"]
-            character_name = character_url.split("/")[-1].replace("-", "_").lower()
-            if (len(exist_character_list) > 0) and (character_name in exist_character_list):
-                continue
+            if not future_character:
+                character_url = urljoin(url, card.find('a')["href"])
+                character_urls.append(character_url)
             else:
-                print(f"{i}. {character_name} doesn't exist. ADDING")
-
-            character_name = url.split("/")[-1].replace("-", "_").lower()
-            character_info = scarpe_character_info(character_url)
-            character_name = character_info.pop("name")
-            character_dict[character_name] = character_info
-        else:
-            name = card.find("span", class_="emp-name").get_text()
-            print(f"{i}. Future Character: {name}")
-            continue
-    # Save the extracted data to a JSON file
-    with open(save_path, 'w', encoding='utf-8') as f:
-        json.dump(character_dict, f, indent=4, ensure_ascii=False)
+                name = card.find("span", class_="emp-name").get_text()
+                print(f"{i}. Future Character: {name}")
+                continue
+
+        # The store connection belongs to this thread, workers only read this snapshot
+        known_fingerprints = {name: store.get_fingerprint(name) for name in store.names()}
 
+        def fetch_character(character_url: str) -> Tuple[Optional[str], Optional[Dict[str, Union[str, Dict[str, str]]]]]:
+            character_name = character_url.split("/")[-1].replace("-", "_").lower()
+            try:
+                soup = make_soup(fetcher.get(character_url), STRAINERS["character_info"], PARSER)
+            except Exception as e:
+                print(f"Error fetching character page: {e} - URL: {character_url}")
+                return None, None
+
+            character_fingerprint = fingerprint(soup)
+            if known_fingerprints.get(character_name) == character_fingerprint:
+                return character_fingerprint, None
+            return character_fingerprint, parse_character_info(soup, character_url)
+
+        # map() keeps the order of character_urls whatever order the pages finish in
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for character_fingerprint, character_info in tqdm(
+                executor.map(fetch_character, character_urls),
+                total=len(character_urls)
+            ):
+                if (character_info is None) or ("name" not in character_info):
+                    continue
+                character_name = character_info.pop("name")
+                stored_character = store.get(character_name)
+                if stored_character is None:
+                    print(f"{character_name} doesn't exist. ADDING")
+                    changes["added"].append(character_name)
+                elif stored_character != character_info:
+                    print(f"{character_name} has changed. UPDATING")
+                    changes["changed"].append(character_name)
+                store.put(character_name, character_info, character_fingerprint)
+
+        seen = set(character_url.split("/")[-1].replace("-", "_").lower() for character_url in character_urls)
+        changes["removed"] = [name for name in store.names() if name not in seen]
+        store.delete_many(changes["removed"])
+
+        # Save the extracted data to a JSON file
+        store.export_json(save_path)
+    finally:
+        store.close()
+
+    print_change_report(changes)
     print(f"Character data have been successfully scraped and saved to {save_path}!")
+    return changes
 
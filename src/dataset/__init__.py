@@ -0,0 +1,4 @@
+from src.dataset.models import (Character, Lightcone, RelicSet, RelicStats, StringColumn, EntityTable,
+                                CharacterTable, LightconeTable, RelicSetTable)
+from src.dataset.snapshot import (Dataset, load_dataset, load_table, load_characters, load_lightcones,
+                                  load_relic_sets, load_relic_stats)
@@ -0,0 +1,399 @@
+import re
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+NUMBER = re.compile(r"[-+]?\d+(?:\.\d+)?")
+
+
+def parse_number(text: Union[str, int, float, None]) -> float:
+    """
+    Parses the number of a scraped value, e.g. "1,047" -> 1047.0, "+12%" -> 12.0.
+
+    Returns:
+        float: The first number of the text, NaN if there is none
+    """
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = NUMBER.search(str(text or "").replace(",", ""))
+    return float(match.group()) if match else float("nan")
+
+
+def parse_stats(stats: Optional[Dict[str, str]]) -> Dict[str, float]:
+    """
+    Parses a {stat: text} mapping of character.json, e.g. {"crit_rate": "12%",
+    "spd": "5"} -> {"crit_rate%": 12.0, "spd": 5.0}. Percentages get a "%"
+    suffix, like the names of `StatVocabulary`, so they can't be mistaken for
+    flat values.
+    """
+    parsed = dict()
+    for name, value in (stats or dict()).items():
+        if "%" in str(value) and not name.endswith("%"):
+            name = f"{name}%"
+        parsed[name] = parse_number(value)
+    return parsed
+
+
+def format_stats(stats: Dict[str, float]) -> Dict[str, str]:
+    """
+    Inverse of `parse_stats`, back to the text values of character.json.
+    """
+    return {name[:-1] if name.endswith("%") else name: f"{value:g}{'%' if name.endswith('%') else ''}"
+            for name, value in stats.items()}
+
+
+class Character:
+    """
+    A character of character.json (see `scrape_characters`), with its numbers
+    parsed.
+
+    Args:
+        name (str): Character name
+        image (str): Image URL
+        rarity (int): 4 or 5 stars
+        element (str): Element, e.g. "quantum"
+        path (str): Path, e.g. "hunt"
+        sub_stat (dict): Trace stats {stat: value}, see `parse_stats`
+        basic_stat (dict): Base stats {"hp", "atk", "def", "spd": value}
+    """
+
+    __slots__ = ("name", "image", "rarity", "element", "path", "sub_stat", "basic_stat")
+
+    def __init__(self, name: str, image: str, rarity: int, element: str, path: str,
+                 sub_stat: Dict[str, float], basic_stat: Dict[str, float]) -> None:
+        self.name = name
+        self.image = image
+        self.rarity = rarity
+        self.element = element
+        self.path = path
+        self.sub_stat = sub_stat
+        self.basic_stat = basic_stat
+
+    @classmethod
+    def from_json(cls, name: str, entry: Dict) -> "Character":
+        rarity = parse_number(entry.get("rate"))
+        return cls(name, entry.get("image") or "", 0 if rarity != rarity else int(rarity),
+                   entry.get("element") or "", entry.get("path") or "",
+                   parse_stats(entry.get("sub_stat")), parse_stats(entry.get("basic_stat")))
+
+    def to_json(self) -> Dict:
+        """
+        Returns:
+            dict: The character.json entry, numbers as text again
+        """
+        return {"image": self.image, "rate": str(self.rarity), "element": self.element, "path": self.path,
+                "sub_stat": format_stats(self.sub_stat), "basic_stat": format_stats(self.basic_stat)}
+
+    def __repr__(self) -> str:
+        return f"Character({self.name!r}, {self.rarity}*, {self.element}, {self.path})"
+
+
+class Lightcone:
+    """
+    A lightcone of lightcone_info.json (see `scrape_lightcones`).
+
+    Args:
+        name (str): Lightcone name
+        image (str): Image URL
+        rarity (int): 3 to 5 stars
+        path (str): Path of the characters that benefit from it, the "type" field
+        ability (str): Ability text
+    """
+
+    __slots__ = ("name", "image", "rarity", "path", "ability")
+
+    def __init__(self, name: str, image: str, rarity: int, path: str, ability: str) -> None:
+        self.name = name
+        self.image = image
+        self.rarity = rarity
+        self.path = path
+        self.ability = ability
+
+    @classmethod
+    def from_json(cls, name: str, entry: Dict) -> "Lightcone":
+        rarity = parse_number(entry.get("rate"))
+        return cls(name, entry.get("image") or "", 0 if rarity != rarity else int(rarity),
+                   entry.get("type") or "", entry.get("ability") or "")
+
+    def to_json(self) -> Dict:
+        return {"image": self.image, "rate": str(self.rarity), "type": self.path, "ability": self.ability}
+
+    def __repr__(self) -> str:
+        return f"Lightcone({self.name!r}, {self.rarity}*, {self.path})"
+
+
+class RelicSet:
+    """
+    A relic or planar set of relic_info.json (see `scrape_relic_sets`).
+
+    Args:
+        name (str): Set name
+        image (str): Image URL
+        kind (str): "relic_set" or "planar_set", the "type" field
+        two_piece (str): 2-piece effect text
+        four_piece (str, optional): 4-piece effect text, None for planar sets
+    """
+
+    __slots__ = ("name", "image", "kind", "two_piece", "four_piece")
+
+    def __init__(self, name: str, image: str, kind: str, two_piece: str, four_piece: Optional[str]) -> None:
+        self.name = name
+        self.image = image
+        self.kind = kind
+        self.two_piece = two_piece
+        self.four_piece = four_piece
+
+    @classmethod
+    def from_json(cls, name: str, entry: Dict) -> "RelicSet":
+        return cls(name, entry.get("image") or "", entry.get("type") or "",
+                   entry.get("2_piece_effect") or "", entry.get("4_piece_effect"))
+
+    def to_json(self) -> Dict:
+        return {"type": self.kind, "image": self.image,
+                "2_piece_effect": self.two_piece, "4_piece_effect": self.four_piece}
+
+    def __repr__(self) -> str:
+        return f"RelicSet({self.name!r}, {self.kind})"
+
+
+class RelicStats:
+    """
+    The stats relics can roll, from relic_status.json (see `scrape_relic_stats`).
+
+    Args:
+        main_stat (dict): {slot: [main stat names]}
+        sub_stat (list): Sub stat names
+    """
+
+    __slots__ = ("main_stat", "sub_stat")
+
+    def __init__(self, main_stat: Dict[str, List[str]], sub_stat: List[str]) -> None:
+        self.main_stat = main_stat
+        self.sub_stat = sub_stat
+
+    @classmethod
+    def from_json(cls, js: Dict) -> "RelicStats":
+        return cls({slot: list(names) for slot, names in (js.get("main_stat") or dict()).items()},
+                   list(js.get("sub_stat") or list()))
+
+    def to_json(self) -> Dict:
+        return {"main_stat": self.main_stat, "sub_stat": self.sub_stat}
+
+    def __repr__(self) -> str:
+        return f"RelicStats({len(self.main_stat)} slots, {len(self.sub_stat)} sub stats)"
+
+
+class StringColumn:
+    """
+    Strings packed in one UTF-8 buffer, decoded on access. Holding the bytes
+    instead of str objects takes about the size of the text, without the ~50
+    bytes of every Python object.
+
+    Args:
+        data (np.ndarray): uint8 buffer of the concatenated strings
+        offsets (np.ndarray): (N + 1,) int64 start of each string, the last one
+            the end of the buffer
+        present (np.ndarray, optional): (N,) bool, False for None strings
+    """
+
+    __slots__ = ("data", "offsets", "present")
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, present: Optional[np.ndarray] = None) -> None:
+        self.data = data
+        self.offsets = offsets
+        self.present = present
+
+    @classmethod
+    def from_strings(cls, strings: Sequence[Optional[str]]) -> "StringColumn":
+        encoded = [(string or "").encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        present = np.array([string is not None for string in strings], dtype=bool)
+        return cls(data, offsets, None if present.all() else present)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        if self.present is not None and not self.present[i]:
+            return None
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        # One copy of the whole buffer, then slices of it
+        text = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        strings = [text[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+        if self.present is not None:
+            strings = [string if present else None for string, present in zip(strings, self.present.tolist())]
+        return iter(strings)
+
+    def arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        arrays = {f"{prefix}.data": self.data, f"{prefix}.offsets": self.offsets}
+        if self.present is not None:
+            arrays[f"{prefix}.present"] = self.present
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str) -> "StringColumn":
+        return cls(arrays[f"{prefix}.data"], arrays[f"{prefix}.offsets"], arrays.get(f"{prefix}.present"))
+
+
+class EntityTable:
+    """
+    Array-backed table of entities, one row per record of a JSON file.
+
+    Subclasses declare their fields by kind: `strings` are packed into
+    `StringColumn`s ("name" first), `codes` are categories stored as int16
+    indices into `categories`, `numbers` are (field, dtype) columns and `stats`
+    are {stat: value} mappings stored as CSR rows (offsets, stat index, value),
+    so a table is a handful of flat arrays however many rows it has. Rows are
+    built into `record` objects on access, by index or name.
+
+    Args:
+        arrays (dict): Flat arrays of the columns, see `from_records`
+        categories (dict): Category names of the `codes` and `stats` fields
+    """
+
+    record = object
+    strings: Tuple[str, ...] = ("name",)
+    codes: Tuple[str, ...] = ()
+    numbers: Tuple[Tuple[str, type], ...] = ()
+    stats: Tuple[str, ...] = ()
+
+    def __init__(self, arrays: Dict[str, np.ndarray], categories: Dict[str, List[str]]) -> None:
+        self.arrays = arrays
+        self.categories = categories
+        self._strings = {field: StringColumn.from_arrays(arrays, field) for field in self.strings}
+        self._index = None
+
+    @classmethod
+    def from_records(cls, records: List) -> "EntityTable":
+        arrays, categories = dict(), dict()
+        for field in cls.strings:
+            arrays.update(StringColumn.from_strings([getattr(record, field) for record in records]).arrays(field))
+        for field in cls.codes:
+            values = [getattr(record, field) for record in records]
+            categories[field] = sorted(set(values))
+            lookup = {value: i for i, value in enumerate(categories[field])}
+            arrays[field] = np.array([lookup[value] for value in values], dtype=np.int16)
+        for field, dtype in cls.numbers:
+            arrays[field] = np.array([getattr(record, field) for record in records], dtype=dtype)
+        for field in cls.stats:
+            rows = [getattr(record, field) for record in records]
+            categories[field] = sorted({name for row in rows for name in row})
+            lookup = {name: i for i, name in enumerate(categories[field])}
+            offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+            np.cumsum([len(row) for row in rows], out=offsets[1:])
+            arrays[f"{field}.offsets"] = offsets
+            arrays[f"{field}.stat"] = np.array([lookup[name] for row in rows for name in row], dtype=np.int16)
+            arrays[f"{field}.value"] = np.array([value for row in rows for value in row.values()], dtype=np.float32)
+        return cls(arrays, categories)
+
+    @classmethod
+    def from_json(cls, js: Dict[str, Dict]) -> "EntityTable":
+        return cls.from_records([cls.record.from_json(name, entry) for name, entry in js.items()])
+
+    def __len__(self) -> int:
+        return len(self._strings["name"])
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._strings["name"])
+
+    def row(self, name: str) -> int:
+        """
+        Returns:
+            int: Row of the entity, KeyError if there is none
+        """
+        if self._index is None:
+            self._index = {name: i for i, name in enumerate(self._strings["name"])}
+        return self._index[name]
+
+    def __contains__(self, name: str) -> bool:
+        try:
+            self.row(name)
+        except KeyError:
+            return False
+        return True
+
+    def column(self, field: str) -> Union[np.ndarray, List]:
+        """
+        Returns:
+            np.ndarray: Values of a number field, category indices of a code
+                field (see `categories`), or a list of the strings of a string field
+        """
+        if field in self._strings:
+            return list(self._strings[field])
+        return self.arrays[field]
+
+    def stat_matrix(self, field: str, names: Sequence[str]) -> np.ndarray:
+        """
+        Dense (N, len(names)) matrix of a stats field, 0 where an entity doesn't
+        have the stat.
+        """
+        lookup = {name: i for i, name in enumerate(names)}
+        columns = np.array([lookup.get(name, -1) for name in self.categories[field]] or [-1], dtype=np.int64)
+        offsets = self.arrays[f"{field}.offsets"]
+        rows = np.repeat(np.arange(len(self)), np.diff(offsets))
+        stats = columns[self.arrays[f"{field}.stat"].astype(np.int64)]
+        keep = stats >= 0
+        matrix = np.zeros((len(self), len(names)), dtype=np.float32)
+        np.add.at(matrix, (rows[keep], stats[keep]), self.arrays[f"{field}.value"][keep])
+        return matrix
+
+    def _fields(self, i: int) -> Dict:
+        fields = {field: column[i] for field, column in self._strings.items()}
+        for field in self.codes:
+            fields[field] = self.categories[field][self.arrays[field][i]]
+        for field, _ in self.numbers:
+            fields[field] = self.arrays[field][i].item()
+        for field in self.stats:
+            start, end = self.arrays[f"{field}.offsets"][i:i + 2]
+            names = self.categories[field]
+            fields[field] = {names[s]: float(v) for s, v in zip(self.arrays[f"{field}.stat"][start:end].tolist(),
+                                                                   self.arrays[f"{field}.value"][start:end].tolist())}
+        return fields
+
+    def __getitem__(self, key: Union[int, str]):
+        i = self.row(key) if isinstance(key, str) else key
+        if not -len(self) <= i < len(self):
+            raise IndexError(key)
+        return self.record(**self._fields(i % len(self)))
+
+    def __iter__(self) -> Iterator:
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_json(self) -> Dict[str, Dict]:
+        """
+        Returns:
+            dict: {name: entry} like the JSON file the table was built from
+        """
+        return {record.name: record.to_json() for record in self}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} rows)"
+
+
+class CharacterTable(EntityTable):
+    record = Character
+    strings = ("name", "image")
+    codes = ("element", "path")
+    numbers = (("rarity", np.int8),)
+    stats = ("sub_stat", "basic_stat")
+
+
+class LightconeTable(EntityTable):
+    record = Lightcone
+    strings = ("name", "image", "ability")
+    codes = ("path",)
+    numbers = (("rarity", np.int8),)
+
+
+class RelicSetTable(EntityTable):
+    record = RelicSet
+    strings = ("name", "image", "two_piece", "four_piece")
+    codes = ("kind",)
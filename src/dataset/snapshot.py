@@ -0,0 +1,221 @@
+import os
+import json
+import mmap
+import math
+import struct
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+from src.dataset.models import CharacterTable, EntityTable, LightconeTable, RelicSetTable, RelicStats
+
+
+SNAPSHOT_VERSION = 1
+
+# File layout: magic, little-endian uint64 header length, JSON header, then the
+# arrays, each aligned to ALIGNMENT bytes so they can be viewed in place
+SNAPSHOT_MAGIC = b"HSRSNAP\0"
+ALIGNMENT = 64
+
+# Files of `load_dataset`, as saved by the scrapers
+DATA_FILES = {
+    "characters": "character.json",
+    "lightcones": "lightcone_info.json",
+    "relic_sets": "relic_info.json",
+    "relic_stats": "relic_status.json"
+}
+
+
+def snapshot_path(json_path: str) -> str:
+    """
+    Returns the path of the snapshot kept next to a data file,
+    e.g. "character.json" -> "character.snapshot".
+    """
+    root, _ = os.path.splitext(json_path)
+    return f"{root}.snapshot"
+
+
+def _file_signature(path: str) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_snapshot(path: str, arrays: Dict[str, np.ndarray], meta: Dict) -> None:
+    """
+    Writes arrays and a JSON-serializable meta to a snapshot file, atomically.
+
+    Args:
+        path (str): Snapshot file
+        arrays (dict): {name: array}, any fixed-size dtype
+        meta (dict): Stored in the header, returned as is by `read_snapshot`
+    """
+    layout, offset = dict(), 0
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[name] = [array.dtype.str, list(array.shape), offset]
+        offset += array.nbytes
+    header = json.dumps({"version": SNAPSHOT_VERSION, "meta": meta, "arrays": layout}).encode("utf-8")
+    start = -(-(len(SNAPSHOT_MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC + struct.pack("<Q", len(header)) + header)
+        for name, array in arrays.items():
+            f.seek(start + layout[name][2])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(start + offset)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict]]:
+    """
+    Maps a snapshot file written by `write_snapshot`. The arrays are read-only
+    views of the mapped file, so only the pages that are used are read.
+
+    Returns:
+        tuple: (arrays, meta), None if the file is missing, truncated or of
+            another version
+    """
+    try:
+        with open(path, 'rb') as f:
+            magic = f.read(len(SNAPSHOT_MAGIC))
+            length, = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(length).decode("utf-8"))
+            if magic != SNAPSHOT_MAGIC or header.get("version") != SNAPSHOT_VERSION:
+                return None
+            start = -(-(len(SNAPSHOT_MAGIC) + 8 + length) // ALIGNMENT) * ALIGNMENT
+            size = os.fstat(f.fileno()).st_size
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size > start else b""
+    except (OSError, ValueError, struct.error, UnicodeDecodeError, json.JSONDecodeError):
+        return None
+
+    arrays = dict()
+    for name, (dtype, shape, offset) in header["arrays"].items():
+        count = math.prod(shape)
+        if start + offset + np.dtype(dtype).itemsize * count > size:
+            return None
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=start + offset).reshape(shape)
+    return arrays, header["meta"]
+
+
+def _load(json_path: str, build, force: bool) -> Tuple[Dict[str, np.ndarray], Dict]:
+    # Snapshot of a JSON file, rebuilt when the file's size or mtime changed
+    path = snapshot_path(json_path)
+    signature = _file_signature(json_path)
+    if not force:
+        snapshot = read_snapshot(path)
+        if snapshot is not None and snapshot[1].get("source") == signature:
+            return snapshot
+    with open(json_path, 'r', encoding="utf-8") as f:
+        arrays, meta = build(json.load(f))
+    meta = {**meta, "source": signature}
+    try:
+        write_snapshot(path, arrays, meta)
+    except OSError:
+        # Read-only data directory: the tables still work, from the JSON
+        pass
+    return arrays, meta
+
+
+def load_table(json_path: str, table_type: Type[EntityTable], force: bool = False) -> EntityTable:
+    """
+    Loads character.json, lightcone_info.json or relic_info.json into a table,
+    from its snapshot (see `snapshot_path`) unless the file changed since.
+
+    Args:
+        json_path (str): Path to the JSON file
+        table_type (type): CharacterTable, LightconeTable or RelicSetTable
+        force (bool): Parse the JSON and rewrite the snapshot even if it is up to date
+
+    Returns:
+        EntityTable: The table
+    """
+    def build(js: Dict) -> Tuple[Dict[str, np.ndarray], Dict]:
+        table = table_type.from_json(js)
+        return table.arrays, {"table": table_type.__name__, "categories": table.categories}
+
+    arrays, meta = _load(json_path, build, force)
+    if meta.get("table") != table_type.__name__:
+        arrays, meta = _load(json_path, build, force=True)
+    return table_type(arrays, meta["categories"])
+
+
+def load_characters(character_path: str, force: bool = False) -> CharacterTable:
+    return load_table(character_path, CharacterTable, force)
+
+
+def load_lightcones(lightcone_path: str, force: bool = False) -> LightconeTable:
+    return load_table(lightcone_path, LightconeTable, force)
+
+
+def load_relic_sets(relic_info_path: str, force: bool = False) -> RelicSetTable:
+    return load_table(relic_info_path, RelicSetTable, force)
+
+
+def load_relic_stats(relic_stats_path: str, force: bool = False) -> RelicStats:
+    def build(js: Dict) -> Tuple[Dict[str, np.ndarray], Dict]:
+        return dict(), {"relic_stats": RelicStats.from_json(js).to_json()}
+
+    _, meta = _load(relic_stats_path, build, force)
+    if "relic_stats" not in meta:
+        _, meta = _load(relic_stats_path, build, force=True)
+    return RelicStats.from_json(meta["relic_stats"])
+
+
+class Dataset:
+    """
+    The scraped data files as typed tables, see `load_dataset`.
+
+    Attributes:
+        characters (CharacterTable): character.json
+        lightcones (LightconeTable): lightcone_info.json
+        relic_sets (RelicSetTable): relic_info.json
+        relic_stats (RelicStats): relic_status.json
+    """
+
+    __slots__ = ("characters", "lightcones", "relic_sets", "relic_stats")
+
+    def __init__(self, characters: CharacterTable, lightcones: LightconeTable,
+                 relic_sets: RelicSetTable, relic_stats: RelicStats) -> None:
+        self.characters = characters
+        self.lightcones = lightcones
+        self.relic_sets = relic_sets
+        self.relic_stats = relic_stats
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Size of the arrays of the tables, an upper bound of their resident memory
+        when they are mapped from snapshots.
+        """
+        return sum(array.nbytes for table in (self.characters, self.lightcones, self.relic_sets)
+                   for array in table.arrays.values())
+
+    def __repr__(self) -> str:
+        return (f"Dataset({len(self.characters)} characters, {len(self.lightcones)} lightcones, "
+                f"{len(self.relic_sets)} relic sets)")
+
+
+def load_dataset(data_dir: str, force: bool = False) -> Dataset:
+    """
+    Loads the files of `scrape_characters`, `scrape_lightcones`, `scrape_relic_sets`
+    and `scrape_relic_stats` from a directory. Each JSON file is parsed once into
+    a snapshot next to it, which later loads map instead, until the JSON file
+    changes (see `load_table`). Missing files give empty tables.
+
+    Args:
+        data_dir (str): Directory of character.json, lightcone_info.json,
+            relic_info.json and relic_status.json
+        force (bool): Parse every JSON file again
+
+    Returns:
+        Dataset: The tables
+    """
+    def load(kind: str, loader, empty):
+        path = os.path.join(data_dir, DATA_FILES[kind])
+        return loader(path, force) if os.path.exists(path) else empty()
+
+    return Dataset(load("characters", load_characters, lambda: CharacterTable.from_records(list())),
+                   load("lightcones", load_lightcones, lambda: LightconeTable.from_records(list())),
+                   load("relic_sets", load_relic_sets, lambda: RelicSetTable.from_records(list())),
+                   load("relic_stats", load_relic_stats, lambda: RelicStats(dict(), list())))
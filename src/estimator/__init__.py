@@ -0,0 +1,8 @@
+from src.estimator.stats import StatVocabulary
+from src.estimator.scoring import RelicScorer
+from src.estimator.inventory import RelicInventory
+from src.estimator.upgrade import UpgradeEstimator
+from src.estimator.optimizer import BuildOptimizer
+from src.estimator.team import TeamOptimizer
+from src.estimator.modifiers import ModifierTable, compile_modifiers
+from src.estimator.damage import DamageCalculator
@@ -0,0 +1,245 @@
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from src.dataset.models import Character, CharacterTable
+from src.estimator.modifiers import ModifierTable, modifier_stat
+from src.estimator.scoring import scatter_stats
+from src.estimator.stats import StatVocabulary
+from src.estimator.team import base_stats
+from src.extractor.validate import SubStatNormalizer
+
+
+# Stats every character has before relics and traces
+BASE_CRIT_RATE = 5.0
+BASE_CRIT_DMG = 50.0
+
+# Level multiplier of break damage, for a level 80 character
+BREAK_LEVEL_MULTIPLIER = 3767.5533
+
+# Break damage of each element, relative to the level multiplier
+BREAK_ELEMENT_MULTIPLIER = {
+    "physical": 2.0, "fire": 2.0, "wind": 1.5, "ice": 1.0, "lightning": 1.0, "quantum": 0.5, "imaginary": 0.5
+}
+
+# Toughness multiplier of an enemy whose weakness is not broken
+UNBROKEN_MULTIPLIER = 0.9
+
+# Enemy and buff state of a scenario when not given
+SCENARIO_DEFAULTS = {
+    "enemy_level": 95,
+    "enemy_res%": 20.0,
+    "def_reduction%": 0.0,
+    "res_penetration%": 0.0,
+    "vulnerability%": 0.0,
+    "toughness": 60.0,
+    "broken": False,
+    "conditional": True
+}
+
+# character.json entries by name, their typed table (see `load_characters`) or
+# their records
+Characters = Union[Dict[str, Dict], CharacterTable, Sequence[Character]]
+
+# Stat columns the damage depends on, "element_dmg%" is the DMG boost of each
+# character's element
+DAMAGE_STATS = ["hp", "hp%", "atk", "atk%", "def", "def%", "spd", "spd%", "crit_rate%", "crit_dmg%",
+                "break_effect%", "dmg%", "element_dmg%"]
+
+
+def character_records(characters: Characters) -> List[Character]:
+    """
+    Typed records of characters, parsing character.json entries once (see
+    `Character.from_json`).
+    """
+    if isinstance(characters, dict):
+        return [Character.from_json(name, entry) for name, entry in characters.items()]
+    return list(characters)
+
+
+class DamageCalculator:
+    """
+    Effective stats and damage of characters with lightcones, relic builds and
+    buff states, all combinations at once.
+
+    Stats of every source are gathered into the few columns the damage depends
+    on (`DAMAGE_STATS`) and laid on their own axis, characters (N) x
+    lightcones (M) x builds (K) x scenarios (B), so the totals are one
+    broadcast sum and the damage formula runs once on (N, M, K, B) arrays.
+
+    A hit deals multiplier x scaling stat x DMG bonus x DEF x RES x
+    vulnerability x toughness multipliers, where the DEF multiplier is
+    (level + 20) / ((enemy level + 20) x (1 - DEF reduction) + level + 20).
+    The crit-averaged damage weighs it by 1 + crit rate x crit DMG. Break
+    damage is the level multiplier x the element's multiplier x (0.5 +
+    toughness / 40) x (1 + break effect), with the same DEF, RES and
+    vulnerability multipliers.
+
+    Args:
+        vocab (StatVocabulary): Stat vocabulary
+        table (ModifierTable): Compiled lightcone and set modifiers, see
+            `compile_modifiers`, whose stats are the columns of the vectors
+        level (int): Level of the characters
+    """
+
+    def __init__(self, vocab: StatVocabulary, table: ModifierTable, level: int = 80) -> None:
+        self.vocab = vocab
+        self.table = table
+        self.level = level
+        self._normalizer = SubStatNormalizer(vocab.names)
+        self._columns = np.array([table.stat_index.get(name, -1) for name in DAMAGE_STATS], dtype=np.int64)
+
+    def character_vectors(self, characters: Characters) -> Dict[str, np.ndarray]:
+        """
+        Base stats and trace stats of characters, see `character_records`.
+
+        Returns:
+            dict: "base" (N, 4) HP, ATK, DEF and SPD, "stats" (N, stats) trace
+                stats in the columns of the table, "element" (N,) column of the
+                element's DMG boost, -1 if unknown, and "break" (N,) break
+                multiplier of the element
+        """
+        records = character_records(characters)
+        base = np.zeros((len(records), 4), dtype=np.float64)
+        stats = np.zeros((len(records), len(self.table.stats)), dtype=np.float64)
+        element = np.full(len(records), -1, dtype=np.int64)
+        breaks = np.zeros(len(records), dtype=np.float64)
+        for n, character in enumerate(records):
+            basic = base_stats(character)
+            base[n] = [basic.get(stat, 0.0) for stat in ("hp", "atk", "def", "spd")]
+            # Trace names already carry the "%" of percentages, see `parse_stats`
+            for trace, value in character.sub_stat.items():
+                stat = modifier_stat(self._normalizer, self.vocab, trace, "%" if trace.endswith("%") else "")
+                if stat in self.table.stat_index and value == value:
+                    stats[n, self.table.stat_index[stat]] += value
+            element[n] = self.table.stat_index.get(f"{character.element}_dmg_boost%", -1)
+            breaks[n] = BREAK_ELEMENT_MULTIPLIER.get(character.element, 0.0)
+        return {"base": base, "stats": stats, "element": element, "break": breaks}
+
+    def build_vectors(self, relics: Dict[str, np.ndarray], builds: List[Dict],
+                      set_names: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Stat totals of relic builds, main stats, sub stats and unconditional set
+        bonuses.
+
+        Args:
+            relics: Relics with "set", "main", "main_value", "sub" and "sub_value"
+                columns
+            builds (list): Builds of `BuildOptimizer.optimize`, or lists of relic indices
+            set_names (list, optional): Set names, indexed by the "set" column,
+                to add the set bonuses of the table
+
+        Returns:
+            np.ndarray: (K, stats) totals in the columns of the table
+        """
+        size = len(self.table.stats)
+        vectors = np.zeros((len(builds), size), dtype=np.float64)
+        for b, build in enumerate(builds):
+            indices = np.array(list(build["relics"].values()) if isinstance(build, dict) else build, dtype=np.int64)
+            sub = np.asarray(relics["sub"])[indices]
+            dense = scatter_stats(sub, np.asarray(relics["sub_value"])[indices], size).sum(axis=0)
+            np.add.at(dense, np.asarray(relics["main"])[indices], np.asarray(relics["main_value"])[indices])
+            vectors[b] = dense
+            if set_names is None:
+                continue
+            pieces = dict()
+            for s in np.asarray(relics["set"])[indices]:
+                if 0 <= s < len(set_names):
+                    pieces[set_names[s]] = pieces.get(set_names[s], 0) + 1
+            for count in (2, 4):
+                complete = [name for name, n in pieces.items() if n >= count]
+                if complete:
+                    vectors[b] += self.table.vectors(complete, pieces=count).sum(axis=0)
+        return vectors
+
+    def evaluate(self, characters: Characters, lightcones: List[str], builds: np.ndarray,
+                 scenarios: List[Dict], superimposition: int = 1,
+                 lightcone_base: Optional[Dict[str, Dict[str, float]]] = None,
+                 multipliers: Optional[Dict[str, float]] = None,
+                 scaling: Optional[Dict[str, str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Effective stats and damage of every character, lightcone, build and
+        scenario.
+
+        Args:
+            characters: character.json entries by name, or a `CharacterTable`, N
+            lightcones (list): Lightcone names of the table, M
+            builds (np.ndarray): (K, stats) relic stat totals, see `build_vectors`
+            scenarios (list): B dicts of buffs {stat name: value} in the columns of
+                the table, e.g. {"atk%": 48}, and enemy state, see `SCENARIO_DEFAULTS`.
+                "conditional" applies the conditional lightcone modifiers
+            superimposition (int): Superimposition of the lightcones, 1 to 5
+            lightcone_base (dict, optional): {lightcone name: {"hp", "atk", "def"}}
+                base stats, added to the characters' ones
+            multipliers (dict, optional): {character name: skill multiplier},
+                1 (100%) if not given
+            scaling (dict, optional): {character name: "atk", "hp" or "def"}, the
+                stat the damage scales with, ATK if not given
+
+        Returns:
+            dict: (N, M, K, B) arrays "hp", "atk", "def", "spd", "crit_rate" and
+                "crit_dmg" (fractions), "damage" of a hit that doesn't crit,
+                "crit" of one that does, "expected" crit-averaged damage and
+                "break" damage
+        """
+        records = character_records(characters)
+        names = [character.name for character in records]
+        chars = self.character_vectors(records)
+        columns, has = np.maximum(self._columns[:-1], 0), self._columns[:-1] >= 0
+        elements = np.maximum(chars["element"], 0)
+
+        def gather(vectors: np.ndarray) -> np.ndarray:
+            # (X, stats) -> (N, X, DAMAGE_STATS), with the element column of each character
+            vectors = np.asarray(vectors, dtype=np.float64)
+            picked = np.where(has, vectors[:, columns], 0.0)
+            element = np.where(chars["element"] >= 0, vectors[:, elements], 0.0).T
+            return np.concatenate([np.broadcast_to(picked, (len(names),) + picked.shape), element[:, :, None]], axis=2)
+
+        scenario = [{**SCENARIO_DEFAULTS, **s} for s in scenarios]
+        buffs = np.zeros((len(scenario), len(self.table.stats)), dtype=np.float64)
+        for b, s in enumerate(scenario):
+            for name, value in s.items():
+                if name in self.table.stat_index and name not in SCENARIO_DEFAULTS:
+                    buffs[b, self.table.stat_index[name]] += value
+        conditional = np.array([bool(s["conditional"]) for s in scenario], dtype=np.float64)
+
+        always = self.table.vectors(lightcones, superimposition=superimposition)
+        sometimes = self.table.vectors(lightcones, superimposition=superimposition, conditional=True) - always
+        own = gather(chars["stats"])[np.arange(len(names)), np.arange(len(names))]
+        totals = (own[:, None, None, None, :]
+                  + gather(always)[:, :, None, None, :]
+                  + gather(sometimes)[:, :, None, None, :] * conditional[None, None, None, :, None]
+                  + gather(builds)[:, None, :, None, :]
+                  + gather(buffs)[:, None, None, :, :])
+        stat = dict(zip(DAMAGE_STATS, np.moveaxis(totals, -1, 0)))
+
+        lightcone_base = lightcone_base or dict()
+        cone = np.array([[lightcone_base.get(name, dict()).get(s, 0.0) for s in ("hp", "atk", "def")]
+                         for name in lightcones], dtype=np.float64).reshape(len(lightcones), 3)
+        base = chars["base"][:, None, :3] + cone[None, :, :]
+        result = dict()
+        for i, name in enumerate(("hp", "atk", "def")):
+            result[name] = base[:, :, i, None, None] * (1 + stat[f"{name}%"] / 100) + stat[name]
+        result["spd"] = chars["base"][:, 3, None, None, None] * (1 + stat["spd%"] / 100) + stat["spd"]
+        result["crit_rate"] = np.clip((BASE_CRIT_RATE + stat["crit_rate%"]) / 100, 0, 1)
+        result["crit_dmg"] = (BASE_CRIT_DMG + stat["crit_dmg%"]) / 100
+
+        enemy = {key: np.array([float(s[key]) for s in scenario]) for key in SCENARIO_DEFAULTS}
+        defense = (self.level + 20) / ((enemy["enemy_level"] + 20) * (1 - enemy["def_reduction%"] / 100)
+                                       + self.level + 20)
+        resistance = 1 - (enemy["enemy_res%"] - enemy["res_penetration%"]) / 100
+        taken = defense * resistance * (1 + enemy["vulnerability%"] / 100)
+        toughness = np.where(enemy["broken"] > 0, 1.0, UNBROKEN_MULTIPLIER)
+
+        scaling = scaling or dict()
+        multipliers = multipliers or dict()
+        scaled = np.stack([result[scaling.get(name, "atk")][n] for n, name in enumerate(names)]) \
+            if names else np.zeros_like(result["atk"])
+        skill = np.array([multipliers.get(name, 1.0) for name in names])[:, None, None, None]
+        result["damage"] = skill * scaled * (1 + (stat["dmg%"] + stat["element_dmg%"]) / 100) * taken * toughness
+        result["crit"] = result["damage"] * (1 + result["crit_dmg"])
+        result["expected"] = result["damage"] * (1 + result["crit_rate"] * result["crit_dmg"])
+        result["break"] = (BREAK_LEVEL_MULTIPLIER * chars["break"][:, None, None, None]
+                           * (0.5 + enemy["toughness"] / 40) * (1 + stat["break_effect%"] / 100)
+                           * taken * UNBROKEN_MULTIPLIER)
+        return result
@@ -0,0 +1,390 @@
+import os
+import re
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.estimator.stats import StatVocabulary, main_stat_value
+from src.utils.match import NameIndex
+
+
+INVENTORY_VERSION = 1
+
+MAX_SUBS = 4
+
+# One relic per record. Stats, slots, sets and accounts are stored as indices
+# into the lists of the inventory's meta.json
+RELIC_DTYPE = np.dtype([
+    ("account", np.int16),
+    ("set", np.int16),
+    ("slot", np.int8),
+    ("rarity", np.int8),
+    ("level", np.int8),
+    ("main", np.int16),
+    ("main_value", np.float32),
+    ("sub", np.int16, (MAX_SUBS,)),
+    ("sub_value", np.float32, (MAX_SUBS,))
+])
+
+
+COLON = re.compile(r"\s*:\s*")
+
+
+def iter_json_items(path: str, chunk_size: int = 1 << 20) -> Iterator[Tuple[Union[str, int], Any]]:
+    """
+    Iterates over the items of a JSON file whose top level is an array or an
+    object, reading `chunk_size` characters at a time, so only one item at a
+    time is held in memory.
+
+    Args:
+        path (str): Path of the JSON file
+        chunk_size (int): Characters read at once
+
+    Yields:
+        tuple: (index, value) for an array, (key, value) for an object
+
+    Raises:
+        ValueError: If the file is not a JSON array or object, or is truncated
+    """
+    decoder = json.JSONDecoder()
+    whitespace = re.compile(r"[\s,]*")
+
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, eof = "", False
+        # Leading whitespace may fill whole chunks
+        while not eof and not buffer.lstrip("﻿").strip():
+            chunk = f.read(chunk_size)
+            eof = len(chunk) < chunk_size
+            buffer += chunk
+        buffer = buffer.lstrip("﻿")
+        pos = whitespace.match(buffer).end()
+        if pos >= len(buffer) or buffer[pos] not in "[{":
+            raise ValueError(f"{path} is not a JSON array or object")
+        is_object = buffer[pos] == "{"
+        pos += 1
+        index = 0
+
+        while True:
+            pos = whitespace.match(buffer, pos).end()
+            item = None
+            if pos < len(buffer):
+                if buffer[pos] in "]}":
+                    return
+                try:
+                    item, end = _decode_item(decoder, buffer, pos, is_object)
+                except json.JSONDecodeError:
+                    item = None
+                # A value ending exactly at the end of the buffer may be cut, e.g. a number
+                if item is not None and end == len(buffer) and not eof:
+                    item = None
+
+            if item is None:
+                if eof:
+                    raise ValueError(f"{path} is truncated or invalid at character {pos}")
+                chunk = f.read(chunk_size)
+                eof = len(chunk) < chunk_size
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+
+            key, value = item
+            yield (key if is_object else index), value
+            index += 1
+            pos = end
+
+
+def _decode_item(decoder: json.JSONDecoder, buffer: str, pos: int, is_object: bool) -> Tuple[Tuple[Any, Any], int]:
+    key = None
+    if is_object:
+        key, pos = decoder.raw_decode(buffer, pos)
+        colon = COLON.match(buffer, pos)
+        if colon is None:
+            # The chunk ends between the key and its colon, or the colon is missing
+            raise json.JSONDecodeError("Expecting ':' delimiter", buffer, pos)
+        pos = colon.end()
+    value, end = decoder.raw_decode(buffer, pos)
+    return (key, value), end
+
+
+def _parse_value(value: Any) -> float:
+    if isinstance(value, str):
+        value = value.strip().rstrip("%").lstrip("+")
+    return float(value)
+
+
+class RelicInventory:
+    """
+    Relic inventory stored as a flat file of `RELIC_DTYPE` records, opened as a
+    NumPy memory map, plus a meta.json holding the stat vocabulary, slot, set
+    and account names the records index into.
+
+    Opening an inventory reads only meta.json; filters scan the records in
+    chunks, so memory stays flat whatever the size of the inventory.
+
+    Args:
+        path (str): Directory of the inventory
+        vocab (StatVocabulary): Stat vocabulary, needed to create a new inventory
+            and checked against the one of an existing inventory
+        set_names (list, optional): Set names of relic_info.json (see
+            `scrape_relic_sets`), used to seed the sets of a new inventory
+    """
+
+    def __init__(self, path: str, vocab: Optional[StatVocabulary] = None,
+                 set_names: Optional[List[str]] = None) -> None:
+        self.path = path
+        self.meta_path = os.path.join(path, "meta.json")
+        self.records_path = os.path.join(path, "relics.bin")
+
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self.meta = json.load(f)
+            if self.meta["version"] != INVENTORY_VERSION:
+                raise ValueError(f"Inventory version {self.meta['version']} is not supported")
+            if vocab is not None and vocab.names != self.meta["stats"]:
+                raise ValueError("The inventory was written with a different stat vocabulary")
+        else:
+            if vocab is None:
+                raise ValueError(f"No inventory at {path}, a vocabulary is needed to create one")
+            os.makedirs(path, exist_ok=True)
+            self.meta = {
+                "version": INVENTORY_VERSION,
+                "stats": vocab.names,
+                "slots": vocab.slots,
+                "sets": list(set_names or []),
+                "accounts": []
+            }
+            open(self.records_path, 'ab').close()
+            self._save_meta()
+
+        self.stats: List[str] = self.meta["stats"]
+        self.slots: List[str] = self.meta["slots"]
+        self.sets: List[str] = self.meta["sets"]
+        self.accounts: List[str] = self.meta["accounts"]
+        self._stat_index = {name: i for i, name in enumerate(self.stats)}
+        self._set_index = NameIndex(self.sets, threshold=0.9)
+        self._set_cache: Dict[str, int] = dict()
+        self._stat_cache: Dict[Tuple[str, bool], Optional[str]] = dict()
+        self._records: Optional[np.memmap] = None
+
+    def __len__(self) -> int:
+        return os.path.getsize(self.records_path) // RELIC_DTYPE.itemsize
+
+    @property
+    def records(self) -> np.ndarray:
+        """
+        Read-only memory map of all records.
+        """
+        if self._records is None or len(self._records) != len(self):
+            if len(self) == 0:
+                return np.zeros(0, dtype=RELIC_DTYPE)
+            self._records = np.memmap(self.records_path, dtype=RELIC_DTYPE, mode='r')
+        return self._records
+
+    def _save_meta(self) -> None:
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, indent=4)
+        os.replace(tmp_path, self.meta_path)
+
+    def set_id(self, name: str, add: bool = False) -> int:
+        """
+        Index of a set name, matched fuzzily against the known sets. Unknown sets
+        are added when `add` is True, otherwise -1 is returned.
+        """
+        if name in self._set_cache:
+            return self._set_cache[name]
+        match = self._set_index.match(name)
+        if match.key is not None and not match.ambiguous:
+            self._set_cache[name] = self.sets.index(match.key)
+        elif add:
+            self.sets.append(NameIndex.normalize(name))
+            self._set_index = NameIndex(self.sets, threshold=0.9)
+            self._set_cache[name] = len(self.sets) - 1
+        else:
+            return -1
+        return self._set_cache[name]
+
+    def account_id(self, name: str, add: bool = False) -> int:
+        if name in self.accounts:
+            return self.accounts.index(name)
+        if not add:
+            return -1
+        self.accounts.append(name)
+        return len(self.accounts) - 1
+
+    def slot_id(self, name: str) -> int:
+        key = re.sub(r"[^a-z]", "", name.lower())
+        return self.slots.index(key) if key in self.slots else -1
+
+    def append(self, records: np.ndarray) -> None:
+        """
+        Appends `RELIC_DTYPE` records and saves the names they refer to.
+        """
+        with open(self.records_path, 'ab') as f:
+            records.astype(RELIC_DTYPE, copy=False).tofile(f)
+        self._records = None
+        self._save_meta()
+
+    def encode(self, relic: Dict, vocab: StatVocabulary, account: int = -1) -> Tuple:
+        """
+        Encodes one relic dict:
+            {"set": str, "slot": str, "rarity": int, "level": int,
+             "main_stat": str, "main_value": float (optional),
+             "sub_stats": {stat name: value} or [[stat name, value], ...]}
+        Names are normalized (see `StatVocabulary.normalize`), and values may be
+        strings such as "3.24%". A missing main stat value is computed from the level.
+
+        Returns:
+            tuple: Record in the field order of `RELIC_DTYPE`
+
+        Raises:
+            ValueError: If the slot or a stat is unknown
+        """
+        slot = self.slot_id(str(relic["slot"]))
+        if slot < 0:
+            raise ValueError(f"Unknown slot \"{relic['slot']}\"")
+        level = int(relic.get("level", 15))
+
+        allowed = vocab.main_stats[self.slots[slot]]
+        main = self._normalize(vocab, relic["main_stat"], relic.get("main_value", ""))
+        if main is not None and main not in allowed:
+            # e.g. "HP" on body pieces, which only have HP%
+            main = self._normalize(vocab, relic["main_stat"], "" if main.endswith("%") else "%")
+        if main is None or main not in allowed:
+            raise ValueError(f"Main stat \"{relic['main_stat']}\" is not allowed on {relic['slot']}")
+        main = self._stat_index[main]
+        if relic.get("main_value") is not None:
+            main_value = _parse_value(relic["main_value"])
+        else:
+            main_value = float(main_stat_value(vocab.main_max[main], level))
+
+        sub_stats = relic.get("sub_stats", dict())
+        items = list(sub_stats.items() if isinstance(sub_stats, dict) else sub_stats)[:MAX_SUBS]
+        sub, sub_value = [-1] * MAX_SUBS, [0.0] * MAX_SUBS
+        for j, (name, value) in enumerate(items):
+            stat = self._normalize(vocab, name, value)
+            if stat is None or stat not in vocab.sub_stats:
+                raise ValueError(f"Unknown sub stat \"{name}\"")
+            sub[j] = self._stat_index[stat]
+            sub_value[j] = _parse_value(value)
+
+        set_id = self.set_id(str(relic["set"]), add=True) if relic.get("set") else -1
+        return (account, set_id, slot,
+                int(relic.get("rarity", 5)), level, main, main_value, sub, sub_value)
+
+    def _normalize(self, vocab: StatVocabulary, name: Any, value: Any) -> Optional[str]:
+        # Exports repeat the same few stat names, only fuzzy match each once
+        key = (str(name), isinstance(value, str) and value.strip().endswith("%"))
+        if key not in self._stat_cache:
+            self._stat_cache[key] = vocab.normalize(key[0], "%" if key[1] else "")
+        return self._stat_cache[key]
+
+    def filter(self, slot: Optional[Union[str, Iterable[str]]] = None,
+               set: Optional[Union[str, Iterable[str]]] = None,
+               main: Optional[Union[str, Iterable[str]]] = None,
+               account: Optional[str] = None,
+               min_level: Optional[int] = None,
+               chunk_size: int = 1 << 20) -> np.ndarray:
+        """
+        Finds the relics matching every given condition. Each of `slot`, `set` and
+        `main` is a name or a list of accepted names.
+
+        Returns:
+            np.ndarray: Indices of the matching records
+        """
+        conditions = list()
+        if slot is not None:
+            conditions.append(("slot", [self.slot_id(s) for s in _as_list(slot)]))
+        if set is not None:
+            conditions.append(("set", [self.set_id(s) for s in _as_list(set)]))
+        if main is not None:
+            conditions.append(("main", [self._stat_index.get(m, -2) for m in _as_list(main)]))
+        if account is not None:
+            conditions.append(("account", [self.account_id(account)]))
+
+        records = self.records
+        matches = list()
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            mask = np.ones(len(chunk), dtype=bool)
+            for field, values in conditions:
+                mask &= np.isin(chunk[field], values)
+            if min_level is not None:
+                mask &= chunk["level"] >= min_level
+            matches.append(np.flatnonzero(mask) + start)
+        return np.concatenate(matches) if matches else np.zeros(0, dtype=np.int64)
+
+    def take(self, indices: np.ndarray) -> np.ndarray:
+        """
+        Copies the records at `indices` into memory.
+        """
+        return np.asarray(self.records[indices])
+
+    def to_dict(self, record: np.void) -> Dict:
+        """
+        Decodes one record back into the dict format of `encode`.
+        """
+        return {
+            "account": self.accounts[record["account"]] if record["account"] >= 0 else None,
+            "set": self.sets[record["set"]] if record["set"] >= 0 else None,
+            "slot": self.slots[record["slot"]],
+            "rarity": int(record["rarity"]),
+            "level": int(record["level"]),
+            "main_stat": self.stats[record["main"]],
+            "main_value": float(record["main_value"]),
+            "sub_stats": {self.stats[s]: float(v) for s, v in zip(record["sub"], record["sub_value"]) if s >= 0}
+        }
+
+
+def _as_list(value: Union[str, Iterable[str]]) -> List[str]:
+    return [value] if isinstance(value, str) else list(value)
+
+
+def import_json(json_path: str, inventory: RelicInventory, vocab: StatVocabulary,
+                account: Optional[str] = None,
+                block_size: int = 1 << 16,
+                chunk_size: int = 1 << 20) -> Dict[str, int]:
+    """
+    Streams the relics of a JSON export into an inventory. The export is a JSON
+    array of relic dicts, or an object mapping ids to relic dicts (see
+    `RelicInventory.encode`). At most `block_size` encoded relics and one chunk of
+    the file are held in memory at a time.
+
+    Args:
+        json_path (str): Path of the JSON export
+        inventory (RelicInventory): Inventory to append to
+        vocab (StatVocabulary): Stat vocabulary of the inventory
+        account (str, optional): Account the relics belong to
+        block_size (int): Relics encoded before each write
+        chunk_size (int): Characters of the export read at once
+
+    Returns:
+        dict: Number of relics "imported" and "skipped" because they could not be encoded
+    """
+    account_id = inventory.account_id(account, add=True) if account is not None else -1
+    block = np.zeros(block_size, dtype=RELIC_DTYPE)
+    filled = 0
+    summary = {"imported": 0, "skipped": 0}
+
+    for key, relic in iter_json_items(json_path, chunk_size):
+        try:
+            block[filled] = inventory.encode(relic, vocab, account_id)
+        except (KeyError, ValueError, TypeError) as e:
+            summary["skipped"] += 1
+            print(f"Skipping relic {key}: {e}")
+            continue
+        filled += 1
+        if filled == block_size:
+            inventory.append(block)
+            summary["imported"] += filled
+            filled = 0
+    if filled:
+        inventory.append(block[:filled])
+        summary["imported"] += filled
+    elif summary["imported"] == 0:
+        # Still save the accounts and sets seen
+        inventory.append(block[:0])
+
+    print(f"Imported {summary['imported']} relics into \"{inventory.path}\", skipped {summary['skipped']}")
+    return summary
@@ -0,0 +1,286 @@
+import os
+import re
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.estimator.stats import StatVocabulary
+from src.extractor.pipeline import load_checkpoint
+from src.extractor.validate import SubStatNormalizer
+from src.utils.fingerprint import fingerprint
+
+
+# Bumped whenever the parsing or the table layout changes, so cached tables are rebuilt
+MODIFIER_VERSION = 1
+
+# Lightcone values are listed per superimposition, S1 to S5
+SUPERIMPOSITIONS = 5
+
+_NUMBER = r"\d+(?:\.\d+)?%?"
+_VALUES = rf"{_NUMBER}(?:\s*/\s*{_NUMBER})*"
+# Stat names are written capitalized, e.g. "CRIT Rate", "Effect Hit Rate", "Lightning DMG"
+_STAT = r"[A-Z][A-Za-z]*(?:[ -][A-Z][A-Za-z]*)*"
+
+# "Increases the wearer's CRIT DMG by 20%/23%/26%/29%/32%", "ATK increases by 12%".
+# Modifiers of enemies, e.g. "reduces the target's DEF", are left out
+EFFECT_PATTERNS = [
+    re.compile(rf"(?P<verb>(?i:increases|decreases|reduces|raises))\s+"
+               rf"(?:the\s+wearer's\s+|all\s+allies'\s+|its\s+|their\s+)?"
+               rf"(?P<stat>{_STAT})(?:\s+dealt)?\s+by\s+(?P<values>{_VALUES})"),
+    re.compile(rf"(?P<stat>{_STAT})\s+(?P<verb>increases|is increased|decreases|is decreased|is reduced)\s+by\s+"
+               rf"(?P<values>{_VALUES})")
+]
+
+# A sentence with any of these words only applies in some situations
+CONDITION_WORDS = re.compile(r"\b(when|whenever|after|if|while|each|every|upon|against|stacks?|turns?|"
+                             r"at the start|for \d+)\b", re.IGNORECASE)
+
+
+def parse_values(values: str) -> np.ndarray:
+    """
+    Values of each superimposition, e.g. "20%/23%/26%/29%/32%" or a single "12%"
+    used for all of them.
+    """
+    numbers = [float(number) for number in re.findall(r"\d+(?:\.\d+)?", values)]
+    if not numbers:
+        return np.zeros(SUPERIMPOSITIONS, dtype=np.float32)
+    numbers = numbers[:SUPERIMPOSITIONS]
+    return np.array(numbers + numbers[-1:] * (SUPERIMPOSITIONS - len(numbers)), dtype=np.float32)
+
+
+def modifier_stat(normalizer: SubStatNormalizer, vocab: StatVocabulary, name: str, values: str) -> str:
+    """
+    Name of a modified stat, in the vocabulary when it is a relic stat, e.g.
+    ("Lightning DMG", "10%") -> "lightning_dmg_boost%". A % of a flat stat, e.g.
+    ("SPD", "6%"), keeps the "%" ("spd%"), see `BuildOptimizer`.
+    """
+    stat = normalizer.normalize(name, values)
+    if "%" in values and not stat.endswith("%"):
+        stat = f"{stat}%"
+    if stat not in vocab and stat.endswith("%") and f"{stat[:-1]}_boost%" in vocab:
+        stat = f"{stat[:-1]}_boost%"
+    return stat
+
+
+def parse_effect(text: Optional[str], normalizer: SubStatNormalizer,
+                 vocab: StatVocabulary) -> List[Tuple[str, np.ndarray, str]]:
+    """
+    Stat modifiers written in an effect text, one sentence at a time.
+
+    Returns:
+        list: (stat name, values per superimposition, condition) with the
+            sentence as condition when it only applies in some situations, else ""
+    """
+    modifiers = list()
+    for sentence in re.split(r"(?<=[.!?])\s+", text or ""):
+        condition = sentence.strip() if CONDITION_WORDS.search(sentence) else ""
+        for pattern in EFFECT_PATTERNS:
+            for match in pattern.finditer(sentence):
+                values = parse_values(match.group("values"))
+                if match.group("verb").lower().startswith(("decrease", "reduce", "is decreased", "is reduced")):
+                    values = -values
+                stat = modifier_stat(normalizer, vocab, match.group("stat"), match.group("values"))
+                modifiers.append((stat, values, condition))
+    return modifiers
+
+
+class ModifierTable:
+    """
+    Stat modifiers of relic sets and lightcones, compiled from their effect
+    texts (see `compile_modifiers`), one row per modifier.
+
+    Attributes:
+        stats (list): Stat name of each stat index, the vocabulary first, then
+            stats outside of it such as "spd%" or "dmg%"
+        sources (list): Relic set or lightcone name of each source index
+        kinds (list): Kind of each source, the relic set "type" or "lightcone"
+        source (np.ndarray): (M,) source index of each modifier
+        pieces (np.ndarray): (M,) 2 or 4 for relic set effects, 0 for lightcones
+        stat (np.ndarray): (M,) stat index
+        value (np.ndarray): (M, 5) value of each superimposition, the same for sets
+        conditional (np.ndarray): (M,) True when the modifier only applies in some
+            situations
+        condition (np.ndarray): (M,) index of the text of the condition in
+            `conditions`, -1 for unconditional modifiers
+        conditions (list): Distinct condition texts
+        extracted (np.ndarray): (M,) True when read from the extractor's output
+            rather than parsed from the text
+        fingerprint (str): Fingerprint of the texts the table was compiled from
+    """
+
+    ARRAYS = ("source", "pieces", "stat", "value", "conditional", "extracted", "condition")
+
+    def __init__(self, stats: List[str], sources: List[str], kinds: List[str], conditions: List[str],
+                 arrays: Dict[str, np.ndarray], fingerprint: str = "") -> None:
+        self.stats = list(stats)
+        self.sources = list(sources)
+        self.kinds = list(kinds)
+        self.conditions = list(conditions)
+        self.fingerprint = fingerprint
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.stat_index: Dict[str, int] = {name: i for i, name in enumerate(self.stats)}
+        self.source_index: Dict[str, int] = {name: i for i, name in enumerate(self.sources)}
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+    def vectors(self, names: List[str], pieces: int = 0, superimposition: int = 1,
+                conditional: bool = False) -> np.ndarray:
+        """
+        Stat vectors of some sources, summing their modifiers.
+
+        Args:
+            names (list): Relic set or lightcone names, unknown ones give zeros
+            pieces (int): 2 or 4 for a relic set effect, 0 for lightcones
+            superimposition (int): Lightcone superimposition, 1 to 5
+            conditional (bool): Also add the conditional modifiers
+
+        Returns:
+            np.ndarray: (len(names), len(stats)) values
+        """
+        rows = np.array([self.source_index.get(name, -1) for name in names], dtype=np.int64)
+        position = np.full(len(self.sources) + 1, -1, dtype=np.int64)
+        position[rows[rows >= 0]] = np.flatnonzero(rows >= 0)
+
+        keep = (self.pieces == pieces) & (conditional | ~self.conditional)
+        keep &= position[self.source] >= 0
+        vectors = np.zeros((len(names), len(self.stats)), dtype=np.float32)
+        np.add.at(vectors, (position[self.source[keep]], self.stat[keep]), self.value[keep, superimposition - 1])
+        return vectors
+
+    def set_bonuses(self, conditional: bool = False) -> Dict[str, Dict[int, Dict[str, float]]]:
+        """
+        Relic set effects in the format of `BuildOptimizer`,
+        {set name: {2: {stat name: value}, 4: {...}}}.
+        """
+        bonuses: Dict[str, Dict[int, Dict[str, float]]] = dict()
+        for row in np.flatnonzero((self.pieces > 0) & (conditional | ~self.conditional)):
+            stats = bonuses.setdefault(self.sources[self.source[row]], dict()).setdefault(int(self.pieces[row]), dict())
+            name = self.stats[self.stat[row]]
+            stats[name] = stats.get(name, 0.0) + float(self.value[row, 0])
+        return bonuses
+
+    def save(self, path: str) -> None:
+        """
+        Writes the table as one .npz file, replaced atomically.
+        """
+        meta = {"version": MODIFIER_VERSION, "fingerprint": self.fingerprint, "stats": self.stats,
+                "sources": self.sources, "kinds": self.kinds, "conditions": self.conditions}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, meta=np.array(json.dumps(meta)), **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ModifierTable"]:
+        """
+        Reads a table written by `save`.
+
+        Returns:
+            ModifierTable | None: None if the file is missing or of another version
+        """
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != MODIFIER_VERSION:
+                return None
+            arrays = {name: data[name] for name in cls.ARRAYS}
+        return cls(meta["stats"], meta["sources"], meta["kinds"], meta["conditions"], arrays, meta["fingerprint"])
+
+
+def _file_signature(path: Optional[str]) -> Optional[List]:
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [path, stat.st_size, stat.st_mtime_ns]
+
+
+def compile_modifiers(vocab: StatVocabulary, relic_info_path: str, lightcone_info_path: Optional[str] = None,
+                      cache_path: Optional[str] = None, extracted_path: Optional[str] = None) -> ModifierTable:
+    """
+    Compiles the effects of relic_info.json and lightcone_info.json (see
+    `scrape_relic_sets` and `scrape_lightcones`) into a `ModifierTable`.
+
+    Lightcones use the sub stats extracted by the model (the checkpoint of
+    `iter_extract_lightcone`) when their record was made from the current
+    ability text, with the "notes" as condition. Other effects are parsed with
+    `EFFECT_PATTERNS`, and a sentence with a condition (`CONDITION_WORDS`) makes
+    its modifiers conditional.
+
+    The table is cached at `cache_path` with a fingerprint of the size and
+    modification time of every file it was compiled from, and only compiled
+    again, parsing the files, when one of them changes.
+
+    Args:
+        vocab (StatVocabulary): Stat vocabulary
+        relic_info_path (str): Path to relic_info.json
+        lightcone_info_path (str, optional): Path to lightcone_info.json
+        cache_path (str, optional): Path of the cached .npz table
+        extracted_path (str, optional): JSONL checkpoint of `iter_extract_lightcone`
+
+    Returns:
+        ModifierTable: Compiled table
+    """
+    key = fingerprint(MODIFIER_VERSION, vocab.names,
+                      *(_file_signature(path) for path in (relic_info_path, lightcone_info_path, extracted_path)))
+    if cache_path:
+        table = ModifierTable.load(cache_path)
+        if table is not None and table.fingerprint == key:
+            return table
+
+    with open(relic_info_path, 'r', encoding="utf-8") as f:
+        relic_sets = json.load(f)
+    lightcones = dict()
+    if lightcone_info_path:
+        with open(lightcone_info_path, 'r', encoding="utf-8") as f:
+            lightcones = json.load(f)
+    records = load_checkpoint(extracted_path) if extracted_path else dict()
+    records = {name: record for name, record in records.items()
+               if name in lightcones and record.get("input") == lightcones[name]["ability"]}
+
+    normalizer = SubStatNormalizer(vocab.names)
+    rows: List[Tuple[int, int, str, np.ndarray, str, bool]] = list()
+    sources, kinds = list(), list()
+    for name, relic_set in relic_sets.items():
+        for pieces in (2, 4):
+            for stat, values, condition in parse_effect(relic_set.get(f"{pieces}_piece_effect"), normalizer, vocab):
+                rows.append((len(sources), pieces, stat, values, condition, False))
+        sources.append(name)
+        kinds.append(relic_set.get("type", "relic_set"))
+
+    for name, lightcone in lightcones.items():
+        if name in records:
+            for stat, entry in (records[name].get("sub_stat") or dict()).items():
+                values = parse_values(entry["values"])
+                if str(entry["values"]).lstrip().startswith("-"):
+                    values = -values
+                stat = modifier_stat(normalizer, vocab, stat, entry["values"])
+                rows.append((len(sources), 0, stat, values, entry.get("notes") or "", True))
+        else:
+            for stat, values, condition in parse_effect(lightcone.get("ability"), normalizer, vocab):
+                rows.append((len(sources), 0, stat, values, condition, False))
+        sources.append(name)
+        kinds.append("lightcone")
+
+    stats = list(vocab.names) + sorted(set(row[2] for row in rows) - set(vocab.names))
+    index = {name: i for i, name in enumerate(stats)}
+    conditions = list(dict.fromkeys(row[4] for row in rows if row[4]))
+    condition_index = {text: i for i, text in enumerate(conditions)}
+    arrays = {
+        "source": np.array([row[0] for row in rows], dtype=np.int32),
+        "pieces": np.array([row[1] for row in rows], dtype=np.int8),
+        "stat": np.array([index[row[2]] for row in rows], dtype=np.int16),
+        "value": np.array([row[3] for row in rows], dtype=np.float32).reshape(len(rows), SUPERIMPOSITIONS),
+        "conditional": np.array([bool(row[4]) for row in rows], dtype=bool),
+        "extracted": np.array([row[5] for row in rows], dtype=bool),
+        "condition": np.array([condition_index.get(row[4], -1) for row in rows], dtype=np.int32)
+    }
+    table = ModifierTable(stats, sources, kinds, conditions, arrays, key)
+    if cache_path:
+        table.save(cache_path)
+    return table
@@ -0,0 +1,496 @@
+import os
+import heapq
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import product
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.estimator.stats import StatVocabulary
+
+
+PLANAR_SLOTS = ("planarsphere", "linkrope")
+
+# Cavern relics searched one by one, the last one together with the planar pairs
+SEARCH_DEPTH = 3
+
+# Planar pairs of the warm start search, which bounds the full one
+WARM_PAIRS = 4096
+
+
+def stat_units(vocab: StatVocabulary) -> np.ndarray:
+    """
+    Value of one "roll" of each stat, the unit build scores are counted in: a
+    high roll for sub stats, a tenth of the +15 main stat for the others (an
+    ATK% main stat is worth 10 high ATK% rolls).
+    """
+    units = np.where(vocab.roll_values > 0, vocab.roll_values, vocab.main_max / 10)
+    return np.where(units > 0, units, 1).astype(np.float64)
+
+
+def relic_stat_columns(relics: Dict[str, np.ndarray], columns: Sequence[int]) -> np.ndarray:
+    """
+    Totals of some stats on each relic, main and sub stats together.
+
+    Returns:
+        np.ndarray: (N, len(columns)) values
+    """
+    totals = np.zeros((len(relics["main"]), len(columns)), dtype=np.float64)
+    for c, column in enumerate(columns):
+        totals[:, c] = np.where(relics["main"] == column, relics["main_value"], 0)
+        totals[:, c] += np.where(relics["sub"] == column, relics["sub_value"], 0).sum(axis=1)
+    return totals
+
+
+def prune_dominated(values: np.ndarray, stats: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+                    k: int, groups: Optional[np.ndarray] = None, chunk_size: int = 256) -> np.ndarray:
+    """
+    Drops the candidates that can't be in the top `k` builds: those with at least
+    `k` candidates of the same group (e.g. set) scoring as much and at least as
+    good on every constrained stat. Swapping in any of them gives as good a
+    build that still meets the constraints.
+
+    Args:
+        values (np.ndarray): (N,) scores
+        stats (np.ndarray): (N, C) constrained stats
+        lower (np.ndarray): (C,) True for stats with a minimum, more is better
+        upper (np.ndarray): (C,) True for stats with a maximum, less is better
+        k (int): Number of builds searched
+        groups (np.ndarray, optional): (N,) group of each candidate
+
+    Returns:
+        np.ndarray: Indices of the kept candidates, by decreasing score
+    """
+    order = np.argsort(-values, kind="stable")
+    groups = np.zeros(len(values), dtype=np.int64) if groups is None else groups
+    kept = list()
+    for group in np.unique(groups[order]):
+        members = order[groups[order] == group]
+        if len(members) <= k:
+            kept.append(members)
+            continue
+        # Dominators of a dropped candidate dominate the ones it dominates, so
+        # counting the kept ones is enough, and they are few
+        member_stats = stats[members]
+        survivors = np.zeros(0, dtype=np.int64)
+        for start in range(0, len(members), chunk_size):
+            positions = np.arange(start, min(start + chunk_size, len(members)))
+            # Most candidates are dominated by the best ones, checked first
+            dominators = _count_dominators(member_stats, positions, survivors[:chunk_size], lower, upper)
+            open_rows = dominators < k
+            rest = np.concatenate([survivors[chunk_size:], positions])
+            dominators[open_rows] += _count_dominators(member_stats, positions[open_rows], rest, lower, upper)
+            survivors = np.concatenate([survivors, positions[dominators < k]])
+        kept.append(members[survivors])
+    kept = np.concatenate(kept) if kept else np.zeros(0, dtype=np.int64)
+    return kept[np.argsort(-values[kept], kind="stable")]
+
+
+def _count_dominators(stats: np.ndarray, rows: np.ndarray, reference: np.ndarray,
+                      lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    # Number of `reference` candidates before each row in the order, at least as
+    # good on every constrained stat
+    better = reference[None, :] < rows[:, None]
+    better &= np.all((stats[reference][None, :, :] >= stats[rows][:, None, :]) | ~lower, axis=2)
+    better &= np.all((stats[reference][None, :, :] <= stats[rows][:, None, :]) | ~upper, axis=2)
+    return better.sum(axis=1)
+
+
+class BuildOptimizer:
+    """
+    Finds the best relic builds, one relic per slot, for one character.
+
+    A build scores the weighted sum of its stats counted in rolls (see
+    `stat_units`), main stats, sub stats and set bonuses together. Relics must
+    have a main stat allowed in their slot (the "main_stat" rules of
+    relic_status.json), 2 and 4 relics of a cavern set and 2 planar ornaments of
+    a planar set add their bonuses, and builds must meet the constraints on
+    their stat totals, e.g. SPD >= 134.
+
+    The search is a branch-and-bound over the cavern slots, best relics first:
+    a branch is cut when the best relics left, with the largest set bonus still
+    reachable from the sets chosen so far, can't beat the k-th best build found,
+    or can't meet a constraint. Before it, relics that k others of their set
+    dominate are dropped, and the planar slots are merged into pairs, whose set
+    bonus doesn't depend on the cavern relics. The last cavern slot is evaluated
+    against all pairs at once. A first search on the best pairs only gives a
+    k-th best score that cuts the full search from the start.
+
+    The branches under each first relic are spread over a process pool. The
+    candidate arrays are put in shared memory once, and workers share the k-th
+    best score found to cut each other's branches.
+
+    Args:
+        vocab (StatVocabulary): Stat vocabulary
+        weights (np.ndarray): Stat weights of the character, a row of `RelicScorer.weights`
+        sets (list): Set names, indexed by the "set" column of the relics
+        set_bonuses (dict): {set name: {2: {stat name: value}, 4: {...}}}, the
+            stats given by the 2 and 4 piece effects, e.g. from
+            `ModifierTable.set_bonuses`. Stats in % of a flat stat of the
+            vocabulary, e.g. "spd%", are converted with `base`
+        base (dict, optional): {stat name: value} of the character without relics,
+            added to the totals the constraints apply to
+    """
+
+    def __init__(self, vocab: StatVocabulary, weights: np.ndarray, sets: List[str],
+                 set_bonuses: Dict[str, Dict[Any, Dict[str, float]]],
+                 base: Optional[Dict[str, float]] = None) -> None:
+        self.vocab = vocab
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.sets = list(sets)
+        self.base = dict(base or dict())
+        self.units = stat_units(vocab)
+
+        # Set bonuses as stat vectors, one extra row for relics without a known set
+        self.bonus_vectors = np.zeros((2, len(self.sets) + 1, len(vocab)), dtype=np.float64)
+        for s, name in enumerate(self.sets):
+            for pieces, stats in set_bonuses.get(name, dict()).items():
+                self.bonus_vectors[0 if int(pieces) == 2 else 1, s] = self._bonus_vector(stats)
+
+    def _bonus_vector(self, stats: Dict[str, float]) -> np.ndarray:
+        vector = np.zeros(len(self.vocab), dtype=np.float64)
+        for name, value in stats.items():
+            if name in self.vocab:
+                vector[self.vocab.index[name]] += value
+            elif name.endswith("%") and name[:-1] in self.vocab and name[:-1] in self.base:
+                vector[self.vocab.index[name[:-1]]] += self.base[name[:-1]] * value / 100
+        return vector
+
+    def score(self, relics: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Scores of relics on their own, without set bonuses, (N,).
+        """
+        per_unit = self.weights / self.units
+        sub = np.asarray(relics["sub"])
+        sub_score = (np.append(per_unit, 0)[sub] * relics["sub_value"]).sum(axis=1)
+        return per_unit[relics["main"]] * relics["main_value"] + sub_score
+
+    def optimize(self, relics: Dict[str, np.ndarray], k: int = 10,
+                 constraints: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+                 main_stats: Optional[Dict[str, List[str]]] = None,
+                 max_workers: Optional[int] = None,
+                 exclude: Optional[Sequence[int]] = None) -> List[Dict]:
+        """
+        Finds the `k` best builds.
+
+        Args:
+            relics: Relics with "slot", "set", "main", "main_value", "sub" and
+                "sub_value" columns, e.g. records of a `RelicInventory`
+            k (int): Number of builds
+            constraints (dict, optional): {stat name: (minimum, maximum)} on the
+                build totals, either bound may be None, e.g. {"spd": (134, None)}
+            main_stats (dict, optional): {slot: [stat names]} main stats accepted
+                in a slot, on top of the slot's rules
+            max_workers (int, optional): Number of processes, 1 searches in this
+                process. Defaults to the CPU count
+            exclude (list, optional): Indices of relics not to use, e.g. relics
+                already given to another character
+
+        Returns:
+            list: Builds, best first, as {"score": float, "relics": {slot: relic
+                index}, "sets": {set name: pieces}, "stats": {constrained stat: total}}
+        """
+        constraints = {self.vocab.normalize(name) or name: bounds for name, bounds in (constraints or dict()).items()}
+        columns = [self.vocab.index[name] for name in constraints]
+        lower = np.array([bounds[0] if bounds[0] is not None else -np.inf for bounds in constraints.values()])
+        upper = np.array([bounds[1] if bounds[1] is not None else np.inf for bounds in constraints.values()])
+        offset = np.array([self.base.get(name, 0.0) for name in constraints])
+
+        lower, upper = (lower - offset).reshape(-1), (upper - offset).reshape(-1)
+        lower_mask, upper_mask = np.isfinite(lower), np.isfinite(upper)
+        arrays = self._candidates(relics, k, columns, lower_mask, upper_mask, main_stats, exclude)
+        if arrays is None:
+            return list()
+        arrays["lower"] = lower
+        arrays["upper"] = upper
+        max_workers = max_workers or os.cpu_count() or 1
+
+        # Warm start on the best planar pairs: its k-th build bounds the final
+        # search, and drops the pairs that can't reach it with any cavern relics
+        threshold = -np.inf
+        if len(arrays["pair_value"]) > WARM_PAIRS:
+            warm = _search(_with_pairs(arrays, np.arange(WARM_PAIRS), lower_mask, upper_mask, k), k, max_workers)
+            if len(warm) == k:
+                # Loosened so that rounding doesn't drop the build it comes from
+                threshold = warm[-1][0] - 1e-9 * max(1.0, abs(warm[-1][0]))
+        reachable = np.flatnonzero(arrays["pair_value"] + arrays["cavern_bound"] >= threshold)
+        arrays = _with_pairs(arrays, reachable, lower_mask, upper_mask, k)
+        arrays["threshold"][0] = threshold
+
+        best = _search(arrays, k, max_workers)
+        return [self._describe(value, chosen, arrays, relics, columns, offset) for value, chosen in best]
+
+    def _candidates(self, relics: Dict[str, np.ndarray], k: int, columns: List[int],
+                    lower: np.ndarray, upper: np.ndarray,
+                    main_stats: Optional[Dict[str, List[str]]],
+                    exclude: Optional[Sequence[int]] = None) -> Optional[Dict[str, np.ndarray]]:
+        slot = np.asarray(relics["slot"]).astype(np.int64)
+        main = np.asarray(relics["main"]).astype(np.int64)
+        sets = np.asarray(relics["set"]).astype(np.int64)
+        sets = np.where((sets >= 0) & (sets < len(self.sets)), sets, len(self.sets))
+        values = self.score(relics)
+        stats = relic_stat_columns(relics, columns)
+        valid = self.vocab.main_mask[slot, main]
+        if exclude is not None:
+            valid[np.asarray(exclude, dtype=np.int64)] = False
+
+        arrays = dict()
+        planar = list()
+        cavern = [s for s in self.vocab.slots if s not in PLANAR_SLOTS]
+        for name in cavern + list(PLANAR_SLOTS):
+            mask = valid & (slot == self.vocab.slot_index(name))
+            if main_stats and name in main_stats:
+                mask &= np.isin(main, [self.vocab.index[self.vocab.normalize(m) or m] for m in main_stats[name]])
+            indices = np.flatnonzero(mask)
+            if len(indices) == 0:
+                return None
+            kept = indices[prune_dominated(values[indices], stats[indices], lower, upper, k, sets[indices])]
+            if name in PLANAR_SLOTS:
+                planar.append(kept)
+                continue
+            d = cavern.index(name)
+            arrays[f"index{d}"] = kept
+            arrays[f"value{d}"] = values[kept]
+            arrays[f"set{d}"] = sets[kept]
+            arrays[f"stats{d}"] = stats[kept]
+
+        # Cavern set bonuses, and the largest bonus of 0 to 4 relics of sets not chosen yet
+        arrays["bonus_value"] = self.bonus_vectors @ (self.weights / self.units)
+        arrays["bonus_stats"] = self.bonus_vectors[:, :, columns]
+        cavern_sets = np.unique(np.concatenate([arrays[f"set{d}"] for d in range(len(cavern))]))
+        best_two = max(arrays["bonus_value"][0, cavern_sets].max(), 0)
+        best_four = max(arrays["bonus_value"][:, cavern_sets].sum(axis=0).max(), 2 * best_two)
+        arrays["new_bonus"] = np.array([0, 0, best_two, best_two, best_four])
+        arrays["cavern_bound"] = np.full(1, sum(arrays[f"value{d}"].max() for d in range(len(cavern))) + best_four)
+
+        # Planar pairs with their set bonus, by decreasing score
+        spheres, ropes = planar
+        same = sets[spheres][:, None] == sets[ropes][None, :]
+        pair_values = (values[spheres][:, None] + values[ropes][None, :]
+                       + np.where(same, arrays["bonus_value"][0, sets[spheres]][:, None], 0)).ravel()
+        pair_stats = (stats[spheres][:, None, :] + stats[ropes][None, :, :]
+                      + same[:, :, None] * arrays["bonus_stats"][0, sets[spheres]][:, None, :])
+        order = np.argsort(-pair_values, kind="stable")
+        arrays["pair_index"] = np.stack([spheres[order // len(ropes)], ropes[order % len(ropes)]], axis=1)
+        arrays["pair_value"] = pair_values[order]
+        arrays["pair_stats"] = pair_stats.reshape(len(pair_values), stats.shape[1])[order]
+        return arrays
+
+    def _describe(self, value: float, chosen: Tuple[int, ...], arrays: Dict[str, np.ndarray],
+                  relics: Dict[str, np.ndarray], columns: List[int], offset: np.ndarray) -> Dict:
+        cavern = [s for s in self.vocab.slots if s not in PLANAR_SLOTS]
+        indices = [int(arrays[f"index{d}"][i]) for d, i in enumerate(chosen[:-1])]
+        indices += [int(i) for i in arrays["pair_index"][chosen[-1]]]
+        slots = cavern + list(PLANAR_SLOTS)
+
+        pieces = Counter(int(relics["set"][i]) for i in indices)
+        bonus = np.zeros(len(self.vocab), dtype=np.float64)
+        for s, count in pieces.items():
+            if 0 <= s < len(self.sets):
+                bonus += self.bonus_vectors[0, s] * (count >= 2) + self.bonus_vectors[1, s] * (count >= 4)
+        totals = relic_stat_columns({name: np.asarray(relics[name])[indices] for name in
+                                     ("main", "main_value", "sub", "sub_value")}, columns).sum(axis=0)
+        totals += bonus[columns] + offset
+        return {
+            "score": float(value),
+            "relics": dict(zip(slots, indices)),
+            "sets": {self.sets[s] if 0 <= s < len(self.sets) else None: count for s, count in pieces.items()},
+            "stats": {self.vocab.names[c]: float(total) for c, total in zip(columns, totals)}
+        }
+
+
+def _share(array: np.ndarray) -> shared_memory.SharedMemory:
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block
+
+
+def _with_pairs(arrays: Dict[str, np.ndarray], pairs: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+                k: int) -> Dict[str, np.ndarray]:
+    # Search arrays restricted to some planar pairs, without the dominated ones,
+    # with the bounds of what is left below each depth
+    arrays = dict(arrays)
+    kept = pairs[prune_dominated(arrays["pair_value"][pairs], arrays["pair_stats"][pairs], lower, upper, k)]
+    for name in ("pair_index", "pair_value", "pair_stats"):
+        arrays[name] = arrays[name][kept]
+
+    columns = arrays["pair_stats"].shape[1]
+    rest_value = [arrays["pair_value"].max(initial=-np.inf)]
+    rest_max = [arrays["pair_stats"].max(axis=0, initial=-np.inf)]
+    rest_min = [arrays["pair_stats"].min(axis=0, initial=np.inf)]
+    for d in reversed(range(SEARCH_DEPTH + 1)):
+        rest_value.append(rest_value[-1] + arrays[f"value{d}"].max())
+        rest_max.append(rest_max[-1] + arrays[f"stats{d}"].max(axis=0))
+        rest_min.append(rest_min[-1] + arrays[f"stats{d}"].min(axis=0))
+    arrays["rest_value"] = np.array(rest_value[::-1])
+    # Set bonus stats are bounded by the 4 piece bonus of one set or two 2 piece bonuses
+    four = arrays["bonus_stats"].sum(axis=0)
+    two = arrays["bonus_stats"][0]
+    bonus_max = np.maximum(np.maximum(four.max(axis=0), 2 * two.max(axis=0)), 0)
+    bonus_min = np.minimum(np.minimum(four.min(axis=0), 2 * two.min(axis=0)), 0)
+    arrays["rest_max"] = np.array(rest_max[::-1]).reshape(len(rest_max), columns) + bonus_max
+    arrays["rest_min"] = np.array(rest_min[::-1]).reshape(len(rest_min), columns) + bonus_min
+    arrays["threshold"] = np.full(1, -np.inf)
+    return arrays
+
+
+def _search(arrays: Dict[str, np.ndarray], k: int, max_workers: int) -> List[Tuple[float, Tuple[int, ...]]]:
+    # Best `k` builds, searching the branches of each first relic in this
+    # process or over a pool
+    if len(arrays["pair_value"]) == 0:
+        return list()
+    firsts = len(arrays["value0"])
+    if max_workers == 1 or firsts == 1:
+        _worker_arrays.update(arrays)
+        try:
+            results = [_search_from(i, k) for i in range(firsts)]
+        finally:
+            _worker_arrays.clear()
+            _bonus_bound.cache_clear()
+    else:
+        blocks = [_share(array) for array in arrays.values()]
+        try:
+            specs = [(name, block.name, array.shape, array.dtype.str)
+                     for (name, array), block in zip(arrays.items(), blocks)]
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_search_worker,
+                                     initargs=(specs,)) as executor:
+                results = list(executor.map(_search_from, range(firsts), [k] * firsts))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+    return heapq.nlargest(k, (build for builds in results for build in builds))
+
+
+# Candidate arrays of the search, attached once per worker process
+_worker_arrays: Dict[str, np.ndarray] = dict()
+_worker_blocks: List[shared_memory.SharedMemory] = list()
+
+
+def _init_search_worker(specs: List[Tuple[str, str, Tuple[int, ...], str]]) -> None:
+    for name, block_name, shape, dtype in specs:
+        block = shared_memory.SharedMemory(name=block_name)
+        _worker_blocks.append(block)
+        _worker_arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+@lru_cache(maxsize=None)
+def _bonus_bound(sets: Tuple[int, ...], remaining: int) -> float:
+    # Largest cavern set bonus reachable from the sets chosen so far with
+    # `remaining` more relics: each is added to a chosen set or to new sets, which
+    # at best give the largest bonuses of any set
+    bonus_value = _worker_arrays["bonus_value"]
+    new_bonus = _worker_arrays["new_bonus"]
+    counts = Counter(sets)
+    chosen = list(counts)
+
+    best = -np.inf
+    for added in product(range(remaining + 1), repeat=len(chosen)):
+        if sum(added) > remaining:
+            continue
+        total = new_bonus[remaining - sum(added)]
+        for s, extra in zip(chosen, added):
+            count = counts[s] + extra
+            total += bonus_value[0, s] * (count >= 2) + bonus_value[1, s] * (count >= 4)
+        best = max(best, total)
+    return best
+
+
+def _search_from(first: int, k: int) -> List[Tuple[float, Tuple[int, ...]]]:
+    """
+    Searches the builds whose first cavern relic is candidate `first`.
+
+    Returns:
+        list: Best (score, candidate of each depth) found, at most `k`
+    """
+    a = _worker_arrays
+    heap: List[Tuple[float, Tuple[int, ...]]] = list()
+    stats = np.zeros(a["lower"].shape, dtype=np.float64)
+    _descend(0, first, 0.0, stats, (), (), heap, k)
+    return heap
+
+
+def _threshold(heap: List, k: int) -> float:
+    shared = _worker_arrays["threshold"]
+    if len(heap) == k and heap[0][0] > shared[0]:
+        # Any worker's k-th best is a lower bound of the overall one, so racing
+        # writes can only make pruning looser
+        shared[0] = heap[0][0]
+    return shared[0]
+
+
+def _descend(depth: int, i: int, value: float, stats: np.ndarray, sets: Tuple[int, ...],
+             chosen: Tuple[int, ...], heap: List, k: int) -> bool:
+    # Adds candidate `i` of `depth` and searches below it. Returns False when
+    # candidate `i` and the worse ones after it can't make the top `k`
+    a = _worker_arrays
+    value = value + a[f"value{depth}"][i]
+    sets = sets + (int(a[f"set{depth}"][i]),)
+    remaining = SEARCH_DEPTH - depth
+    threshold = _threshold(heap, k) - a["rest_value"][depth + 1]
+    # Candidates come by decreasing score, but a later one may have a better set
+    if value + _bonus_bound(tuple(sorted(sets[:-1])), remaining + 1) < threshold:
+        return False
+    if value + _bonus_bound(tuple(sorted(sets)), remaining) < threshold:
+        return True
+    stats = stats + a[f"stats{depth}"][i]
+    if np.any(stats + a["rest_max"][depth + 1] < a["lower"]) or np.any(stats + a["rest_min"][depth + 1] > a["upper"]):
+        return True
+
+    chosen = chosen + (i,)
+    if depth + 1 == SEARCH_DEPTH:
+        _leaf(value, stats, sets, chosen, heap, k)
+        return True
+    for j in range(len(a[f"value{depth + 1}"])):
+        if not _descend(depth + 1, j, value, stats, sets, chosen, heap, k):
+            break
+    return True
+
+
+def _leaf(value: float, stats: np.ndarray, sets: Tuple[int, ...], chosen: Tuple[int, ...],
+          heap: List, k: int) -> None:
+    # Evaluates the last cavern slot against every planar pair at once
+    a = _worker_arrays
+    d = SEARCH_DEPTH
+    last_sets = a[f"set{d}"]
+    counts = Counter(sets)
+    bonus_value, bonus_stats = a["bonus_value"], a["bonus_stats"]
+
+    complete = [s for s, count in counts.items() if count >= 2]
+    pieces = (last_sets[:, None] == np.array(sets)[None, :]).sum(axis=1) + 1
+    two, four = pieces == 2, pieces == 4
+    totals = (value + bonus_value[0, complete].sum() + a[f"value{d}"]
+              + two * bonus_value[0, last_sets] + four * bonus_value[1, last_sets])
+    totals_stats = (stats + bonus_stats[0, complete].sum(axis=0) + a[f"stats{d}"]
+                    + two[:, None] * bonus_stats[0, last_sets] + four[:, None] * bonus_stats[1, last_sets])
+
+    pair_value, pair_stats = a["pair_value"], a["pair_stats"]
+    threshold = _threshold(heap, k)
+    feasible = np.all(totals_stats + pair_stats.max(axis=0, initial=-np.inf) >= a["lower"], axis=1)
+    feasible &= np.all(totals_stats + pair_stats.min(axis=0, initial=np.inf) <= a["upper"], axis=1)
+    rows = np.flatnonzero(feasible & (totals + pair_value[0] >= threshold))
+    if len(rows) == 0:
+        return
+
+    # Pairs are sorted by score, only a prefix can reach the threshold
+    count = len(pair_value) if not np.isfinite(threshold) else \
+        int(np.searchsorted(-pair_value, totals[rows].max() - threshold, side="right"))
+    block = totals[rows, None] + pair_value[None, :count]
+    ok = block >= threshold
+    if len(a["lower"]):
+        block_stats = totals_stats[rows, None, :] + pair_stats[None, :count, :]
+        ok &= np.all((block_stats >= a["lower"]) & (block_stats <= a["upper"]), axis=2)
+    found = np.flatnonzero(ok)
+    if len(found) > k:
+        found = found[np.argpartition(-block.ravel()[found], k - 1)[:k]]
+    for cell in found:
+        row, pair = divmod(int(cell), count)
+        build = (float(block[row, pair]), chosen + (int(rows[row]), pair))
+        if len(heap) < k:
+            heapq.heappush(heap, build)
+        elif build > heap[0]:
+            heapq.heapreplace(heap, build)
@@ -0,0 +1,199 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.estimator.stats import StatVocabulary
+
+
+# Default stat weights of each path, before the character's traces are applied
+PATH_WEIGHTS = {
+    "destruction": {"crit_rate%": 1.0, "crit_dmg%": 1.0, "atk%": 0.75, "spd": 0.5},
+    "hunt": {"crit_rate%": 1.0, "crit_dmg%": 1.0, "atk%": 0.75, "spd": 0.75},
+    "erudition": {"crit_rate%": 1.0, "crit_dmg%": 1.0, "atk%": 0.75, "spd": 0.75},
+    "nihility": {"effect_hit_rate%": 1.0, "spd": 1.0, "atk%": 0.5, "break_effect%": 0.25,
+                 "energy_regeneration_rate%": 0.5},
+    "harmony": {"spd": 1.0, "break_effect%": 0.5, "effect_res%": 0.5, "hp%": 0.25, "def%": 0.25,
+                "energy_regeneration_rate%": 1.0},
+    "preservation": {"def%": 1.0, "spd": 0.75, "effect_res%": 0.5, "hp%": 0.25,
+                     "energy_regeneration_rate%": 0.5},
+    "abundance": {"hp%": 1.0, "spd": 1.0, "effect_res%": 0.5, "def%": 0.25,
+                  "outgoing_healing_boost%": 1.0, "energy_regeneration_rate%": 1.0},
+    "remembrance": {"crit_rate%": 1.0, "crit_dmg%": 1.0, "hp%": 0.75, "spd": 0.75}
+}
+
+# Paths whose characters want the DMG boost of their element
+DAMAGE_PATHS = {"destruction", "hunt", "erudition", "nihility", "remembrance"}
+
+# Stats raised by a character's minor traces are weighted at least this much
+TRACE_WEIGHT = 0.75
+
+# Weight of flat HP/ATK/DEF relative to the % stat, unless set explicitly
+FLAT_RATIO = 0.4
+
+
+def character_weights(character: Dict, vocab: StatVocabulary,
+                      overrides: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    Derives how much a character values each stat, between 0 and 1.
+
+    Starts from the defaults of the character's path (`PATH_WEIGHTS`), adds the DMG
+    boost of its element for damage dealers, raises every stat of its minor traces
+    to at least `TRACE_WEIGHT`, and weights flat HP/ATK/DEF at `FLAT_RATIO` of the
+    matching % stat. `overrides` replace the derived weights.
+
+    Args:
+        character (dict): Entry of character.json (see `scrape_characters`)
+        vocab (StatVocabulary): Stat vocabulary
+        overrides (dict, optional): {stat name: weight} set explicitly
+
+    Returns:
+        np.ndarray: Weight of each vocabulary column
+    """
+    weights = np.zeros(len(vocab), dtype=np.float32)
+    path = character.get("path", "")
+    for stat, weight in PATH_WEIGHTS.get(path, dict()).items():
+        if stat in vocab:
+            weights[vocab.index[stat]] = weight
+
+    if path in DAMAGE_PATHS and character.get("element"):
+        boost = vocab.normalize(f"{character['element']}_dmg_boost", "%")
+        if boost is not None:
+            weights[vocab.index[boost]] = 1.0
+
+    for trace, value in character.get("sub_stat", dict()).items():
+        stat = vocab.normalize(trace, str(value))
+        if stat is not None:
+            weights[vocab.index[stat]] = max(weights[vocab.index[stat]], TRACE_WEIGHT)
+
+    overrides = {vocab.normalize(stat) or stat: weight for stat, weight in (overrides or dict()).items()}
+    for stat, weight in overrides.items():
+        weights[vocab.index[stat]] = weight
+
+    explicit = set(PATH_WEIGHTS.get(path, dict())) | set(overrides)
+    for flat in ("hp", "atk", "def"):
+        if flat in vocab and f"{flat}%" in vocab and flat not in explicit:
+            weights[vocab.index[flat]] = FLAT_RATIO * weights[vocab.index[f"{flat}%"]]
+    return weights
+
+
+def scatter_stats(indices: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """
+    Turns sparse stats, e.g. the four sub stats of each relic, into dense vectors.
+
+    Args:
+        indices (np.ndarray): (N, K) vocabulary columns, -1 for an empty entry.
+            Columns must be distinct within a row
+        values (np.ndarray): (N, K) values
+        size (int): Vocabulary size
+
+    Returns:
+        np.ndarray: (N, size) float32 matrix
+    """
+    dense = np.zeros((len(indices), size + 1), dtype=np.float32)
+    # -1 lands in the extra last column, which is dropped
+    dense[np.arange(len(indices))[:, None], indices] = values
+    return dense[:, :size]
+
+
+def encode_relics(relics: List[Dict], vocab: StatVocabulary, max_subs: int = 4) -> Dict[str, np.ndarray]:
+    """
+    Encodes relics given as dicts:
+        {"set": str, "slot": str, "main_stat": str, "main_value": float,
+         "sub_stats": {stat name: value}}
+
+    Returns:
+        dict: "slot" (N,) slot index, "main" (N,) main stat column, "main_value"
+            (N,), "sub" (N, max_subs) sub stat columns with -1 for missing ones and
+            "sub_value" (N, max_subs)
+    """
+    n = len(relics)
+    encoded = {
+        "slot": np.array([vocab.slot_index(relic["slot"]) for relic in relics], dtype=np.int8),
+        "main": vocab.indices(relic["main_stat"] for relic in relics),
+        "main_value": np.array([relic.get("main_value", 0.0) for relic in relics], dtype=np.float32),
+        "sub": np.full((n, max_subs), -1, dtype=np.int16),
+        "sub_value": np.zeros((n, max_subs), dtype=np.float32)
+    }
+    for i, relic in enumerate(relics):
+        for j, (stat, value) in enumerate(relic["sub_stats"].items()):
+            encoded["sub"][i, j] = vocab.index[stat]
+            encoded["sub_value"][i, j] = value
+    return encoded
+
+
+class RelicScorer:
+    """
+    Scores relics for many characters with one matrix product.
+
+    The sub stat score of a relic for a character is the sum over its sub stats
+    of weight x value / value of a high roll, i.e. the number of high rolls in
+    stats the character wants. A +15 relic has at most 9 rolls, so scores are
+    roughly between 0 and 9.
+
+    Args:
+        vocab (StatVocabulary): Stat vocabulary
+        characters (dict): character.json entries by name
+        overrides (dict, optional): {character name: {stat name: weight}}
+
+    Attributes:
+        names (list): Character of each score column
+        weights (np.ndarray): (characters, stats) weights, see `character_weights`
+    """
+
+    def __init__(self, vocab: StatVocabulary, characters: Dict[str, Dict],
+                 overrides: Optional[Dict[str, Dict[str, float]]] = None) -> None:
+        overrides = overrides or dict()
+        self.vocab = vocab
+        self.names: List[str] = list(characters.keys())
+        self.weights = np.stack([character_weights(characters[name], vocab, overrides.get(name))
+                                 for name in self.names]) if self.names else np.zeros((0, len(vocab)), np.float32)
+
+        per_roll = np.zeros_like(self.weights)
+        np.divide(self.weights, vocab.roll_values, out=per_roll, where=vocab.roll_values > 0)
+        # (stats, characters), contiguous for the product
+        self._per_roll = np.ascontiguousarray(per_roll.T)
+
+    def column(self, name: str) -> int:
+        return self.names.index(name)
+
+    def score(self, sub_stats: np.ndarray) -> np.ndarray:
+        """
+        Scores dense sub stat vectors.
+
+        Args:
+            sub_stats (np.ndarray): (N, stats) sub stat values
+
+        Returns:
+            np.ndarray: (N, characters) scores
+        """
+        return sub_stats @ self._per_roll
+
+    def score_sparse(self, sub: np.ndarray, sub_value: np.ndarray, chunk_size: int = 1 << 16) -> np.ndarray:
+        """
+        Scores relics given as sub stat columns and values (see `encode_relics`),
+        `chunk_size` relics at a time to bound the size of the dense vectors.
+
+        Returns:
+            np.ndarray: (N, characters) scores
+        """
+        scores = np.empty((len(sub), len(self.names)), dtype=np.float32)
+        for start in range(0, len(sub), chunk_size):
+            end = start + chunk_size
+            scores[start:end] = self.score(scatter_stats(sub[start:end], sub_value[start:end], len(self.vocab)))
+        return scores
+
+    def main_fit(self, main: np.ndarray) -> np.ndarray:
+        """
+        Weight of each relic's main stat for each character, (N, characters).
+        """
+        return self.weights.T[main]
+
+    def top(self, scores: np.ndarray, name: str, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Indices and scores of the `k` best relics for a character, best first.
+        """
+        column = scores[:, self.column(name)]
+        k = min(k, len(column))
+        best = np.argpartition(-column, k - 1)[:k]
+        best = best[np.argsort(-column[best])]
+        return best, column[best]
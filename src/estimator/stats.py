@@ -0,0 +1,170 @@
+import re
+import json
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.extractor.validate import SubStatNormalizer
+
+
+SLOTS = ["head", "hands", "body", "feet", "planarsphere", "linkrope"]
+
+# Value of one roll of each 5-star sub stat, as (low, mid, high)
+SUB_STAT_ROLLS = {
+    "spd": (2.0, 2.3, 2.6),
+    "hp": (33.87, 38.10, 42.34),
+    "atk": (16.94, 19.05, 21.17),
+    "def": (16.94, 19.05, 21.17),
+    "hp%": (3.456, 3.888, 4.32),
+    "atk%": (3.456, 3.888, 4.32),
+    "def%": (4.32, 4.86, 5.4),
+    "break_effect%": (5.184, 5.832, 6.48),
+    "effect_hit_rate%": (3.456, 3.888, 4.32),
+    "effect_res%": (3.456, 3.888, 4.32),
+    "crit_rate%": (2.592, 2.916, 3.24),
+    "crit_dmg%": (5.184, 5.832, 6.48)
+}
+
+# Chance weight of each sub stat to be drawn, when a relic drops or gains its
+# fourth sub stat
+SUB_STAT_CHANCE = {
+    "hp": 10, "atk": 10, "def": 10, "hp%": 10, "atk%": 10, "def%": 10,
+    "spd": 4, "crit_rate%": 6, "crit_dmg%": 6,
+    "effect_hit_rate%": 8, "effect_res%": 8, "break_effect%": 8
+}
+
+# Value of each 5-star main stat at +15
+MAIN_STAT_MAX = {
+    "hp": 705.6,
+    "atk": 352.8,
+    "hp%": 43.2,
+    "atk%": 43.2,
+    "def%": 54.0,
+    "crit_rate%": 32.4,
+    "crit_dmg%": 64.8,
+    "outgoing_healing_boost%": 34.56,
+    "effect_hit_rate%": 43.2,
+    "spd": 25.032,
+    "break_effect%": 64.8,
+    "energy_regeneration_rate%": 19.44
+}
+
+# Elemental DMG boosts are not listed one by one in MAIN_STAT_MAX
+DMG_BOOST_MAX = 38.88
+
+# A 5-star main stat grows by this fraction of its +0 value per level
+MAIN_STAT_GROWTH = 0.35
+
+
+def main_stat_value(max_value: np.ndarray, level: np.ndarray) -> np.ndarray:
+    """
+    Value of 5-star main stats at the given levels, from their +15 values.
+    """
+    return max_value * (1 + MAIN_STAT_GROWTH * level) / (1 + MAIN_STAT_GROWTH * 15)
+
+
+def main_stat_max(name: str) -> float:
+    """
+    Returns the +15 value of a 5-star main stat, 0 if unknown.
+    """
+    if name in MAIN_STAT_MAX:
+        return MAIN_STAT_MAX[name]
+    if re.fullmatch(r"[a-z_]+_dmg(_boost)?%", name):
+        return DMG_BOOST_MAX
+    return 0.0
+
+
+class StatVocabulary:
+    """
+    Fixed ordering of every relic stat, so that relics, characters and builds
+    can be written as NumPy vectors with one column per stat.
+
+    Built from relic_status.json (see `scrape_relic_stats`): the sub stats come
+    first, in the scraped order, followed by the main stats that can't be sub
+    stats (elemental DMG boosts, energy regeneration, ...) in first-seen order.
+
+    Args:
+        sub_stats (list): The "sub_stat" list of relic_status.json
+        main_stats (dict): The "main_stat" mapping of relic_status.json, from slot
+            to its possible main stats
+
+    Attributes:
+        names (list): Stat name of each column
+        index (dict): Column of each stat name
+        slots (list): Slot names, in the scraped order
+        sub_mask (np.ndarray): True for the columns that can be sub stats
+        roll_values (np.ndarray): Value of a high roll of each sub stat column,
+            0 for the other columns
+        sub_chance (np.ndarray): Chance weight of each sub stat column to be
+            drawn (see `SUB_STAT_CHANCE`), 0 for the other columns
+        main_mask (np.ndarray): (slots, stats) True where a slot can have the
+            stat as main stat
+    """
+
+    def __init__(self, sub_stats: List[str], main_stats: Dict[str, List[str]]) -> None:
+        names = list(dict.fromkeys(sub_stats))
+        for stats in main_stats.values():
+            names.extend(stat for stat in stats if stat not in names)
+
+        self.names: List[str] = names
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(names)}
+        self.sub_stats: List[str] = list(sub_stats)
+        self.main_stats: Dict[str, List[str]] = {slot: list(stats) for slot, stats in main_stats.items()}
+        self.slots: List[str] = list(main_stats.keys())
+
+        self.sub_mask = np.zeros(len(names), dtype=bool)
+        self.sub_mask[[self.index[stat] for stat in self.sub_stats]] = True
+        self.roll_values = np.array([SUB_STAT_ROLLS.get(name, (0.0, 0.0, 0.0))[2] if self.sub_mask[i] else 0.0
+                                     for i, name in enumerate(names)], dtype=np.float32)
+        self.sub_chance = np.array([SUB_STAT_CHANCE.get(name, 0) if self.sub_mask[i] else 0
+                                    for i, name in enumerate(names)], dtype=np.float64)
+        self.main_max = np.array([main_stat_max(name) for name in names], dtype=np.float32)
+        self.main_mask = np.zeros((len(self.slots), len(names)), dtype=bool)
+        for s, slot in enumerate(self.slots):
+            self.main_mask[s, [self.index[stat] for stat in self.main_stats[slot]]] = True
+
+        self._normalizer = SubStatNormalizer(names)
+
+    @classmethod
+    def from_json(cls, relic_stats_path: str) -> "StatVocabulary":
+        """
+        Loads the vocabulary from relic_status.json.
+        """
+        with open(relic_stats_path, 'r', encoding="utf-8") as f:
+            relic_stats = json.load(f)
+        return cls(relic_stats["sub_stat"], relic_stats["main_stat"])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def normalize(self, name: str, value: str = "") -> Optional[str]:
+        """
+        Maps a stat name written elsewhere (character traces, lightcone abilities,
+        model output) onto the vocabulary, e.g. ("crit_dmg", "24%") -> "crit_dmg%".
+
+        Returns:
+            str | None: Name in the vocabulary, None if the stat is not a relic stat
+        """
+        name = self._normalizer.normalize(name, value)
+        return name if name in self.index else None
+
+    def encode(self, stats: Dict[str, float]) -> np.ndarray:
+        """
+        Writes a {stat name: value} mapping as a vector. Names must be in the vocabulary.
+        """
+        vector = np.zeros(len(self.names), dtype=np.float32)
+        for name, value in stats.items():
+            vector[self.index[name]] += value
+        return vector
+
+    def slot_index(self, slot: str) -> int:
+        return self.slots.index(slot)
+
+    def indices(self, names: Iterable[str]) -> np.ndarray:
+        """
+        Columns of several stat names, -1 for None.
+        """
+        return np.array([-1 if name is None else self.index[name] for name in names], dtype=np.int16)
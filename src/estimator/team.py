@@ -0,0 +1,215 @@
+import hashlib
+from itertools import combinations
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from src.dataset.models import Character
+from src.estimator.optimizer import BuildOptimizer
+from src.estimator.scoring import RelicScorer
+from src.estimator.stats import StatVocabulary
+
+
+# Relic columns a build depends on, hashed to key the cached builds
+INVENTORY_COLUMNS = ("slot", "set", "main", "main_value", "sub", "sub_value")
+
+
+def base_stats(character: Union[Dict, Character]) -> Dict[str, float]:
+    """
+    Stats of a character without relics, from the "basic_stat" of its
+    character.json entry (see `scrape_characters`) or `Character` record,
+    e.g. {"spd": 101.0}. Values that are not numbers are left out.
+    """
+    if not isinstance(character, Character):
+        character = Character.from_json("", character)
+    return {stat: value for stat, value in character.basic_stat.items() if value == value}
+
+
+def inventory_key(relics: Dict[str, np.ndarray]) -> str:
+    """
+    Content hash of an inventory, which changes whenever a relic does.
+    """
+    sha = hashlib.sha256()
+    for name in INVENTORY_COLUMNS:
+        sha.update(np.ascontiguousarray(relics[name]).tobytes())
+    return sha.hexdigest()
+
+
+class TeamOptimizer:
+    """
+    Shares one inventory between several characters, each relic used by at
+    most one of them.
+
+    The best builds of each character alone (see `BuildOptimizer`) are cached
+    by inventory, so solving the team again, e.g. after changing one
+    character, only searches for that character. The team is then searched
+    exactly over these lists: characters are assigned in turn and a branch is
+    cut when two of its builds share a relic, or when the best build of each
+    character left can't beat the best team found.
+
+    When the lists leave a character without any build free of conflicts, it
+    is solved again without the relics of the others (the repair), and the
+    build found joins its list for the next search.
+
+    Args:
+        optimizers (dict): {character name: BuildOptimizer}
+        constraints (dict, optional): {character name: constraints}, see
+            `BuildOptimizer.optimize`
+        main_stats (dict, optional): {character name: main stats by slot}, see
+            `BuildOptimizer.optimize`
+    """
+
+    def __init__(self, optimizers: Dict[str, BuildOptimizer],
+                 constraints: Optional[Dict[str, Dict]] = None,
+                 main_stats: Optional[Dict[str, Dict[str, List[str]]]] = None) -> None:
+        self.optimizers = dict(optimizers)
+        self.names: List[str] = list(optimizers.keys())
+        self.constraints = dict(constraints or dict())
+        self.main_stats = dict(main_stats or dict())
+        self._cache: Dict[Tuple[str, str, int], List[Dict]] = dict()
+
+    @classmethod
+    def from_characters(cls, vocab: StatVocabulary, characters: Dict[str, Dict], sets: List[str],
+                        set_bonuses: Dict[str, Dict], overrides: Optional[Dict[str, Dict[str, float]]] = None,
+                        constraints: Optional[Dict[str, Dict]] = None,
+                        main_stats: Optional[Dict[str, Dict[str, List[str]]]] = None) -> "TeamOptimizer":
+        """
+        Builds the optimizers of character.json entries, weighted with `RelicScorer`.
+
+        Args:
+            vocab (StatVocabulary): Stat vocabulary
+            characters (dict): character.json entries by name, the team
+            sets (list): Set names, indexed by the "set" column of the relics
+            set_bonuses (dict): Set bonuses, see `BuildOptimizer`
+            overrides (dict, optional): {character name: {stat name: weight}}
+            constraints (dict, optional): {character name: constraints}
+            main_stats (dict, optional): {character name: main stats by slot}
+        """
+        scorer = RelicScorer(vocab, characters, overrides)
+        optimizers = {name: BuildOptimizer(vocab, scorer.weights[scorer.column(name)], sets, set_bonuses,
+                                           base=base_stats(character))
+                      for name, character in characters.items()}
+        return cls(optimizers, constraints, main_stats)
+
+    def candidates(self, name: str, relics: Dict[str, np.ndarray], k: int = 20,
+                   max_workers: Optional[int] = None, key: Optional[str] = None) -> List[Dict]:
+        """
+        Best `k` builds of one character alone, cached by inventory.
+
+        Args:
+            key (str, optional): `inventory_key` of `relics`, computed if not given
+
+        Returns:
+            list: Builds, see `BuildOptimizer.optimize`
+        """
+        key = (name, key or inventory_key(relics), k)
+        if key not in self._cache:
+            self._cache[key] = self.optimizers[name].optimize(
+                relics, k=k, constraints=self.constraints.get(name), main_stats=self.main_stats.get(name),
+                max_workers=max_workers)
+        return self._cache[key]
+
+    def clear_cache(self, name: Optional[str] = None) -> None:
+        """
+        Drops the cached builds of one character, e.g. after changing its
+        constraints, or of every character.
+        """
+        self._cache = {key: builds for key, builds in self._cache.items() if name is not None and key[0] != name}
+
+    def allocate(self, relics: Dict[str, np.ndarray], k: int = 20, max_workers: Optional[int] = None) -> Dict:
+        """
+        Finds the best team: one build per character, no relic used twice, the
+        largest total score.
+
+        Args:
+            relics: Relics with the columns of `BuildOptimizer.optimize`
+            k (int): Builds listed per character, more makes the team search
+                exact over more builds
+            max_workers (int, optional): Processes of each character's search
+
+        Returns:
+            dict: "score" total score, "builds" {name: build or None if no build
+                is left}, "solo" {name: best score alone}, "loss" {name: solo
+                score minus team score} and "conflicts", a list of
+                {"characters": (name, name), "relics": [indices], "loss": float}
+                for the characters whose best builds alone share relics, with
+                the team score lost to each conflict
+        """
+        key = inventory_key(relics)
+        options = {name: [(build["score"], frozenset(build["relics"].values()), build)
+                          for build in self.candidates(name, relics, k, max_workers, key)]
+                   for name in self.names}
+        solo = {name: options[name][0][0] if options[name] else None for name in self.names}
+
+        team = _best_team(options, self.names)
+        # Repair: characters left without a build get one among the relics left
+        for name in sorted(self.names, key=lambda n: -(solo[n] or 0)):
+            if team[name] is not None or not options[name]:
+                continue
+            taken = sorted(set().union(*(team[other][1] for other in self.names if team[other] is not None)))
+            found = self.optimizers[name].optimize(
+                relics, k=1, constraints=self.constraints.get(name), main_stats=self.main_stats.get(name),
+                max_workers=max_workers, exclude=taken)
+            if found:
+                options[name].append((found[0]["score"], frozenset(found[0]["relics"].values()), found[0]))
+                team = _best_team(options, self.names)
+        total = sum(option[0] for option in team.values() if option is not None)
+
+        # Marginal loss of each conflict: how much more the team would score if
+        # these two characters could share relics
+        conflicts = list()
+        for a, b in combinations(self.names, 2):
+            if not options[a] or not options[b]:
+                continue
+            shared = options[a][0][1] & options[b][0][1]
+            if shared:
+                relaxed = _best_team(options, self.names, ignored={(a, b)})
+                conflicts.append({
+                    "characters": (a, b),
+                    "relics": sorted(shared),
+                    "loss": sum(option[0] for option in relaxed.values() if option is not None) - total
+                })
+
+        return {
+            "score": total,
+            "builds": {name: team[name][2] if team[name] is not None else None for name in self.names},
+            "solo": solo,
+            "loss": {name: solo[name] - (team[name][0] if team[name] is not None else 0.0)
+                     for name in self.names if solo[name] is not None},
+            "conflicts": conflicts
+        }
+
+
+def _best_team(options: Dict[str, List[Tuple[float, FrozenSet[int], Dict]]], names: Sequence[str],
+               ignored: Optional[Set[Tuple[str, str]]] = None) -> Dict[str, Optional[Tuple]]:
+    # Depth-first search over the listed builds of each character, best first,
+    # a character may also go without a build
+    ignored = ignored or set()
+    lists = [sorted(options[name], key=lambda option: -option[0]) + [None] for name in names]
+    best_left = np.cumsum([max((o[0] for o in listed if o is not None), default=0.0) for listed in lists][::-1])[::-1]
+    best_left = list(best_left) + [0.0]
+    # Characters whose builds must not share relics with each earlier one
+    checked = [[j for j in range(i) if (names[j], names[i]) not in ignored and (names[i], names[j]) not in ignored]
+               for i in range(len(names))]
+
+    best: List = [-np.inf, None]
+    chosen: List = list()
+
+    def descend(i: int, score: float) -> None:
+        if i == len(names):
+            if score > best[0]:
+                best[0], best[1] = score, list(chosen)
+            return
+        for option in lists[i]:
+            value = option[0] if option is not None else 0.0
+            if score + value + best_left[i + 1] <= best[0]:
+                # Options are sorted, the next ones can't do better
+                break
+            if option is not None and any(chosen[j] is not None and option[1] & chosen[j][1] for j in checked[i]):
+                continue
+            chosen.append(option)
+            descend(i + 1, score + value)
+            chosen.pop()
+
+    descend(0, 0.0)
+    return dict(zip(names, best[1]))
@@ -0,0 +1,231 @@
+from functools import lru_cache
+from itertools import product
+from math import factorial
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.estimator.stats import StatVocabulary
+
+
+# A roll adds 8, 9 or 10 tenths of a high roll, with equal chance
+ROLL_TIERS = (8, 9, 10)
+
+# A 5-star relic is upgraded every 3 levels up to +15
+MAX_LEVEL = 15
+LEVELS_PER_UPGRADE = 3
+
+
+def remaining_upgrades(level: np.ndarray) -> np.ndarray:
+    """
+    Upgrades left before +15, landing at +3, +6, +9, +12 and +15, e.g. 5 for
+    +0, +1 and +2, 4 for +3 and 0 for +15.
+    """
+    level = np.asarray(level).astype(np.int64)
+    return np.clip(MAX_LEVEL // LEVELS_PER_UPGRADE - level // LEVELS_PER_UPGRADE, 0, None)
+
+
+def tier_sum_distribution(rolls: int) -> np.ndarray:
+    """
+    Distribution of the sum of the tiers of `rolls` rolls, by convolving the
+    distribution of one roll with itself.
+
+    Returns:
+        np.ndarray: Probability of each sum from 8 x `rolls` to 10 x `rolls`
+    """
+    one = np.full(len(ROLL_TIERS), 1 / len(ROLL_TIERS))
+    distribution = np.ones(1)
+    for _ in range(rolls):
+        distribution = np.convolve(distribution, one)
+    return distribution
+
+
+@lru_cache(maxsize=None)
+def outcome_table(upgrades: int, initial: Tuple[int, ...] = (0, 0, 0, 0)) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Every outcome of upgrading a relic with 4 sub stats `upgrades` times, each
+    upgrade rolling one sub stat chosen uniformly.
+
+    Args:
+        upgrades (int): Remaining upgrades
+        initial (tuple): Rolls each sub stat gets on top of the upgrades, e.g. the
+            first roll of a sub stat that is still to be added
+
+    Returns:
+        tuple: (outcomes, 4) tier sums added to each sub stat, in tenths of a high
+            roll, and (outcomes,) probabilities
+    """
+    subs = len(initial)
+    outcomes: Dict[Tuple[int, ...], float] = dict()
+    for counts in product(range(upgrades + 1), repeat=subs):
+        if sum(counts) != upgrades:
+            continue
+        # Multinomial chance of this split of the upgrades
+        chance = factorial(upgrades) / np.prod([factorial(k) for k in counts]) / subs ** upgrades
+        rolls = [k + extra for k, extra in zip(counts, initial)]
+        distributions = [tier_sum_distribution(k) for k in rolls]
+        for offsets in product(*(range(len(d)) for d in distributions)):
+            sums = tuple(min(ROLL_TIERS) * k + offset for k, offset in zip(rolls, offsets))
+            p = chance * np.prod([d[offset] for d, offset in zip(distributions, offsets)])
+            outcomes[sums] = outcomes.get(sums, 0.0) + p
+
+    sums = np.array(list(outcomes.keys()), dtype=np.float32).reshape(-1, subs)
+    probabilities = np.array(list(outcomes.values()), dtype=np.float64)
+    return sums, probabilities
+
+
+class UpgradeEstimator:
+    """
+    Exact distribution of the sub stat score (see `RelicScorer`) a relic reaches
+    at +15, for one character.
+
+    Each remaining upgrade rolls one of the 4 sub stats uniformly with a tier of
+    8, 9 or 10 tenths of a high roll. A relic with 3 sub stats first gains a
+    fourth, drawn with the weights of `SUB_STAT_CHANCE` among the sub stats it
+    doesn't have, which is a mixture over the weights the character gives them.
+
+    The outcomes for each number of remaining upgrades are enumerated once
+    (`outcome_table`, at most a few thousand tier sum vectors). The score gained
+    by a relic only depends on the weights of its sub stats, so relics are
+    grouped by those weights, the gains of each group are one matrix product
+    with the table, and expected scores, quantiles and chances are read from the
+    sorted gains of the groups.
+
+    Args:
+        vocab (StatVocabulary): Stat vocabulary
+        weights (np.ndarray): Stat weights of the character, a row of
+            `RelicScorer.weights`
+
+    Attributes:
+        classes (np.ndarray): Distinct weights of the sub stats, the fourth sub
+            stat of a 3 sub stat relic only matters through its class
+    """
+
+    def __init__(self, vocab: StatVocabulary, weights: np.ndarray) -> None:
+        self.vocab = vocab
+        self.weights = np.asarray(weights, dtype=np.float32)
+        # Score of a tenth of a high roll and of one unit of each stat, 0 for the -1 column
+        self._per_tenth = np.append(self.weights / 10, np.float32(0))
+        self._per_unit = np.append(np.divide(self.weights, vocab.roll_values, out=np.zeros_like(self.weights),
+                                             where=vocab.roll_values > 0), np.float32(0))
+
+        self.classes, class_of = np.unique(self.weights[vocab.sub_mask], return_inverse=True)
+        self._chance_by_class = np.zeros((len(vocab) + 1, len(self.classes)), dtype=np.float64)
+        self._chance_by_class[np.flatnonzero(vocab.sub_mask), class_of] = vocab.sub_chance[vocab.sub_mask]
+
+    def current(self, sub: np.ndarray, sub_value: np.ndarray) -> np.ndarray:
+        """
+        Current sub stat scores, (N,).
+        """
+        return (self._per_unit[sub] * sub_value).sum(axis=1)
+
+    def estimate(self, relics: Dict[str, np.ndarray],
+                 quantiles: Sequence[float] = (0.1, 0.5, 0.9),
+                 target: Optional[float] = None,
+                 chunk_size: int = 64) -> Dict[str, np.ndarray]:
+        """
+        Estimates the +15 scores of a batch of relics.
+
+        Args:
+            relics: Relics with "main", "level", "sub" and "sub_value" columns, e.g.
+                records of a `RelicInventory` or `encode_relics` output plus levels
+            quantiles (list): Quantiles of the final score to return
+            target (float, optional): Score whose chance to be reached is returned
+            chunk_size (int): Distinct sub stat weights evaluated at once, each
+                with up to a few thousand outcomes per weight class
+
+        Returns:
+            dict: "current" (N,), "expected" (N,), "quantiles" (N, Q) and "chance"
+                (N,) to reach `target` if given
+
+        Raises:
+            ValueError: If a relic has less than 3 sub stats
+        """
+        sub = np.asarray(relics["sub"])
+        main = np.asarray(relics["main"])
+        level = np.asarray(relics["level"])
+        subs = (sub >= 0).sum(axis=1)
+        if np.any(subs < 3):
+            raise ValueError("Relics need at least 3 sub stats")
+        remaining = remaining_upgrades(level)
+
+        n = len(sub)
+        current = self.current(sub, np.asarray(relics["sub_value"]))
+        estimates = {
+            "current": current,
+            "expected": np.empty(n, dtype=np.float32),
+            "quantiles": np.empty((n, len(quantiles)), dtype=np.float32)
+        }
+        if target is not None:
+            estimates["chance"] = np.empty(n, dtype=np.float32)
+
+        three_subs = (subs == 3) & (remaining > 0)
+        for upgrades in np.unique(remaining):
+            for three in (False, True):
+                rows = np.flatnonzero((remaining == upgrades) & (three_subs == three))
+                if len(rows) == 0:
+                    continue
+                keys = self._keys(sub[rows], main[rows], three)
+                unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+                inverse = inverse.reshape(-1)
+                # Rows sorted by key, so that each chunk of keys is a slice of them
+                order = np.argsort(inverse, kind="stable")
+                rows, inverse = rows[order], inverse[order]
+                bounds = np.searchsorted(inverse, np.arange(0, len(unique) + chunk_size, chunk_size))
+                for k, start in enumerate(range(0, len(unique), chunk_size)):
+                    part = slice(bounds[k], bounds[k + 1])
+                    gains, probabilities = self._gains(unique[start:start + chunk_size], int(upgrades), three)
+                    self._reduce(gains, probabilities, inverse[part] - start, current[rows[part]], rows[part],
+                                 quantiles, target, estimates)
+        return estimates
+
+    def _keys(self, sub: np.ndarray, main: np.ndarray, three_subs: bool) -> np.ndarray:
+        # Weights of the sub stats, sorted since the order of the rolled ones
+        # doesn't matter, followed for 3 sub stats by the chance of each class
+        # for the fourth
+        per_tenth = self._per_tenth[sub]
+        if not three_subs:
+            return np.sort(per_tenth, axis=1)
+        held = np.sort(np.where(sub >= 0, per_tenth, np.inf), axis=1)[:, :3]
+
+        excluded = np.zeros((len(sub), len(self.vocab) + 1), dtype=bool)
+        np.put_along_axis(excluded, sub.astype(np.int64), True, axis=1)
+        excluded[np.arange(len(sub)), main] = True
+        chances = np.where(excluded[:, :, None], 0.0, self._chance_by_class[None]).sum(axis=1)
+        chances /= chances.sum(axis=1, keepdims=True)
+        return np.concatenate([held, chances.astype(np.float32)], axis=1)
+
+    def _gains(self, keys: np.ndarray, upgrades: int, three_subs: bool) -> Tuple[np.ndarray, np.ndarray]:
+        # Score gained by each outcome and its probability, one row per key
+        if not three_subs:
+            sums, probabilities = outcome_table(upgrades)
+            return keys @ sums.T, np.broadcast_to(probabilities, (len(keys), len(probabilities)))
+
+        sums, probabilities = outcome_table(upgrades - 1, (0, 0, 0, 1))
+        base = keys[:, :3] @ sums[:, :3].T
+        fourth = sums[:, 3][None, None, :] * (self.classes / 10)[None, :, None]
+        gains = (base[:, None, :] + fourth).reshape(len(keys), -1)
+        chances = keys[:, 3:].astype(np.float64)
+        return gains, (chances[:, :, None] * probabilities[None, None, :]).reshape(len(keys), -1)
+
+    @staticmethod
+    def _reduce(gains: np.ndarray, probabilities: np.ndarray, inverse: np.ndarray, current: np.ndarray,
+                rows: np.ndarray, quantiles: Sequence[float], target: Optional[float],
+                estimates: Dict[str, np.ndarray]) -> None:
+        order = np.argsort(gains, axis=1)
+        gains = np.take_along_axis(gains, order, axis=1)
+        cumulative = np.cumsum(np.take_along_axis(probabilities, order, axis=1), axis=1)
+
+        expected = (gains * np.take_along_axis(probabilities, order, axis=1)).sum(axis=1)
+        estimates["expected"][rows] = current + expected[inverse]
+        found = np.stack([np.minimum((cumulative < q - 1e-9).sum(axis=1), gains.shape[1] - 1)
+                          for q in quantiles], axis=1)
+        estimates["quantiles"][rows] = current[:, None] + np.take_along_axis(gains, found, axis=1)[inverse]
+
+        if target is not None:
+            # Rows are laid end to end, shifted apart, to search them all at once
+            shift = np.arange(len(gains))[:, None] * (np.abs(gains).max() + np.abs(target) + current.max() + 1)
+            flat = (gains.astype(np.float64) + shift).ravel()
+            below = np.searchsorted(flat, target - current - 1e-6 + shift[inverse, 0]) - inverse * gains.shape[1]
+            missed = np.where(below > 0, cumulative.ravel()[inverse * gains.shape[1] + below - 1], 0.0)
+            estimates["chance"][rows] = np.clip(1 - missed, 0, 1)
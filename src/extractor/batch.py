@@ -0,0 +1,111 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from src.extractor.scheduler import ExtractionScheduler
+from src.extractor.validate import parse_json_answer
+
+
+def format_batch(items: List[Tuple[str, str]]) -> str:
+    """
+    Formats (id, input) pairs as the JSON array expected by the batch prompts,
+    e.g. EXTRACT_SUB_STAT_FROM_LIGHTCONE_BATCH. The id is the lightcone name.
+    """
+    return json.dumps([{"id": key, "ability": data} for key, data in items],
+                      ensure_ascii=False, indent=1)
+
+
+def parse_batch(answer: str, keys: List[str]) -> Dict[str, str]:
+    """
+    Parses the keyed JSON array answered to a batch prompt.
+
+    Args:
+        answer (str): Model output, optionally wrapped in a ```json code block
+        keys (list): Ids sent in the batch
+
+    Returns:
+        dict: Mapping from id to its "sub_stat" object as a JSON string, for the
+            ids found in the answer. Empty if the answer is not a JSON array
+    """
+    try:
+        elements = parse_json_answer(answer)
+    except ValueError:
+        return dict()
+    if not isinstance(elements, list):
+        return dict()
+
+    wanted = set(keys)
+    parsed = dict()
+    for element in elements:
+        if not isinstance(element, dict) or element.get("id") not in wanted:
+            continue
+        sub_stat = element.get("sub_stat")
+        if isinstance(sub_stat, dict):
+            parsed[element["id"]] = json.dumps(sub_stat, ensure_ascii=False, indent=4)
+    return parsed
+
+
+def extract_batched(scheduler: ExtractionScheduler, prompt_system: str,
+                    items: List[Tuple[str, str]], model_name: str,
+                    batch_size: int = 8,
+                    desc: Optional[str] = None) -> Dict[str, str]:
+    """
+    Extracts many inputs with a batch prompt, `batch_size` inputs per request, so
+    the system prompt is sent once per batch instead of once per input.
+
+    Batches run concurrently through `scheduler`, which keeps them inside the rate
+    budgets. Items missing from a parsed answer are sent again as a smaller batch.
+    When nothing of an answer can be parsed the batch is split in half and each
+    half is retried, so a single bad item only costs a few small requests. An item
+    that fails alone is left out of the outputs. Answers that left items out are
+    dropped from the response cache, so a rerun sends them to the model again
+    instead of replaying them.
+
+    Args:
+        scheduler (ExtractionScheduler): Scheduler running the requests
+        prompt_system (str): Batch system prompt
+        items (list): (id, input) pairs. Ids must be unique
+        model_name (str): Model to call
+        batch_size (int): Number of inputs per request
+        desc (str, optional): Progress bar description
+
+    Returns:
+        dict: Mapping from id to its output, for the ids that could be parsed
+    """
+    batch_size = max(1, batch_size)
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+    outputs: Dict[str, str] = dict()
+    with ThreadPoolExecutor(max_workers=scheduler.max_workers) as executor:
+        futures = [executor.submit(_extract_batch, scheduler, prompt_system, batch, model_name)
+                   for batch in batches]
+        for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+            outputs.update(future.result())
+    return outputs
+
+
+def _extract_batch(scheduler: ExtractionScheduler, prompt_system: str,
+                   batch: List[Tuple[str, str]], model_name: str) -> Dict[str, str]:
+    keys = [key for key, _ in batch]
+    message = format_batch(batch)
+    answer, _ = scheduler.extract(prompt_system, message, model_name)
+    outputs = parse_batch(answer, keys)
+
+    missing = [(key, data) for key, data in batch if key not in outputs]
+    if not missing:
+        return outputs
+    # Never replay an answer that left items out, see `iter_extract`
+    scheduler.forget(prompt_system, message, model_name)
+    if len(batch) == 1:
+        return outputs
+
+    if len(missing) == len(batch):
+        middle = len(batch) // 2
+        retries = [batch[:middle], batch[middle:]]
+    else:
+        retries = [missing]
+    for retry in retries:
+        outputs.update(_extract_batch(scheduler, prompt_system, retry, model_name))
+    return outputs
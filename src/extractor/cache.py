@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    On-disk cache of LLM responses, keyed by a hash of (model name, system
+    prompt, input).
+
+    Because the system prompt is part of the key, editing a prompt such as
+    EXTRACT_SUB_STAT_FROM_LIGHTCONE invalidates every response made with the old
+    prompt. Those entries are never hit again and are the first to be evicted:
+    the cache keeps at most `max_entries` responses and drops the least recently
+    used ones. The cache is safe to share between the scheduler's threads.
+
+    Args:
+        path (str): Path of the SQLite database
+        max_entries (int): Maximum number of cached responses
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                usage TEXT NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        self.conn.close()
+
+    @staticmethod
+    def key(model_name: str, prompt_system: str, data: str) -> str:
+        sha = hashlib.sha256()
+        for part in (model_name, prompt_system, data):
+            sha.update(part.encode("utf-8"))
+            sha.update(b"\0")
+        return sha.hexdigest()
+
+    def get(self, model_name: str, prompt_system: str, data: str) -> Optional[Tuple[str, Dict]]:
+        """
+        Returns the cached (answer, usage) of a request, or None.
+        """
+        key = self.key(model_name, prompt_system, data)
+        with self._lock:
+            row = self.conn.execute("SELECT answer, usage FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+        return row[0], json.loads(row[1])
+
+    def put(self, model_name: str, prompt_system: str, data: str, answer: str, usage: Dict) -> None:
+        """
+        Stores the (answer, usage) of a request and evicts the least recently used
+        responses beyond `max_entries`.
+        """
+        key = self.key(model_name, prompt_system, data)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, answer, usage, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, answer, json.dumps(usage), time.time())
+            )
+            self.conn.execute(
+                """
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+
+    def delete(self, model_name: str, prompt_system: str, data: str) -> None:
+        """
+        Drops the cached response of a request, e.g. an answer that failed validation.
+        """
+        key = self.key(model_name, prompt_system, data)
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
@@ -1,35 +1,146 @@
-from typing import List, Dict, Optional
-import json
-from time import sleep
-
-from tqdm import tqdm
+from typing import Dict, Iterator, List, Optional, Tuple
 
+from src.dataset import load_lightcones, load_relic_stats
 from src.extractor import LLMExtractor
+from src.extractor.cache import ResponseCache
+from src.extractor.scheduler import ExtractionScheduler
+from src.extractor.batch import extract_batched
+from src.extractor.metrics import ExtractionMetrics, print_metrics_report
+from src.extractor.pipeline import iter_extract
+from src.extractor.validate import SubStatNormalizer, validate_sub_stat
+
+
+def _build_scheduler(api_key: str, url: str,
+                     max_workers: int,
+                     rpm: Optional[int],
+                     tpm: Optional[int],
+                     cache_path: Optional[str],
+                     metrics: Optional[ExtractionMetrics]) -> Tuple[ExtractionScheduler, Optional[ResponseCache]]:
+    cache = ResponseCache(cache_path) if cache_path else None
+    # No SDK retries: the scheduler retries, each attempt inside the rate budget
+    llm = LLMExtractor(api_key, url, cache, metrics, max_retries=0)
+    return ExtractionScheduler(llm, max_workers=max_workers, rpm=rpm, tpm=tpm), cache
 
 
 def extract_lightcone(api_key: str, url: str, model: str,
                     prompt: str,
                     lightcone_path: str,
-                    wait: Optional[int] = None) -> List[Dict[str, str]]:
+                    wait: Optional[int] = None,
+                    max_workers: int = 4,
+                    rpm: Optional[int] = None,
+                    tpm: Optional[int] = None,
+                    cache_path: Optional[str] = None,
+                    batch_size: Optional[int] = None,
+                    metrics: Optional[ExtractionMetrics] = None) -> List[Dict[str, str]]:
+    """
+    Extracts the sub stats of every lightcone ability with the LLM.
+
+    Args:
+        api_key (str): API key of the OpenAI-compatible endpoint
+        url (str): Base URL of the endpoint
+        model (str): Model name
+        prompt (str): System prompt, e.g. EXTRACT_SUB_STAT_FROM_LIGHTCONE, or a
+            batch prompt such as EXTRACT_SUB_STAT_FROM_LIGHTCONE_BATCH when
+            `batch_size` is given
+        lightcone_path (str): Path to lightcone_info.json
+        wait (int, optional): Legacy throttle of one request every `wait` seconds.
+            Used as `rpm = 60 / wait` when `rpm` is not given
+        max_workers (int): Number of requests in flight at once
+        rpm (int, optional): Requests per minute budget
+        tpm (int, optional): Tokens per minute budget
+        cache_path (str, optional): SQLite file of the response cache. Cached
+            lightcones are not sent to the model again (see `ResponseCache`)
+        batch_size (int, optional): Number of lightcones per request. The output of
+            each lightcone is then its parsed sub stat JSON (see `extract_batched`),
+            None if its answer could not be parsed
+        metrics (ExtractionMetrics, optional): Collects latency, tokens and errors
+            of every call. A summary is printed at the end of the run
+
+    Returns:
+        list: {"name", "input", "output"} for each lightcone, in file order
+    """
+    if wait and rpm is None:
+        rpm = max(1, int(60 / wait))
+    scheduler, cache = _build_scheduler(api_key, url, max_workers, rpm, tpm, cache_path, metrics)
+    try:
+        lightcones = load_lightcones(lightcone_path)
+        lightcone_name = lightcones.names
+        abilities = lightcones.column("ability")
+        if batch_size:
+            outputs = extract_batched(scheduler, prompt, list(zip(lightcone_name, abilities)), model,
+                                      batch_size=batch_size, desc="Extract sub stat from lightcone")
+            responses = [outputs.get(name) for name in lightcone_name]
+        else:
+            results = scheduler.extract_many(prompt, abilities, model,
+                                             desc="Extract sub stat from lightcone")
+            responses = [response for response, usage in results]
+    finally:
+        if cache is not None:
+            cache.close()
+
     sub_stat_list = list()
-    llm = LLMExtractor(api_key, url)
-
-    with open(lightcone_path, 'r', encoding="utf-8") as f:
-        js = json.load(f)
-        lightcone_name = js.keys()
-        for name in tqdm(lightcone_name, total=len(lightcone_name), desc="Extract sub stat from lightcone"):
-            user = js[name]["ability"]
-            data = js[name]
-            del data["image"]
-            del data["rate"]
-            del data["type"]
-            info = js[name]["ability"]
-
-            response, usage = llm.extract(prompt, info, model)
-            sub_stat_list.append({
-                "name": name,
-                "input": user,
-                "output": response
-            })
-            if wait: sleep(wait)
+    for name, user, response in zip(lightcone_name, abilities, responses):
+        sub_stat_list.append({
+            "name": name,
+            "input": user,
+            "output": response
+        })
+    if metrics is not None:
+        print_metrics_report(metrics.summary(items=len(lightcone_name)))
     return sub_stat_list
+
+
+def iter_extract_lightcone(api_key: str, url: str, model: str,
+                           prompt: str,
+                           lightcone_path: str,
+                           relic_stats_path: str,
+                           checkpoint_path: Optional[str] = None,
+                           max_workers: int = 4,
+                           rpm: Optional[int] = None,
+                           tpm: Optional[int] = None,
+                           cache_path: Optional[str] = None,
+                           metrics: Optional[ExtractionMetrics] = None,
+                           max_attempts: int = 3) -> Iterator[Dict]:
+    """
+    Streaming version of `extract_lightcone`: yields each lightcone as soon as its
+    answer is validated and checkpoints it, so an interrupted run resumes (see
+    `iter_extract`).
+
+    Answers are parsed into {sub_stat_name: {"values", "notes"}} with the stat
+    names normalized against the sub stats scraped by `scrape_relic_stats` (see
+    `SubStatNormalizer`). Answers that do not follow the format are re-queued.
+
+    Args:
+        api_key (str): API key of the OpenAI-compatible endpoint
+        url (str): Base URL of the endpoint
+        model (str): Model name
+        prompt (str): System prompt, e.g. EXTRACT_SUB_STAT_FROM_LIGHTCONE
+        lightcone_path (str): Path to lightcone_info.json
+        relic_stats_path (str): Path to relic_status.json
+        checkpoint_path (str, optional): JSONL checkpoint to resume from and append to
+        max_workers (int): Number of requests in flight at once
+        rpm (int, optional): Requests per minute budget
+        tpm (int, optional): Tokens per minute budget
+        cache_path (str, optional): SQLite file of the response cache
+        metrics (ExtractionMetrics, optional): Collects latency, tokens and errors
+            of every call. A summary is printed at the end of the run
+        max_attempts (int): Attempts per lightcone before its answer is kept as invalid
+
+    Yields:
+        dict: {"name", "input", "output", "sub_stat", "error"}, in completion order
+    """
+    normalizer = SubStatNormalizer(load_relic_stats(relic_stats_path).sub_stat)
+    lightcones = load_lightcones(lightcone_path)
+    items = list(zip(lightcones.names, lightcones.column("ability")))
+
+    scheduler, cache = _build_scheduler(api_key, url, max_workers, rpm, tpm, cache_path, metrics)
+    try:
+        yield from iter_extract(scheduler, prompt, items, model,
+                                lambda answer: validate_sub_stat(answer, normalizer),
+                                checkpoint_path, max_attempts,
+                                desc="Extract sub stat from lightcone")
+    finally:
+        if cache is not None:
+            cache.close()
+    if metrics is not None:
+        print_metrics_report(metrics.summary(items=len(items)))
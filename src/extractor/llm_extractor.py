@@ -1,16 +1,62 @@
+import time
 from typing import Optional, Tuple, Dict
 
 from src.model import GoogleAI
+from src.extractor.cache import ResponseCache
+from src.extractor.metrics import ExtractionMetrics
 
 
 class LLMExtractor:
 
-    def __init__(self, api_key: str, url: str) -> None:
+    def __init__(self, api_key: str, url: str,
+                 cache: Optional[ResponseCache] = None,
+                 metrics: Optional[ExtractionMetrics] = None,
+                 max_retries: int = 2) -> None:
         self.llm = GoogleAI(api_key = api_key,
-                                url = url)
+                                url = url,
+                                max_retries = max_retries)
+        self.cache = cache
+        self.metrics = metrics
 
-    def extract(self, prompt_system: str, data: str, model_name: str = "gemini-2.0-flash") -> Tuple[str, Dict]:
-        response = self.llm.generate(prompt_system, data, model_name)
+    def cached(self, prompt_system: str, data: str,
+               model_name: str = "gemini-2.0-flash") -> Optional[Tuple[str, Dict]]:
+        """
+        Returns the cached (answer, usage) of a request without calling the model,
+        recorded as a cache hit, or None.
+        """
+        if self.cache is None:
+            return None
+        start = time.perf_counter()
+        cached = self.cache.get(model_name, prompt_system, data)
+        if cached is not None and self.metrics is not None:
+            self.metrics.record(model_name, time.perf_counter() - start, cached[1], cache_hit=True)
+        return cached
+
+    def forget(self, prompt_system: str, data: str, model_name: str = "gemini-2.0-flash") -> None:
+        """
+        Drops the cached response of a request, so it is sent to the model again.
+        """
+        if self.cache is not None:
+            self.cache.delete(model_name, prompt_system, data)
+
+    def extract(self, prompt_system: str, data: str, model_name: str = "gemini-2.0-flash",
+                use_cache: bool = True) -> Tuple[str, Dict]:
+        if use_cache:
+            cached = self.cached(prompt_system, data, model_name)
+            if cached is not None:
+                return cached
+
+        start = time.perf_counter()
+        try:
+            response = self.llm.generate(prompt_system, data, model_name)
+        except Exception as e:
+            if self.metrics is not None:
+                self.metrics.record(model_name, time.perf_counter() - start, error=e)
+            raise
         usage = response.usage.to_dict() 
         answer = response.choices[0].message.content
+        if self.metrics is not None:
+            self.metrics.record(model_name, time.perf_counter() - start, usage)
+        if self.cache is not None:
+            self.cache.put(model_name, prompt_system, data, answer, usage)
         return answer, usage
@@ -0,0 +1,206 @@
+import json
+import time
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+# USD per million (prompt, completion) tokens, used for the cost estimate
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00)
+}
+
+
+class CallRecord(NamedTuple):
+    model: str
+    latency: float
+    prompt_tokens: int
+    completion_tokens: int
+    cache_hit: bool
+    error: Optional[str]
+    timestamp: float
+
+
+class ExtractionMetrics:
+    """
+    Collects one record per `LLMExtractor.extract` call: latency, prompt and
+    completion tokens, model, whether the response came from the cache and the
+    class of the raised error, if any. The extractors of the scheduler are built
+    with `max_retries=0`, so a call is one HTTP request: calls retried by the
+    scheduler show up as one failed record (e.g. "RateLimitError") per attempt,
+    and latencies don't include backoff. An extractor left with SDK retries
+    records only the last attempt of each call, its latency including the SDK's
+    retries and waits.
+
+    The records can be summarized (see `summary`), appended to a JSONL file and
+    written in the Prometheus text format. Safe to share between threads.
+
+    Args:
+        prices (dict, optional): USD per million (prompt, completion) tokens for
+            each model. Defaults to `MODEL_PRICES`
+    """
+
+    def __init__(self, prices: Optional[Dict[str, Tuple[float, float]]] = None) -> None:
+        self.prices = MODEL_PRICES if prices is None else prices
+        self.records: List[CallRecord] = list()
+        self._lock = threading.Lock()
+
+    def record(self, model: str, latency: float,
+               usage: Optional[Dict] = None,
+               cache_hit: bool = False,
+               error: Optional[BaseException] = None) -> None:
+        usage = usage or dict()
+        record = CallRecord(
+            model=model,
+            latency=latency,
+            prompt_tokens=usage.get("prompt_tokens") or 0,
+            completion_tokens=usage.get("completion_tokens") or 0,
+            cache_hit=cache_hit,
+            error=None if error is None else type(error).__name__,
+            timestamp=time.time()
+        )
+        with self._lock:
+            self.records.append(record)
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        """
+        Estimated cost in USD, or None if the price of the model is unknown.
+        """
+        if model not in self.prices:
+            return None
+        prompt_price, completion_price = self.prices[model]
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+    def summary(self, items: Optional[int] = None) -> Dict:
+        """
+        Aggregates the records of the run.
+
+        Tokens and cost only count calls answered by the model; cache hits are
+        free. Latency percentiles only use successful model calls.
+
+        Args:
+            items (int, optional): Number of inputs extracted in the run, to
+                report tokens and cost per item
+
+        Returns:
+            dict: Aggregates of the whole run, plus the same per model
+        """
+        with self._lock:
+            records = list(self.records)
+
+        summary = self._aggregate(records, items)
+        summary["models"] = {
+            model: self._aggregate([r for r in records if r.model == model], None)
+            for model in sorted(set(r.model for r in records))
+        }
+        return summary
+
+    def _aggregate(self, records: List[CallRecord], items: Optional[int]) -> Dict:
+        answered = [r for r in records if r.error is None and not r.cache_hit]
+        latencies = np.array([r.latency for r in answered], dtype=np.float64)
+        prompt_tokens = sum(r.prompt_tokens for r in answered)
+        completion_tokens = sum(r.completion_tokens for r in answered)
+
+        errors: Dict[str, int] = dict()
+        for r in records:
+            if r.error is not None:
+                errors[r.error] = errors.get(r.error, 0) + 1
+
+        costs = [self.cost(r.model, r.prompt_tokens, r.completion_tokens) for r in answered]
+        cost = None if any(c is None for c in costs) else sum(costs)
+
+        aggregate = {
+            "calls": len(records),
+            "model_calls": len(answered),
+            "cache_hits": sum(r.cache_hit for r in records),
+            "errors": errors,
+            "latency_p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "latency_p95": float(np.percentile(latencies, 95)) if len(latencies) else None,
+            "latency_sum": float(latencies.sum()),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "estimated_cost": cost
+        }
+        if items:
+            aggregate["items"] = items
+            aggregate["tokens_per_item"] = aggregate["total_tokens"] / items
+            aggregate["cost_per_item"] = None if cost is None else cost / items
+        return aggregate
+
+    def dump_jsonl(self, path: str, items: Optional[int] = None, run: Optional[str] = None) -> None:
+        """
+        Appends every call record and then the run summary to a JSONL file. Lines
+        carry "type": "call" or "type": "summary", and the `run` label if given.
+        """
+        with self._lock:
+            records = list(self.records)
+        with open(path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps({"type": "call", "run": run, **record._asdict()}) + "\n")
+            f.write(json.dumps({"type": "summary", "run": run, **self.summary(items)}) + "\n")
+
+    def to_prometheus(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        models = self.summary()["models"]
+        lines = list()
+
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[Dict[str, str], float]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        metric("llm_calls_total", "counter", "Extractor calls, including cache hits and failed attempts.",
+               [({"model": m}, s["calls"]) for m, s in models.items()])
+        metric("llm_cache_hits_total", "counter", "Extractor calls answered from the response cache.",
+               [({"model": m}, s["cache_hits"]) for m, s in models.items()])
+        metric("llm_errors_total", "counter", "Failed model calls by error class.",
+               [({"model": m, "error": e}, n) for m, s in models.items() for e, n in s["errors"].items()])
+        metric("llm_tokens_total", "counter", "Tokens used by model calls.",
+               [({"model": m, "kind": kind}, s[f"{kind}_tokens"])
+                for m, s in models.items() for kind in ("prompt", "completion")])
+
+        lines.append("# HELP llm_latency_seconds Latency of successful model calls.")
+        lines.append("# TYPE llm_latency_seconds summary")
+        for m, s in models.items():
+            for quantile, key in (("0.5", "latency_p50"), ("0.95", "latency_p95")):
+                if s[key] is not None:
+                    lines.append(f'llm_latency_seconds{{model="{m}",quantile="{quantile}"}} {s[key]}')
+            lines.append(f'llm_latency_seconds_sum{{model="{m}"}} {s["latency_sum"]}')
+            lines.append(f'llm_latency_seconds_count{{model="{m}"}} {s["model_calls"]}')
+
+        metric("llm_estimated_cost_dollars", "counter", "Estimated cost of model calls in USD.",
+               [({"model": m}, s["estimated_cost"]) for m, s in models.items() if s["estimated_cost"] is not None])
+        return "\n".join(lines) + "\n"
+
+    def dump_prometheus(self, path: str) -> None:
+        """
+        Writes `to_prometheus` to a file, e.g. for the node exporter textfile collector.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+
+
+def print_metrics_report(summary: Dict) -> None:
+    """
+    Prints the aggregates returned by `ExtractionMetrics.summary`.
+    """
+    print(f"Calls: {summary['calls']} ({summary['model_calls']} answered by the model, "
+          f"{summary['cache_hits']} cache hits)")
+    for error, count in summary["errors"].items():
+        print(f"  {error}: {count}")
+    if summary["latency_p50"] is not None:
+        print(f"Latency: p50 {summary['latency_p50']:.2f}s, p95 {summary['latency_p95']:.2f}s")
+    print(f"Tokens: {summary['prompt_tokens']} prompt + {summary['completion_tokens']} completion")
+    if "tokens_per_item" in summary:
+        print(f"Tokens per item: {summary['tokens_per_item']:.1f}")
+    if summary["estimated_cost"] is not None:
+        print(f"Estimated cost: ${summary['estimated_cost']:.4f}")
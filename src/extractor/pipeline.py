@@ -0,0 +1,145 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import IO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from src.extractor.scheduler import ExtractionScheduler
+
+
+# Appended to the input of an item whose answer failed validation. Retries skip
+# the response cache, and rejected answers are dropped from it (see `_drain`)
+RETRY_HINT = "\n\nYour previous answer was rejected: {error}. Answer only with JSON in the required format."
+
+
+def load_checkpoint(path: str) -> Dict[str, Dict]:
+    """
+    Reads the valid records of a checkpoint written by `iter_extract`.
+
+    Args:
+        path (str): Path of the JSONL checkpoint
+
+    Returns:
+        dict: Mapping from name to its latest record without error
+    """
+    records = dict()
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line of a run that was killed while writing
+                continue
+            if record.get("error") is None:
+                records[record["name"]] = record
+            else:
+                records.pop(record["name"], None)
+    return records
+
+
+def iter_extract(scheduler: ExtractionScheduler, prompt_system: str,
+                 items: List[Tuple[str, str]], model_name: str,
+                 validate: Callable[[str], Dict],
+                 checkpoint_path: Optional[str] = None,
+                 max_attempts: int = 3,
+                 desc: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Extracts (name, input) items concurrently and yields each result as soon as
+    it is validated, appending it to a JSONL checkpoint first.
+
+    Items already in the checkpoint with the same input are yielded from it
+    without calling the model, so rerunning after a crash or quota error resumes
+    where the last run stopped. An answer rejected by `validate` is re-queued
+    with `RETRY_HINT` up to `max_attempts` times, bypassing the response cache;
+    after that the item is yielded and checkpointed with its error, and is tried
+    again on the next run. Rejected answers are removed from the response cache
+    so they are never replayed.
+
+    Args:
+        scheduler (ExtractionScheduler): Scheduler running the requests
+        prompt_system (str): System prompt
+        items (list): (name, input) pairs. Names must be unique
+        model_name (str): Model to call
+        validate (Callable): Parses an answer into a dict, raising ValueError if
+            the answer is invalid
+        checkpoint_path (str, optional): JSONL checkpoint, None to disable
+        max_attempts (int): Attempts per item before giving up
+        desc (str, optional): Progress bar description
+
+    Yields:
+        dict: {"name", "input", "output", "sub_stat", "error"} where "output" is the
+            validated result as a JSON string (the raw answer if it failed) and
+            "sub_stat" the validated dict (None if it failed)
+    """
+    done = load_checkpoint(checkpoint_path) if checkpoint_path else dict()
+    pending = list()
+    for name, data in items:
+        record = done.get(name)
+        if record is not None and record["input"] == data:
+            yield record
+        else:
+            pending.append((name, data))
+    if not pending:
+        return
+
+    checkpoint = None
+    if checkpoint_path:
+        directory = os.path.dirname(checkpoint_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        checkpoint = open(checkpoint_path, 'a', encoding='utf-8')
+    progress = tqdm(total=len(pending), desc=desc)
+    try:
+        with ThreadPoolExecutor(max_workers=scheduler.max_workers) as executor:
+            futures = {
+                executor.submit(scheduler.extract, prompt_system, data, model_name): (name, data, data, 1)
+                for name, data in pending
+            }
+            try:
+                yield from _drain(executor, futures, scheduler, prompt_system, model_name,
+                                  validate, max_attempts, checkpoint, progress)
+            finally:
+                # On errors or an early stop, don't send the requests still queued
+                for future in futures:
+                    future.cancel()
+    finally:
+        progress.close()
+        if checkpoint is not None:
+            checkpoint.close()
+
+
+def _drain(executor: ThreadPoolExecutor, futures: Dict,
+           scheduler: ExtractionScheduler, prompt_system: str, model_name: str,
+           validate: Callable[[str], Dict], max_attempts: int,
+           checkpoint: Optional[IO], progress: tqdm) -> Iterator[Dict]:
+    while futures:
+        finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in finished:
+            name, data, sent, attempt = futures.pop(future)
+            answer, _ = future.result()
+            try:
+                sub_stat, error = validate(answer), None
+            except ValueError as e:
+                sub_stat, error = None, str(e)
+                scheduler.forget(prompt_system, sent, model_name)
+                if attempt < max_attempts:
+                    retry = data + RETRY_HINT.format(error=error)
+                    futures[executor.submit(scheduler.extract, prompt_system, retry, model_name, False)] = \
+                        (name, data, retry, attempt + 1)
+                    continue
+
+            record = {
+                "name": name,
+                "input": data,
+                "output": answer if sub_stat is None else json.dumps(sub_stat, ensure_ascii=False, indent=4),
+                "sub_stat": sub_stat,
+                "error": error
+            }
+            if checkpoint is not None:
+                checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+            progress.update()
+            yield record
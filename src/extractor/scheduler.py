@@ -0,0 +1,125 @@
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from openai import APIConnectionError, InternalServerError, RateLimitError
+from tqdm import tqdm
+
+from src.extractor.llm_extractor import LLMExtractor
+from src.utils.rate_limit import RateBudget
+
+
+# Failures worth sending the same request again: 429, 5xx, timeouts and dropped
+# connections
+TRANSIENT_ERRORS = (RateLimitError, InternalServerError, APIConnectionError)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count of a text (about four characters per token).
+    """
+    return len(text) // 4 + 1
+
+
+class ExtractionScheduler:
+    """
+    Runs `LLMExtractor.extract` calls concurrently while staying inside the
+    requests-per-minute and tokens-per-minute budgets of the API.
+
+    Each call reserves its estimated prompt tokens plus `completion_tokens` in a
+    sliding one-minute budget, and the reservation is corrected with the real
+    usage once the response arrives. Responses in the extractor's cache are
+    returned before any budget is reserved, so cached reruns don't wait. Calls
+    that fail transiently (429, 5xx, timeouts, see `TRANSIENT_ERRORS`) are retried
+    with exponential backoff and jitter, honoring the Retry-After header if present.
+    Build the extractor with `max_retries=0`, otherwise the SDK retries inside a
+    call too, outside the budget.
+
+    Args:
+        llm (LLMExtractor): Extractor used for the calls
+        max_workers (int): Number of requests in flight at once
+        rpm (int, optional): Requests per minute, None for no limit
+        tpm (int, optional): Tokens per minute, None for no limit
+        max_retries (int): Retries of a call that failed transiently
+        completion_tokens (int): Completion tokens reserved per call before the
+            real usage is known
+        max_backoff (float): Longest wait between two retries, in seconds
+    """
+
+    def __init__(self, llm: LLMExtractor,
+                 max_workers: int = 4,
+                 rpm: Optional[int] = None,
+                 tpm: Optional[int] = None,
+                 max_retries: int = 5,
+                 completion_tokens: int = 512,
+                 max_backoff: float = 60.0) -> None:
+        self.llm = llm
+        self.max_workers = max(1, max_workers)
+        self.budget = RateBudget(rpm, tpm)
+        self.max_retries = max_retries
+        self.completion_tokens = completion_tokens
+        self.max_backoff = max_backoff
+
+    def extract(self, prompt_system: str, data: str, model_name: str,
+                use_cache: bool = True) -> Tuple[str, Dict]:
+        """
+        Same as `LLMExtractor.extract`, but waits for budget and retries transient
+        failures.
+        """
+        cached = self.llm.cached(prompt_system, data, model_name) if use_cache else None
+        if cached is not None:
+            return cached
+        estimate = estimate_tokens(prompt_system) + estimate_tokens(data) + self.completion_tokens
+        for attempt in range(self.max_retries + 1):
+            reservation = self.budget.acquire(estimate)
+            try:
+                answer, usage = self.llm.extract(prompt_system, data, model_name, use_cache=False)
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt, e))
+                continue
+            self.budget.reconcile(reservation, usage.get("total_tokens", estimate))
+            return answer, usage
+
+    def forget(self, prompt_system: str, data: str, model_name: str) -> None:
+        """
+        Drops the cached response of a request, see `LLMExtractor.forget`.
+        """
+        self.llm.forget(prompt_system, data, model_name)
+
+    def extract_many(self, prompt_system: str, inputs: List[str], model_name: str,
+                     desc: Optional[str] = None) -> List[Tuple[str, Dict]]:
+        """
+        Extracts every input concurrently. Identical inputs are sent only once.
+
+        Args:
+            prompt_system (str): System prompt shared by all calls
+            inputs (list): User messages
+            model_name (str): Model to call
+            desc (str, optional): Progress bar description
+
+        Returns:
+            list: (answer, usage) for each input, in the order of `inputs`
+        """
+        unique_inputs = list(dict.fromkeys(inputs))
+        answers: Dict[str, Tuple[str, Dict]] = dict()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.extract, prompt_system, data, model_name): data
+                for data in unique_inputs
+            }
+            for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+                answers[futures[future]] = future.result()
+        return [answers[data] for data in inputs]
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+        try:
+            return min(self.max_backoff, float(retry_after))
+        except (TypeError, ValueError):
+            return min(self.max_backoff, 2 ** attempt) * random.uniform(0.5, 1.5)
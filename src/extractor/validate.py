@@ -0,0 +1,116 @@
+import re
+import json
+from typing import Any, Dict, List
+
+from src.utils.match import NameIndex
+
+
+# Spellings models use for the stats of relic_status.json, by base name (no "%")
+STAT_ALIASES = {
+    "speed": "spd",
+    "attack": "atk",
+    "defense": "def",
+    "defence": "def",
+    "health": "hp",
+    "max_hp": "hp",
+    "crit_chance": "crit_rate",
+    "critical_rate": "crit_rate",
+    "critical_chance": "crit_rate",
+    "crit_damage": "crit_dmg",
+    "critical_dmg": "crit_dmg",
+    "critical_damage": "crit_dmg",
+    "break": "break_effect",
+    "break_eff": "break_effect",
+    "ehr": "effect_hit_rate",
+    "effect_hit": "effect_hit_rate",
+    "effect_resistance": "effect_res",
+    "effect_res_rate": "effect_res",
+    "be": "break_effect",
+    "cr": "crit_rate",
+    "cd": "crit_dmg"
+}
+
+
+def parse_json_answer(answer: str) -> Any:
+    """
+    Parses a model answer as JSON, optionally wrapped in a ```json code block.
+
+    Raises:
+        ValueError: If the answer is not valid JSON
+    """
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", answer, re.DOTALL)
+    text = fenced.group(1) if fenced else answer
+    return json.loads(text.strip())
+
+
+class SubStatNormalizer:
+    """
+    Maps the stat names written by the model onto the sub stat names scraped by
+    `scrape_relic_stats`, e.g. "CRIT DMG" -> "crit_dmg%" and "ATK" with the value
+    "+12%" -> "atk%".
+
+    Names are lowercased and joined with "_", known spellings are replaced (see
+    `STAT_ALIASES`), and the rest are matched fuzzily with a `NameIndex`. Whether
+    the flat or the percent stat is meant is decided by a trailing "%" on the name
+    or a "%" in the values. Stats outside the vocabulary, like energy regeneration
+    rate, keep their snake_case name.
+
+    Args:
+        sub_stats (list): Sub stat names, the "sub_stat" list of relic_status.json
+    """
+
+    def __init__(self, sub_stats: List[str]) -> None:
+        self.sub_stats = set(sub_stats)
+        bases = sorted(set(stat.rstrip('%') for stat in sub_stats))
+        self.index = NameIndex(bases, threshold=0.85)
+
+    def normalize(self, name: str, values: str = "") -> str:
+        key = re.sub(r"[^a-z0-9%]+", "_", name.lower()).strip("_")
+        percent = key.endswith("%") or "%" in values
+        base = key.rstrip("%").strip("_")
+        base = STAT_ALIASES.get(base, base)
+
+        match = self.index.match(base)
+        if match.key is not None and not match.ambiguous:
+            base = match.key
+
+        if percent and f"{base}%" in self.sub_stats:
+            return f"{base}%"
+        if base in self.sub_stats:
+            return base
+        if f"{base}%" in self.sub_stats:
+            return f"{base}%"
+        return f"{base}%" if percent else base
+
+
+def validate_sub_stat(answer: str, normalizer: SubStatNormalizer) -> Dict[str, Dict[str, str]]:
+    """
+    Parses and validates a model answer to EXTRACT_SUB_STAT_FROM_LIGHTCONE.
+
+    Args:
+        answer (str): Model output
+        normalizer (SubStatNormalizer): Stat name normalizer
+
+    Returns:
+        dict: {sub_stat_name: {"values": str, "notes": str}} with normalized names
+
+    Raises:
+        ValueError: If the answer is not JSON or does not follow the format
+    """
+    sub_stat = parse_json_answer(answer)
+    if not isinstance(sub_stat, dict):
+        raise ValueError(f"Expected a JSON object, got {type(sub_stat).__name__}")
+
+    validated = dict()
+    for name, stat in sub_stat.items():
+        if not isinstance(stat, dict) or "values" not in stat:
+            raise ValueError(f"Sub stat \"{name}\" has no \"values\"")
+        values = stat["values"]
+        if isinstance(values, list):
+            values = "/".join(str(value) for value in values)
+        values = str(values).strip()
+        if not values:
+            raise ValueError(f"Sub stat \"{name}\" has empty \"values\"")
+        notes = stat.get("notes") or ""
+        validated[normalizer.normalize(name, values)] = {"values": values, "notes": str(notes).strip()}
+    return validated
@@ -2,10 +2,13 @@ from openai import OpenAI
 
 
 class GoogleAI:
-    def __init__(self, api_key, url):
+    def __init__(self, api_key, url, max_retries=2):
+        # max_retries=0 leaves retries to the caller, e.g. `ExtractionScheduler`,
+        # so that every HTTP request goes through its rate budget
         self.client = OpenAI(
             api_key = api_key,
-            base_url = url
+            base_url = url,
+            max_retries = max_retries
         )
         
 
@@ -0,0 +1,159 @@
+import os
+import json
+import math
+from glob import glob
+from os.path import join, split, splitext
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, features
+from tqdm import tqdm
+
+from src.utils.check import check_exist_json_file
+
+
+def _source_images(image_dir: str) -> List[Tuple[str, str]]:
+    # (sprite name, path) pairs; of images sharing a name, e.g. "x.png" and
+    # "x.webp", only the first in sorted order is packed
+    images = dict()
+    for path in sorted(glob(join(image_dir, '*'))):
+        name = splitext(split(path)[-1])[0]
+        if name in images:
+            print(f"Skipping \"{path}\": an image named \"{name}\" is already packed ({images[name]})")
+            continue
+        images[name] = path
+    return list(images.items())
+
+
+def _source_signatures(images: List[Tuple[str, str]]) -> Dict[str, List[int]]:
+    signatures = dict()
+    for name, path in images:
+        stat = os.stat(path)
+        signatures[name] = [stat.st_size, stat.st_mtime_ns]
+    return signatures
+
+
+def build_atlas(image_dir: str, save_dir: str,
+                sizes: Sequence[int] = (256, 128, 64),
+                thumbnail_format: str = "webp",
+                force: bool = False) -> Dict[int, str]:
+    """
+    Packs the images of a directory (e.g. the output of `overlay_character_background`)
+    into one sprite atlas per size, and writes a thumbnail pyramid.
+
+    For every size `s` the following files are written to `save_dir`:
+        atlas_<s>.png   the atlas as a single image, for frontends and reports
+        atlas_<s>.npy   the same pixels as a raw RGBA array, memory-mappable
+        atlas_<s>.json  the coordinate index {"sprites": {name: {"x", "y", "w", "h"}}}
+        thumbnails/<s>/<name>.<thumbnail_format>
+    Each image is scaled to fit an `s` x `s` cell, keeping its aspect ratio. Smaller
+    levels are resized from the next larger one. Nothing is rebuilt when the source
+    images are unchanged since the last build. Sprites are named by file stem;
+    when several images share a stem only the first in sorted order is packed.
+
+    Args:
+        image_dir (str): Directory containing the source images
+        save_dir (str): Directory to save the atlases and thumbnails
+        sizes (Sequence[int]): Cell sizes of the pyramid, in pixels
+        thumbnail_format (str): "webp" or "png". Falls back to "png" when Pillow
+            is built without WebP support
+        force (bool): Rebuild even if the sources are unchanged
+
+    Returns:
+        dict: Mapping from size to the path of its atlas index
+    """
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+    if thumbnail_format == "webp" and not features.check("webp"):
+        thumbnail_format = "png"
+
+    images = _source_images(image_dir)
+    sources = _source_signatures(images)
+    sizes = sorted(sizes, reverse=True)
+    index_paths = {size: join(save_dir, f"atlas_{size}.json") for size in sizes}
+
+    if not force and all(check_exist_json_file(path).get("sources") == sources
+                         for path in index_paths.values()):
+        print(f"Atlases in \"{save_dir}\" are up to date")
+        return index_paths
+
+    names = [name for name, _ in images]
+    columns = max(1, math.ceil(math.sqrt(len(names))))
+    rows = max(1, math.ceil(len(names) / columns))
+    atlases = {size: np.zeros((rows * size, columns * size, 4), dtype=np.uint8) for size in sizes}
+    sprites: Dict[int, Dict[str, Dict[str, int]]] = {size: dict() for size in sizes}
+    for size in sizes:
+        os.makedirs(join(save_dir, "thumbnails", str(size)), exist_ok=True)
+
+    for i, (name, path) in enumerate(tqdm(images, desc="Packing")):
+        image = Image.open(path).convert("RGBA")
+        row, column = divmod(i, columns)
+        for size in sizes:
+            image.thumbnail((size, size), Image.LANCZOS)
+            image.save(join(save_dir, "thumbnails", str(size), f"{name}.{thumbnail_format}"))
+
+            # Center the thumbnail in its cell
+            x = column * size + (size - image.width) // 2
+            y = row * size + (size - image.height) // 2
+            atlases[size][y:y + image.height, x:x + image.width] = np.asarray(image)
+            sprites[size][name] = {"x": x, "y": y, "w": image.width, "h": image.height}
+
+    for size in sizes:
+        Image.fromarray(atlases[size], "RGBA").save(join(save_dir, f"atlas_{size}.png"))
+        np.save(join(save_dir, f"atlas_{size}.npy"), atlases[size])
+        with open(index_paths[size], 'w', encoding='utf-8') as f:
+            json.dump({
+                "size": size,
+                "columns": columns,
+                "rows": rows,
+                "image": f"atlas_{size}.png",
+                "array": f"atlas_{size}.npy",
+                "sprites": sprites[size],
+                "sources": sources
+            }, f, indent=4)
+
+    print(f"Packed {len(names)} images into {len(sizes)} atlases at \"{save_dir}\"")
+    return index_paths
+
+
+class SpriteAtlas:
+    """
+    Random access to the sprites of an atlas built by `build_atlas`. The pixels
+    are memory-mapped, so opening an atlas reads only its index and each sprite
+    lookup reads only the pages it touches.
+
+    Args:
+        index_path (str): Path of an atlas_<size>.json index
+    """
+
+    def __init__(self, index_path: str) -> None:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.size: int = index["size"]
+        self.sprites: Dict[str, Dict[str, int]] = index["sprites"]
+        self.pixels = np.load(join(os.path.dirname(index_path), index["array"]), mmap_mode='r')
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sprites
+
+    def __len__(self) -> int:
+        return len(self.sprites)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.sprites.keys())
+
+    def get(self, name: str) -> np.ndarray:
+        """
+        Returns the RGBA pixels of a sprite as a read-only view into the atlas.
+        """
+        box = self.sprites[name]
+        return self.pixels[box["y"]:box["y"] + box["h"], box["x"]:box["x"] + box["w"]]
+
+    def image(self, name: str) -> Optional[Image.Image]:
+        """
+        Returns a sprite as a PIL image, or None if it is not in the atlas.
+        """
+        if name not in self.sprites:
+            return None
+        return Image.fromarray(np.array(self.get(name)), "RGBA")
@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from tqdm import tqdm
+
+from src.utils.fetch import HEADERS
+from src.utils.rate_limit import TokenBucket
+
+
+class ImageDownloader:
+    """
+    Parallel, resumable downloader that stores images content-addressed.
+
+    Every downloaded body is stored once under `<save_dir>/.objects/<sha256>`
+    and the named images (`<name>.png`) are hard links (or copies, where links
+    are not supported) to those objects. A manifest maps each URL to the hash of
+    its content, so a URL is never fetched twice and identical images are never
+    stored twice, and records the URL each name was last linked from. An image of
+    an older run is only adopted as the content of a URL if its name has no
+    recorded URL or the same one, so images whose URL changed are fetched again.
+
+    Bodies are streamed into `.part` files, renamed atomically once complete. The
+    ETag (or Last-Modified) of the response is kept next to the part file, and a
+    failed download is resumed with a Range request conditioned on it
+    (If-Range), so a body that changed in between comes back whole instead of
+    being appended to the old part. Part files without a validator are fetched
+    again from the start.
+
+    Args:
+        save_dir (str): Directory where the named images are written
+        max_workers (int): Number of concurrent downloads
+        rate (float): Request rate of the token bucket, in requests per second
+        burst (float, optional): Bucket capacity, i.e. how many requests may
+            start back to back. Defaults to `max_workers`
+        chunk_size (int): Size of the streamed chunks in bytes
+        timeout (float): Request timeout in seconds
+    """
+
+    def __init__(self, save_dir: str,
+                 max_workers: int = 8,
+                 rate: float = 4.0,
+                 burst: Optional[float] = None,
+                 chunk_size: int = 64 * 1024,
+                 timeout: float = 30) -> None:
+        self.save_dir = save_dir
+        self.object_dir = os.path.join(save_dir, ".objects")
+        self.manifest_path = os.path.join(self.object_dir, "manifest.json")
+        self.names_path = os.path.join(self.object_dir, "names.json")
+        self.max_workers = max(1, max_workers)
+        self.bucket = TokenBucket(rate, burst if burst is not None else self.max_workers)
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self._local = threading.local()
+
+        os.makedirs(self.object_dir, exist_ok=True)
+        self.manifest: Dict[str, str] = self._load_json(self.manifest_path)
+        self.names: Dict[str, str] = self._load_json(self.names_path)
+
+    def download(self, images: Dict[str, str]) -> Dict[str, float]:
+        """
+        Downloads the images that are not stored yet and links every name to
+        its object.
+
+        Args:
+            images (dict): Mapping from output file name (without extension)
+                to image URL
+
+        Returns:
+            dict: Summary with the keys "downloaded", "skipped", "failed",
+                "bytes" and "time" (seconds)
+        """
+        start = time.perf_counter()
+        summary = {"downloaded": 0, "skipped": 0, "failed": 0, "bytes": 0}
+
+        # Group names by URL so each URL is fetched at most once
+        pending: Dict[str, List[str]] = dict()
+        for name, url in images.items():
+            target = self._target_path(name)
+            digest = self.manifest.get(url)
+            if digest is None and os.path.exists(target) and self.names.get(name, url) == url:
+                # Image from an older run of the same URL: adopt it instead of downloading again
+                digest = self._adopt(target)
+                self.manifest[url] = digest
+            if digest is not None and os.path.exists(self._object_path(digest)):
+                self._link(digest, target)
+                self.names[name] = url
+                summary["skipped"] += 1
+            else:
+                pending.setdefault(url, list()).append(name)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._fetch, url): url for url in pending}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Downloading"):
+                url = futures[future]
+                names = pending[url]
+                try:
+                    digest, size = future.result()
+                except Exception as e:
+                    print(f"Failed to download {', '.join(names)}: {e}")
+                    summary["failed"] += len(names)
+                    continue
+
+                self.manifest[url] = digest
+                for name in names:
+                    self._link(digest, self._target_path(name))
+                    self.names[name] = url
+                summary["downloaded"] += len(names)
+                summary["bytes"] += size
+
+        self._save_manifest()
+        summary["time"] = time.perf_counter() - start
+        return summary
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            self._local.session = session
+        return session
+
+    def _target_path(self, name: str) -> str:
+        return os.path.join(self.save_dir, f"{name}.png")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.object_dir, digest)
+
+    def _fetch(self, url: str) -> Tuple[str, int]:
+        part_path = os.path.join(
+            self.object_dir,
+            hashlib.sha256(url.encode("utf-8")).hexdigest() + ".part"
+        )
+        validator_path = part_path + ".json"
+        received = 0
+        while True:
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            validator = self._load_json(validator_path).get("if_range") if offset else None
+            headers = {"Range": f"bytes={offset}-", "If-Range": validator} if validator else {}
+
+            self.bucket.acquire()
+            with self._session().get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                start, total = _content_range(response)
+                if response.status_code == 416 and validator:
+                    # The part file holds the whole body only if it has its size
+                    if total == offset:
+                        break
+                    self._discard(part_path, validator_path)
+                    continue
+                response.raise_for_status()
+                if response.status_code == 206 and start != offset:
+                    self._discard(part_path, validator_path)
+                    continue
+                if response.status_code != 206:
+                    # Whole body: the validator of a later resume is this response's
+                    self._save_validator(validator_path, response)
+                with open(part_path, 'ab' if response.status_code == 206 else 'wb') as f:
+                    for chunk in response.iter_content(self.chunk_size):
+                        f.write(chunk)
+                        received += len(chunk)
+            break
+
+        digest = self._hash_file(part_path)
+        object_path = self._object_path(digest)
+        if os.path.exists(object_path):
+            os.remove(part_path)
+        else:
+            os.replace(part_path, object_path)
+        if os.path.exists(validator_path):
+            os.remove(validator_path)
+        return digest, received
+
+    @staticmethod
+    def _save_validator(path: str, response: requests.Response) -> None:
+        # If-Range only takes a strong ETag, else the Last-Modified date
+        etag = response.headers.get("ETag")
+        validator = etag if etag and not etag.startswith("W/") else response.headers.get("Last-Modified")
+        if validator is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"if_range": validator}, f)
+
+    @staticmethod
+    def _discard(*paths: str) -> None:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _adopt(self, path: str) -> str:
+        digest = self._hash_file(path)
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            shutil.copyfile(path, object_path)
+        return digest
+
+    def _link(self, digest: str, target: str) -> None:
+        object_path = self._object_path(digest)
+        if os.path.exists(target) and os.path.samefile(object_path, target):
+            return
+
+        tmp_path = target + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(object_path, tmp_path)
+        except OSError:
+            shutil.copyfile(object_path, tmp_path)
+        os.replace(tmp_path, target)
+
+    def _save_manifest(self) -> None:
+        for path, data in ((self.manifest_path, self.manifest), (self.names_path, self.names)):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp_path, path)
+
+    @staticmethod
+    def _load_json(path: str) -> Dict[str, str]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return dict()
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(block)
+        return sha.hexdigest()
+
+
+def _content_range(response: requests.Response) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Start and total size of a Content-Range header, e.g. "bytes 100-199/200" ->
+    (100, 200) and "bytes */200" -> (None, 200). None for what is missing.
+    """
+    value = response.headers.get("Content-Range", "")
+    unit, _, spec = value.partition(" ")
+    if unit != "bytes":
+        return None, None
+    span, _, total = spec.partition("/")
+    start = span.partition("-")[0]
+    return (int(start) if start.isdigit() else None,
+            int(total) if total.isdigit() else None)
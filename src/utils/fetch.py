@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Optional, Dict
+
+import requests
+
+from src.utils.rate_limit import HostRateLimiter
+
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+class CacheMiss(requests.exceptions.RequestException):
+    """Raised in offline mode when a URL has no cached response."""
+
+
+class Fetcher:
+    """
+    Shared HTTP fetch layer for the scrapers with an optional on-disk cache.
+
+    Cached responses are stored as one body file per URL plus an index holding
+    the ETag/Last-Modified validators. Cached URLs are revalidated with a
+    conditional GET, so an unchanged page costs a 304 instead of a full
+    download. The cache is bounded by `max_size` bytes and evicts the least
+    recently used bodies first. Access times of cache hits are kept in memory and
+    written with the index every `SAVE_EVERY` hits, on the next store and on
+    `close`; an offline fetcher never writes the index.
+
+    Args:
+        cache_dir (str, optional): Directory of the cache. None disables caching
+        max_size (int): Maximum total size of cached bodies in bytes
+        offline (bool): Only replay from the cache, never touch the network
+        rate_limit (float, optional): Maximum requests per second per host
+        headers (dict, optional): Request headers, defaults to `HEADERS`
+        timeout (float): Request timeout in seconds
+    """
+
+    # Cache hits between two writes of the index
+    SAVE_EVERY = 256
+
+    def __init__(self, cache_dir: Optional[str] = None,
+                 max_size: int = 512 * 1024 * 1024,
+                 offline: bool = False,
+                 rate_limit: Optional[float] = None,
+                 headers: Optional[Dict[str, str]] = None,
+                 timeout: float = 30) -> None:
+        if offline and cache_dir is None:
+            raise ValueError("Offline mode needs a cache_dir to replay from")
+
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.offline = offline
+        self.limiter = HostRateLimiter(rate_limit)
+        self.headers = headers or HEADERS
+        self.timeout = timeout
+        self.stats = {
+            "requests": 0,
+            "not_modified": 0,
+            "cache_hits": 0,
+            "bytes_downloaded": 0
+        }
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._index: Dict[str, Dict] = dict()
+        self._unsaved_hits = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._index = self._load_index()
+
+    def get(self, url: str) -> bytes:
+        """
+        Returns the body of `url`, using the cache when possible.
+
+        Args:
+            url (str): URL to fetch
+
+        Returns:
+            bytes: Response body
+
+        Raises:
+            CacheMiss: In offline mode, if `url` is not cached
+            requests.exceptions.HTTPError: If the server answers with an error
+        """
+        key = self._key(url)
+        with self._lock:
+            entry = self._index.get(key)
+
+        if self.offline:
+            if entry is None:
+                raise CacheMiss(f"No cached response for {url}")
+            self._count("cache_hits")
+            return self._read_body(key, entry)
+
+        headers = dict(self.headers)
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        self.limiter.wait(url)
+        response = self._session().get(url, headers=headers, timeout=self.timeout)
+        self._count("requests")
+
+        if response.status_code == 304 and entry is not None:
+            self._count("not_modified")
+            return self._read_body(key, entry)
+
+        response.raise_for_status()
+        content = response.content
+        self._count("bytes_downloaded", len(content))
+        if self.cache_dir is not None:
+            self._store(key, url, content,
+                        response.headers.get("ETag"),
+                        response.headers.get("Last-Modified"))
+        return content
+
+    def close(self) -> None:
+        """
+        Writes the access times of the cache hits not saved yet.
+        """
+        with self._lock:
+            if self._unsaved_hits and not self.offline:
+                self._save_index()
+
+    def __enter__(self) -> "Fetcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _session(self) -> requests.Session:
+        # requests.Session is not thread-safe, so each thread gets its own
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += value
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.body")
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, "index.json")
+
+    def _load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        # Drop entries whose body has gone missing
+        return {key: entry for key, entry in index.items()
+                if os.path.exists(self._body_path(key))}
+
+    def _save_index(self) -> None:
+        self._unsaved_hits = 0
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path())
+
+    def _read_body(self, key: str, entry: Dict) -> bytes:
+        with open(self._body_path(key), 'rb') as f:
+            content = f.read()
+        with self._lock:
+            entry["accessed"] = time.time()
+            if self.offline:
+                return content
+            self._unsaved_hits += 1
+            if self._unsaved_hits >= self.SAVE_EVERY:
+                self._save_index()
+        return content
+
+    def _store(self, key: str, url: str, content: bytes,
+               etag: Optional[str], last_modified: Optional[str]) -> None:
+        if len(content) > self.max_size:
+            return
+
+        tmp_path = self._body_path(key) + f".{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, self._body_path(key))
+
+        with self._lock:
+            self._index[key] = {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "size": len(content),
+                "accessed": time.time()
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self) -> None:
+        total = sum(entry["size"] for entry in self._index.values())
+        if total <= self.max_size:
+            return
+
+        for key in sorted(self._index, key=lambda k: self._index[k]["accessed"]):
+            entry = self._index.pop(key)
+            total -= entry["size"]
+            try:
+                os.remove(self._body_path(key))
+            except FileNotFoundError:
+                pass
+            if total <= self.max_size:
+                break
@@ -0,0 +1,40 @@
+import hashlib
+from typing import Dict, List
+
+
+def fingerprint(*blocks: object) -> str:
+    """
+    Computes a content fingerprint of the source blocks an entity is parsed from.
+
+    Args:
+        *blocks: HTML elements or strings. Elements are hashed through their markup
+
+    Returns:
+        str: Hex digest that changes whenever any of the blocks changes
+    """
+    sha = hashlib.sha256()
+    for block in blocks:
+        sha.update(str(block).encode("utf-8"))
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+
+def new_change_report() -> Dict[str, List[str]]:
+    """
+    Returns an empty report of the entities added, changed and removed by a scrape.
+    """
+    return {"added": list(), "changed": list(), "removed": list()}
+
+
+def print_change_report(changes: Dict[str, List[str]]) -> None:
+    """
+    Prints the entities added, changed and removed by a scrape.
+
+    Args:
+        changes (dict): Report created by `new_change_report`
+    """
+    for status in ("added", "changed", "removed"):
+        for name in changes[status]:
+            print(f"{status.upper():>8}: {name}")
+    print(f"{len(changes['added'])} added, {len(changes['changed'])} changed, "
+          f"{len(changes['removed'])} removed")
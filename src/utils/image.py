@@ -2,12 +2,96 @@ import json
 from glob import glob
 import os
 from os.path import split, join
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
-from PIL import Image, ImageDraw
-from Levenshtein import ratio
+from PIL import Image
 from tqdm import tqdm
 
+from src.dataset import load_characters
+from src.utils.check import check_exist_json_file
+from src.utils.match import NameIndex, print_match_report
+
+
+# Color stops of the background gradients, from the dark end to the light end
+GRADIENT_PALETTES = {
+    "purple": [(60, 20, 90), (210, 160, 255)],
+    "blue": [(20, 30, 80), (170, 210, 255)],
+    "yellow": [(110, 80, 45), (245, 215, 130)]
+}
+
+GRADIENT_DIRECTIONS = {
+    "right": 0.0,
+    "down": 90.0,
+    "left": 180.0,
+    "up": 270.0
+}
+
+
+def create_gradient(width: int, height: int,
+                    stops: Sequence,
+                    direction: Union[str, float] = "down") -> Image.Image:
+    """
+    Creates a linear gradient image, computed for all pixels at once with NumPy.
+    
+    Args:
+        width (int): Width of the gradient image
+        height (int): Height of the gradient image
+        stops (Sequence): Either RGB colors, spread evenly from start to end, or
+            (position, RGB color) pairs with positions between 0 and 1
+        direction (str | float): "down", "up", "right", "left" or an angle in
+            degrees (0 points right, 90 points down). The first stop is at the
+            start of the direction
+        
+    Returns:
+        PIL.Image: Generated RGB gradient image
+    """
+    if isinstance(stops[0][0], (int, np.integer)) and len(stops[0]) == 3:
+        positions = np.linspace(0.0, 1.0, len(stops))
+        colors = np.asarray(stops, dtype=np.float64)
+    else:
+        positions = np.asarray([stop[0] for stop in stops], dtype=np.float64)
+        colors = np.asarray([stop[1] for stop in stops], dtype=np.float64)
+
+    angle = np.deg2rad(GRADIENT_DIRECTIONS.get(direction, direction))
+    cos, sin = np.cos(angle), np.sin(angle)
+    cos, sin = (0.0 if abs(cos) < 1e-12 else cos), (0.0 if abs(sin) < 1e-12 else sin)
+
+    # Project pixel coordinates onto the direction and scale them to (0, 1].
+    # Axis-aligned gradients only need one row or column, which is then broadcast
+    xs = np.arange(1, width + 1)[None, :] if cos else np.zeros((1, 1))
+    ys = np.arange(1, height + 1)[:, None] if sin else np.zeros((1, 1))
+    corners = [cos * x + sin * y for x in (0, width) for y in (0, height)]
+    t = (cos * xs + sin * ys - min(corners)) / (max(corners) - min(corners))
+
+    line = np.empty(t.shape + (3,), dtype=np.uint8)
+    for channel in range(3):
+        line[..., channel] = np.interp(t, positions, colors[:, channel])
+    pixels = np.ascontiguousarray(np.broadcast_to(line, (height, width, 3)))
+    return Image.fromarray(pixels, "RGB")
+
+
+@lru_cache(maxsize=64)
+def get_gradient(width: int, height: int, palette: str,
+                 direction: Union[str, float] = "down") -> Image.Image:
+    """
+    Returns an RGBA background gradient from `GRADIENT_PALETTES`, cached by
+    (width, height, palette, direction). The returned image is shared between
+    callers and must not be modified in place.
+    
+    Args:
+        width (int): Width of the gradient image
+        height (int): Height of the gradient image
+        palette (str): Key of `GRADIENT_PALETTES`
+        direction (str | float): See `create_gradient`
+        
+    Returns:
+        PIL.Image: Cached RGBA gradient image
+    """
+    return create_gradient(width, height, GRADIENT_PALETTES[palette], direction).convert("RGBA")
+
 
 def create_darker_to_lighter_gradient(width: int, height: int, color: str = "blue") -> Image.Image:
     """
@@ -21,33 +105,7 @@ def create_darker_to_lighter_gradient(width: int, height: int, color: str = "blu
     Returns:
         PIL.Image: Generated gradient image with dark on top and light on bottom
     """
-    color_list = {
-        "purple": {
-            "bottom": (60, 20, 90),
-            "top": (210, 160, 255)
-        },
-        "blue": {
-            "bottom": (20, 30, 80),
-            "top": (170, 210, 255)
-        },
-        "yellow": {
-            "bottom": (110, 80, 45),
-            "top": (245, 215, 130)
-        }
-    }
-    image = Image.new("RGB", (width, height))
-    draw = ImageDraw.Draw(image)
-    
-    for y in range(height):
-        ratio = (height - y) / height
-        r = int(color_list[color]["top"][0] * ratio + color_list[color]["bottom"][0] * (1 - ratio))
-        g = int(color_list[color]["top"][1] * ratio + color_list[color]["bottom"][1] * (1 - ratio))
-        b = int(color_list[color]["top"][2] * ratio + color_list[color]["bottom"][2] * (1 - ratio))
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
-
-    # Flip vertically: dark on top, light on bottom
-    flipped_image = image.transpose(Image.FLIP_TOP_BOTTOM)
-    return flipped_image
+    return create_gradient(width, height, GRADIENT_PALETTES[color], "down")
 
 
 def overlay_image(image_1: Image.Image, image_2: Image.Image) -> Image.Image:
@@ -71,64 +129,168 @@ def overlay_image(image_1: Image.Image, image_2: Image.Image) -> Image.Image:
     return combined
 
 
+# Backgrounds loaded once per compositing worker process, keyed by path
+_worker_backgrounds: Dict[str, Image.Image] = dict()
+
+
+def _init_composite_worker(background_paths: List[str]) -> None:
+    for path in background_paths:
+        if path not in GRADIENT_PALETTES:
+            _worker_backgrounds[path] = Image.open(path).convert("RGBA")
+
+
+def _composite_one(job: Tuple[str, str, str, int]) -> str:
+    foreground_path, background, output_path, compress_level = job
+    foreground = Image.open(foreground_path).convert("RGBA")
+    if background in GRADIENT_PALETTES:
+        background_image = get_gradient(*foreground.size, background)
+    else:
+        background_image = _worker_backgrounds[background]
+    overlay_img = overlay_image(foreground, background_image)
+    overlay_img.save(output_path, compress_level=compress_level)
+    return output_path
+
+
+def _file_signature(path: str) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _background_signature(background: str) -> List:
+    if background in GRADIENT_PALETTES:
+        return [background] + [list(color) for color in GRADIENT_PALETTES[background]]
+    return [background] + _file_signature(background)
+
+
+def composite_images(jobs: List[Tuple[str, str, str]], save: str,
+                     compress_level: int = 6,
+                     max_workers: Optional[int] = None,
+                     force: bool = False) -> Dict[str, int]:
+    """
+    Overlays many foreground images onto backgrounds using a process pool.
+
+    A manifest in `save` records the size and modification time of the inputs of
+    every output. Outputs whose foreground, background and compression level are
+    unchanged are skipped, so adding one new image only composites that image.
+    Each worker process loads and converts every background once.
+
+    Args:
+        jobs (list): (foreground_path, background, output_name) tuples. The
+            background is an image path or a key of `GRADIENT_PALETTES`, which
+            uses a cached gradient of the foreground's size (see `get_gradient`)
+        save (str): Directory to save the output images
+        compress_level (int): PNG compression level, 0 (fastest) to 9 (smallest)
+        max_workers (int, optional): Number of processes. Defaults to the CPU count
+        force (bool): Rebuild every output even if it is up to date
+
+    Returns:
+        dict: Number of images "written" and "skipped"
+    """
+    if not os.path.exists(save):
+        os.makedirs(save)
+
+    manifest_path = join(save, ".manifest.json")
+    manifest = check_exist_json_file(manifest_path)
+
+    pending = list()
+    for foreground_path, background_path, output_name in jobs:
+        output_path = join(save, output_name)
+        record = {
+            "foreground": [foreground_path] + _file_signature(foreground_path),
+            "background": _background_signature(background_path),
+            "compress_level": compress_level
+        }
+        if not force and os.path.exists(output_path) and manifest.get(output_name) == record:
+            continue
+        manifest[output_name] = record
+        pending.append((foreground_path, background_path, output_path, compress_level))
+
+    if pending:
+        background_paths = sorted(set(job[1] for job in pending))
+        max_workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(pending) // (4 * max_workers))
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_init_composite_worker,
+                                 initargs=(background_paths,)) as executor:
+            for _ in tqdm(executor.map(_composite_one, pending, chunksize=chunksize),
+                          total=len(pending), desc="Overlaying"):
+                pass
+
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=4)
+
+    summary = {"written": len(pending), "skipped": len(jobs) - len(pending)}
+    print(f"Overlaid {summary['written']} images, {summary['skipped']} already up to date")
+    return summary
+
+
 def overlay_character_background(character_info_path: str, character_image_dir: str,
                                 purple_path: str, yellow_path: str,
-                                save: str) -> None:
+                                save: str,
+                                compress_level: int = 6,
+                                max_workers: Optional[int] = None,
+                                force: bool = False) -> Dict[str, int]:
     """
     Overlays character images onto appropriate background based on their rarity.
+    Characters are matched to image files by name (see `NameIndex`); characters
+    without a confident match are reported and skipped. Only characters whose image
+    or background changed are composited again (see `composite_images`).
     
     Args:
-        character_info_path (str): Path to JSON file containing character information
+        character_info_path (str): Path to character.json, read through its snapshot
+            (see `load_characters`)
         character_image_dir (str): Directory containing character images
-        purple_path (str): Path to purple background image for 4-star characters
-        yellow_path (str): Path to yellow background image for 5-star characters
+        purple_path (str): Path to purple background image for 4-star characters, or
+            "purple" to use a generated gradient (see `get_gradient`)
+        yellow_path (str): Path to yellow background image for 5-star characters, or
+            "yellow" to use a generated gradient
         save (str): Directory to save the output images
-    """
-    if not os.path.exists(save):
-        os.makedirs(save)
+        compress_level (int): PNG compression level, 0 (fastest) to 9 (smallest)
+        max_workers (int, optional): Number of processes. Defaults to the CPU count
+        force (bool): Rebuild every output even if it is up to date
 
+    Returns:
+        dict: Number of images "written" and "skipped"
+    """
     character_images = glob(os.path.join(character_image_dir, '*'))
-    yellow_background = Image.open(yellow_path).convert("RGBA")
-    purple_background = Image.open(purple_path).convert("RGBA")
-
-    with open(character_info_path, 'r', encoding="utf-8") as f:
-        js = json.load(f)
 
-        character_name_keys = js.keys()
-        for name in tqdm(character_name_keys, total=len(character_name_keys), desc="Overlaying"):
-            name_ratio_list = [ratio(split(path)[-1], name) for path in character_images]
-            max_index = np.argmax(name_ratio_list)
-            target_character_path = character_images[max_index]
+    characters = load_characters(character_info_path)
+    character_name_keys = characters.names
+    matches = NameIndex(character_images).match_many(character_name_keys)
+    print_match_report(matches)
 
-            character_image = Image.open(target_character_path).convert("RGBA")
-            if js[name]["rate"] == "4":
-                background_image = purple_background
-            else:
-                background_image = yellow_background
+    jobs = list()
+    for name, rarity, match in zip(character_name_keys, characters.column("rarity").tolist(), matches):
+        if match.key is None:
+            continue
+        background_path = purple_path if rarity == 4 else yellow_path
+        jobs.append((match.key, background_path, f"{name}.png"))
 
-            overlay_img = overlay_image(character_image, background_image)
-            overlay_img.save(join(save, f"{name}.png"))
+    return composite_images(jobs, save, compress_level, max_workers, force)
 
 
 def overlay_relic_background(relic_info_path: str, relic_image_dir: str,
-                           yellow_path: str, save: str) -> None:
+                           yellow_path: str, save: str,
+                           compress_level: int = 6,
+                           max_workers: Optional[int] = None,
+                           force: bool = False) -> Dict[str, int]:
     """
-    Overlays relic images onto a yellow background.
+    Overlays relic images onto a yellow background. Only relics whose image or
+    background changed are composited again (see `composite_images`).
     
     Args:
         relic_info_path (str): Path to JSON file containing relic information
         relic_image_dir (str): Directory containing relic images
-        yellow_path (str): Path to yellow background image
+        yellow_path (str): Path to yellow background image, or "yellow" to use a
+            generated gradient (see `get_gradient`)
         save (str): Directory to save the output images
-    """
-    if not os.path.exists(save):
-        os.makedirs(save)
+        compress_level (int): PNG compression level, 0 (fastest) to 9 (smallest)
+        max_workers (int, optional): Number of processes. Defaults to the CPU count
+        force (bool): Rebuild every output even if it is up to date
 
+    Returns:
+        dict: Number of images "written" and "skipped"
+    """
     relic_images = glob(os.path.join(relic_image_dir, '*'))
-    yellow_background = Image.open(yellow_path).convert("RGBA")
-
-    for path in tqdm(relic_images, total=len(relic_images), desc="Overlaying"):
-        fname = split(path)[-1]
-        relic_image = Image.open(path).convert("RGBA")
-        overlay_img = overlay_image(relic_image, yellow_background)
-        overlay_img.save(join(save, fname))
\ No newline at end of file
+    jobs = [(path, yellow_path, split(path)[-1]) for path in relic_images]
+    return composite_images(jobs, save, compress_level, max_workers, force)
@@ -0,0 +1,194 @@
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+import numpy as np
+from Levenshtein import ratio
+
+
+class Match(NamedTuple):
+    """
+    Result of looking a name up in a `NameIndex`.
+
+    Attributes:
+        query (str): Name that was looked up
+        key (str | None): Best indexed name, None if nothing reached the threshold
+        score (float): Similarity of the best candidate, between 0 and 1
+        runner_up (str | None): Second best indexed name, or the closest name when
+            nothing reached the threshold
+        ambiguous (bool): True if the runner-up scored within the margin of the best
+    """
+    query: str
+    key: Optional[str]
+    score: float
+    runner_up: Optional[str]
+    ambiguous: bool
+
+
+class NameIndex:
+    """
+    Fuzzy name lookup that avoids scoring every query against every name.
+
+    Names are normalized (file directory and extension dropped, lowercase, runs of
+    non-alphanumeric characters turned into "_") and indexed by character
+    n-grams. A query is only scored with Levenshtein ratio against the names
+    sharing the most n-grams with it (ties broken by index order), which keeps
+    matching near-linear in the number of names. `match_many` counts the shared
+    n-grams of all queries in one vectorized pass over the index.
+
+    Args:
+        names (Iterable[str]): Names or file paths to index
+        n (int): Length of the n-grams
+        threshold (float): Minimum similarity for a match
+        margin (float): A match is ambiguous when the runner-up scores within
+            `margin` of the best candidate
+        max_candidates (int): Number of candidates scored per query
+    """
+
+    def __init__(self, names: Iterable[str],
+                 n: int = 3,
+                 threshold: float = 0.8,
+                 margin: float = 0.05,
+                 max_candidates: int = 10) -> None:
+        self.n = n
+        self.threshold = threshold
+        self.margin = margin
+        self.max_candidates = max_candidates
+
+        self.names: List[str] = list(names)
+        self.keys: List[str] = [self.normalize(name) for name in self.names]
+        self._exact: Dict[str, int] = dict()
+        self._grams: Dict[str, Set[int]] = defaultdict(set)
+        for i, key in enumerate(self.keys):
+            self._exact.setdefault(key, i)
+            for gram in self._ngrams(key):
+                self._grams[gram].add(i)
+
+        # The same postings as flat arrays: names of gram g are
+        # _postings[_offsets[g]:_offsets[g + 1]]
+        self._gram_ids: Dict[str, int] = {gram: g for g, gram in enumerate(self._grams)}
+        sizes = np.array([len(names) for names in self._grams.values()], dtype=np.int64)
+        self._offsets = np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(sizes)])
+        self._postings = np.array([i for names in self._grams.values() for i in sorted(names)], dtype=np.int64)
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """
+        Normalizes a name or file path into a comparable key.
+
+        Args:
+            name (str): Name or file path
+
+        Returns:
+            str: Key such as "but_the_battle_isn_t_over"
+        """
+        name = os.path.splitext(os.path.basename(name))[0].lower()
+        return '_'.join(filter(None, re.split(r'[^a-z0-9]+', name)))
+
+    def _ngrams(self, key: str) -> Set[str]:
+        padded = f" {key} "
+        return {padded[i:i + self.n] for i in range(max(1, len(padded) - self.n + 1))}
+
+    def match(self, query: str) -> Match:
+        """
+        Finds the indexed name closest to `query`.
+
+        Args:
+            query (str): Name to look up
+
+        Returns:
+            Match: Best match, with key None if no name reaches the threshold
+        """
+        key = self.normalize(query)
+        if key in self._exact:
+            return Match(query, self.names[self._exact[key]], 1.0, None, False)
+
+        shared = Counter()
+        for gram in self._ngrams(key):
+            shared.update(self._grams.get(gram, ()))
+        candidates = sorted(shared, key=lambda i: (-shared[i], i))[:self.max_candidates]
+        return self._best(query, key, candidates)
+
+    def _best(self, query: str, key: str, candidates: List[int]) -> Match:
+        # Scores the candidates of a query, ties going to the later name
+        if not candidates:
+            return Match(query, None, 0.0, None, False)
+
+        scored = sorted(((ratio(key, self.keys[i]), i) for i in candidates), reverse=True)
+        best_score, best = scored[0]
+        runner_up = self.names[scored[1][1]] if len(scored) > 1 else None
+        ambiguous = len(scored) > 1 and best_score - scored[1][0] < self.margin
+        if best_score < self.threshold:
+            return Match(query, None, best_score, self.names[best], ambiguous)
+        return Match(query, self.names[best], best_score, runner_up, ambiguous)
+
+    def match_many(self, queries: Iterable[str]) -> List[Match]:
+        """
+        Looks up several names at once, same results as `match` for each.
+
+        The n-grams shared by every (query, name) pair are counted in one
+        vectorized pass over the postings, and the top `max_candidates` names of
+        each query are selected with a single sort. Only these candidates are then
+        scored with Levenshtein ratio, one pair at a time.
+
+        Args:
+            queries (Iterable[str]): Names to look up
+
+        Returns:
+            list: One `Match` per query, in the same order
+        """
+        queries = list(queries)
+        keys = [self.normalize(query) for query in queries]
+        matches: List[Optional[Match]] = [None] * len(queries)
+
+        # (query, gram) pairs of the queries without an exact match
+        rows, grams = list(), list()
+        for q, key in enumerate(keys):
+            if key in self._exact:
+                matches[q] = Match(queries[q], self.names[self._exact[key]], 1.0, None, False)
+                continue
+            ids = [self._gram_ids[gram] for gram in self._ngrams(key) if gram in self._gram_ids]
+            rows.extend([q] * len(ids))
+            grams.extend(ids)
+        rows, grams = np.array(rows, dtype=np.int64), np.array(grams, dtype=np.int64)
+
+        # Expand each pair into the names of its gram, then count the (query, name) pairs
+        starts, sizes = self._offsets[grams], self._offsets[grams + 1] - self._offsets[grams]
+        ends = np.cumsum(sizes)
+        positions = np.arange(ends[-1] if len(ends) else 0) + np.repeat(starts - (ends - sizes), sizes)
+        pairs, shared = np.unique(np.repeat(rows, sizes) * len(self.names) + self._postings[positions],
+                                  return_counts=True)
+        pair_query, pair_name = pairs // len(self.names), pairs % len(self.names)
+
+        # Most shared n-grams first within each query, then lower index
+        order = np.lexsort((pair_name, -shared, pair_query))
+        pair_query, pair_name = pair_query[order], pair_name[order]
+        first = np.searchsorted(pair_query, pair_query)
+        keep = np.arange(len(pair_query)) - first < self.max_candidates
+        pair_query, pair_name = pair_query[keep], pair_name[keep]
+
+        bounds = np.searchsorted(pair_query, np.arange(len(queries) + 1))
+        for q in range(len(queries)):
+            if matches[q] is None:
+                candidates = pair_name[bounds[q]:bounds[q + 1]].tolist()
+                matches[q] = self._best(queries[q], keys[q], candidates)
+        return matches
+
+
+def print_match_report(matches: List[Match]) -> None:
+    """
+    Prints every query that was not matched or was matched ambiguously.
+
+    Args:
+        matches (list): Results of `NameIndex.match`/`NameIndex.match_many`
+    """
+    missing = [m for m in matches if m.key is None]
+    ambiguous = [m for m in matches if m.key is not None and m.ambiguous]
+    for m in missing:
+        closest = f" (closest: \"{m.runner_up}\", {m.score:.2f})" if m.runner_up else ""
+        print(f"No match for \"{m.query}\"{closest}")
+    for m in ambiguous:
+        print(f"Ambiguous match for \"{m.query}\": \"{m.key}\" ({m.score:.2f}) vs \"{m.runner_up}\"")
+    if missing or ambiguous:
+        print(f"{len(missing)} unmatched, {len(ambiguous)} ambiguous out of {len(matches)} names")
@@ -0,0 +1,68 @@
+import importlib.util
+from typing import List, Optional, Union
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+# Fastest first. "auto" picks the first one that is installed
+BACKENDS = ["lxml", "html.parser"]
+
+
+def available_backends() -> List[str]:
+    """
+    Lists the installed BeautifulSoup tree builders, fastest first.
+
+    Returns:
+        list: Names that can be passed as `backend` to `make_soup`
+    """
+    return [backend for backend in BACKENDS
+            if backend == "html.parser" or importlib.util.find_spec(backend) is not None]
+
+
+def class_strainer(tag: str, *classes: str) -> SoupStrainer:
+    """
+    Builds a SoupStrainer keeping only `tag` elements (and their subtrees) that
+    carry at least one of `classes`.
+
+    A callable is used instead of a plain class string because BeautifulSoup
+    matches strainer strings against the whole class attribute, while `find`
+    matches single class names.
+
+    Args:
+        tag (str): Tag name, e.g. "div"
+        *classes (str): Class names to keep
+
+    Returns:
+        SoupStrainer: Strainer to pass as `parse_only`
+    """
+    wanted = set(classes)
+
+    def match(value: Optional[Union[str, List[str]]]) -> bool:
+        if value is None:
+            return False
+        names = value.split() if isinstance(value, str) else value
+        return not wanted.isdisjoint(names)
+
+    return SoupStrainer(tag, class_=match)
+
+
+def make_soup(content: Union[str, bytes],
+              parse_only: Optional[SoupStrainer] = None,
+              backend: str = "auto") -> BeautifulSoup:
+    """
+    Parses HTML with the requested backend, optionally building only the
+    subtrees selected by `parse_only`.
+
+    Args:
+        content (str | bytes): HTML document
+        parse_only (SoupStrainer, optional): Restricts the tree to the matched
+            elements. Everything else is skipped while parsing
+        backend (str): "auto", "lxml" or "html.parser". "auto" uses lxml when it
+            is installed and falls back to html.parser
+
+    Returns:
+        BeautifulSoup: Parsed document
+    """
+    if backend == "auto":
+        backend = available_backends()[0]
+    return BeautifulSoup(content, backend, parse_only=parse_only)
@@ -0,0 +1,149 @@
+import time
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from urllib.parse import urlparse
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests so that each host receives at most `rate` requests
+    per second. Requests to different hosts do not wait on each other.
+
+    Args:
+        rate (float, optional): Maximum requests per second per host. None or 0
+            disables limiting.
+    """
+
+    def __init__(self, rate: Optional[float] = None) -> None:
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot: Dict[str, float] = dict()
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> None:
+        """
+        Blocks until a request to the host of `url` is allowed.
+
+        Args:
+            url (str): URL that is about to be requested
+        """
+        if not self.interval:
+            return
+
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared between threads. Tokens refill at `rate`
+    per second up to `capacity`, so short bursts are allowed while the long-run
+    rate stays bounded.
+
+    Args:
+        rate (float): Tokens added per second
+        capacity (float, optional): Maximum number of stored tokens. Defaults
+            to `rate`, i.e. at most one second worth of burst
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Blocks until `tokens` tokens are available and takes them.
+
+        Args:
+            tokens (float): Number of tokens to take
+        """
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+class RateBudget:
+    """
+    Sliding one-minute budget on requests and tokens, as enforced by LLM APIs
+    (requests per minute and tokens per minute). Callers reserve an estimated
+    token count before a request and correct it with the real usage afterwards.
+
+    Args:
+        rpm (int, optional): Requests per minute, None for no limit
+        tpm (int, optional): Tokens per minute, None for no limit
+        window (float): Length of the sliding window in seconds
+    """
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None,
+                 window: float = 60.0) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._events: Deque[List[float]] = deque()
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self._events and self._events[0][0] <= now - self.window:
+            self._tokens -= self._events.popleft()[1]
+
+    def acquire(self, tokens: float = 0.0) -> List[float]:
+        """
+        Blocks until one more request of `tokens` tokens fits in the budget, then
+        reserves it.
+
+        Args:
+            tokens (float): Estimated tokens of the request
+
+        Returns:
+            list: Reservation to pass to `reconcile` once the real usage is known
+        """
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                fits_rpm = not self.rpm or len(self._events) < self.rpm
+                fits_tpm = not self.tpm or self._tokens + tokens <= self.tpm
+                if fits_rpm and fits_tpm:
+                    event = [now, tokens]
+                    self._events.append(event)
+                    self._tokens += tokens
+                    return event
+                # Wait until the oldest request leaves the window
+                delay = self._events[0][0] + self.window - now if self._events else 0.01
+            time.sleep(max(delay, 0.01))
+
+    def reconcile(self, event: List[float], tokens: float) -> None:
+        """
+        Replaces the estimated tokens of a reservation with the real usage.
+
+        Args:
+            event (list): Reservation returned by `acquire`
+            tokens (float): Tokens actually used by the request
+        """
+        with self._lock:
+            if any(e is event for e in self._events):
+                self._tokens += tokens - event[1]
+            event[1] = tokens
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import sqlite3
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.utils.check import check_exist_json_file
+
+
+class EntityStore:
+    """
+    SQLite store holding one row per scraped entity (relic set, lightcone,
+    character), indexed by name.
+
+    Every `put` is committed immediately, so a crash only loses the entity that
+    was being scraped, and entities can be read back by name without loading the
+    whole dataset. `export_json` writes the usual `{name: data}` JSON layout for
+    existing consumers.
+
+    Args:
+        path (str): Path of the SQLite database
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entities (
+                name TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                fingerprint TEXT,
+                updated REAL NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def __enter__(self) -> "EntityStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __contains__(self, name: str) -> bool:
+        row = self.conn.execute("SELECT 1 FROM entities WHERE name = ?", (name,)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get(self, name: str) -> Optional[Dict]:
+        """
+        Returns the data of one entity, or None if it is not stored.
+        """
+        row = self.conn.execute("SELECT data FROM entities WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_fingerprint(self, name: str) -> Optional[str]:
+        """
+        Returns the source fingerprint stored with an entity, or None.
+        """
+        row = self.conn.execute("SELECT fingerprint FROM entities WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, name: str, data: Dict, fingerprint: Optional[str] = None) -> None:
+        """
+        Inserts or replaces an entity and commits right away. Replaced entities
+        keep their position in the export order.
+
+        Args:
+            name (str): Entity name
+            data (dict): Entity data, must be JSON serializable
+            fingerprint (str, optional): Fingerprint of the source block
+        """
+        self.put_many([(name, data, fingerprint)])
+
+    def put_many(self, entities: List[Tuple[str, Dict, Optional[str]]]) -> None:
+        """
+        Inserts or replaces several entities in one transaction.
+
+        Args:
+            entities (list): (name, data, fingerprint) tuples
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO entities (name, data, fingerprint, updated) VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    data = excluded.data,
+                    fingerprint = excluded.fingerprint,
+                    updated = excluded.updated
+                """,
+                [(name, json.dumps(data, ensure_ascii=False), fingerprint, now)
+                 for name, data, fingerprint in entities]
+            )
+
+    def delete(self, name: str) -> None:
+        self.delete_many([name])
+
+    def delete_many(self, names: List[str]) -> None:
+        """
+        Deletes several entities in one transaction, e.g. the ones a scrape no
+        longer finds.
+        """
+        with self.conn:
+            self.conn.executemany("DELETE FROM entities WHERE name = ?", [(name,) for name in names])
+
+    def names(self) -> List[str]:
+        """
+        Returns the names of all entities, in insertion order.
+        """
+        return [row[0] for row in self.conn.execute("SELECT name FROM entities ORDER BY rowid")]
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        """
+        Iterates over (name, data) in insertion order without loading all rows at once.
+        """
+        for name, data in self.conn.execute("SELECT name, data FROM entities ORDER BY rowid"):
+            yield name, json.loads(data)
+
+    def export_json(self, save_path: str) -> None:
+        """
+        Writes all entities as the `{name: data}` JSON file the rest of the project
+        reads. The file is written to a temporary path and renamed, so readers
+        never see a half-written file.
+
+        Args:
+            save_path (str): Path of the JSON file
+        """
+        tmp_path = save_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(self.items()), f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, save_path)
+
+
+def store_path(save_path: str) -> str:
+    """
+    Returns the path of the store kept next to a data file,
+    e.g. "character.json" -> "character.sqlite".
+    """
+    root, _ = os.path.splitext(save_path)
+    return f"{root}.sqlite"
+
+
+def open_store(save_path: str) -> EntityStore:
+    """
+    Opens the store of a data file. A new store is seeded from the existing
+    JSON file, so the change report of the first scrape compares against it.
+    Seeded entities have no fingerprint, so they are parsed once again.
+
+    Args:
+        save_path (str): Path of the JSON data file
+
+    Returns:
+        EntityStore: Store located next to `save_path`
+    """
+    is_new = not os.path.exists(store_path(save_path))
+    store = EntityStore(store_path(save_path))
+    if is_new:
+        data = check_exist_json_file(save_path)
+        store.put_many([(name, info, None) for name, info in data.items()])
+    return store
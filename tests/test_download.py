@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.download import ImageDownloader
+
+
+class ImageServer:
+    # Local stand-in of an image host: serves `bodies` with a strong ETag and
+    # honors Range and If-Range like a real server
+    def __init__(self, bodies: dict) -> None:
+        self.bodies = bodies
+        self.requests = list()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                body = server.bodies[self.path]
+                etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                ranged = self.headers.get("Range")
+                if ranged and self.headers.get("If-Range", etag) != etag:
+                    ranged = None
+                if ranged:
+                    start = int(ranged.split("=")[1].rstrip("-"))
+                    if start >= len(body):
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{len(body)}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+                    body = body[start:]
+                else:
+                    self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = ImageServer({"/a.png": bytes(range(256)) * 40})
+    yield server
+    server.close()
+
+
+def interrupted(downloader: ImageDownloader, url: str, prefix: bytes, validator: str = None) -> str:
+    # Leaves a part file as a failed download of `url` would
+    part_path = os.path.join(downloader.object_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".part")
+    with open(part_path, 'wb') as f:
+        f.write(prefix)
+    if validator is not None:
+        with open(part_path + ".json", 'w', encoding='utf-8') as f:
+            json.dump({"if_range": validator}, f)
+    return part_path
+
+
+def etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+
+
+def test_download_and_skip(tmp_path, server):
+    downloader = ImageDownloader(str(tmp_path), rate=100)
+    url = server.url + "/a.png"
+    assert downloader.download({"a": url})["downloaded"] == 1
+    assert (tmp_path / "a.png").read_bytes() == server.bodies["/a.png"]
+    assert ImageDownloader(str(tmp_path), rate=100).download({"a": url})["skipped"] == 1
+    assert len(server.requests) == 1
+
+
+def test_resume_unchanged(tmp_path, server):
+    downloader = ImageDownloader(str(tmp_path), rate=100)
+    url, body = server.url + "/a.png", server.bodies["/a.png"]
+    interrupted(downloader, url, body[:1000], etag(body))
+    assert downloader.download({"a": url})["bytes"] == len(body) - 1000
+    assert server.requests[0]["Range"] == "bytes=1000-"
+    assert (tmp_path / "a.png").read_bytes() == body
+    assert not [name for name in os.listdir(downloader.object_dir) if ".part" in name]
+
+
+def test_resume_changed(tmp_path, server):
+    # The image changed since the part file was written: it comes back whole
+    downloader = ImageDownloader(str(tmp_path), rate=100)
+    url, old = server.url + "/a.png", server.bodies["/a.png"]
+    interrupted(downloader, url, old[:1000], etag(old))
+    server.bodies["/a.png"] = b"new" * 3000
+    downloader.download({"a": url})
+    assert server.requests[0]["If-Range"] == etag(old)
+    assert (tmp_path / "a.png").read_bytes() == b"new" * 3000
+
+
+def test_part_without_validator_restarts(tmp_path, server):
+    downloader = ImageDownloader(str(tmp_path), rate=100)
+    url = server.url + "/a.png"
+    interrupted(downloader, url, b"x" * 1000)
+    downloader.download({"a": url})
+    assert "Range" not in server.requests[0]
+    assert (tmp_path / "a.png").read_bytes() == server.bodies["/a.png"]
+
+
+@pytest.mark.parametrize("extra", [0, 10])
+def test_416_checks_size(tmp_path, server, extra):
+    # A part file of the full size is complete, a longer one is fetched again
+    downloader = ImageDownloader(str(tmp_path), rate=100)
+    url, body = server.url + "/a.png", server.bodies["/a.png"]
+    interrupted(downloader, url, body + b"x" * extra, etag(body))
+    downloader.download({"a": url})
+    assert (tmp_path / "a.png").read_bytes() == body
+    assert len(server.requests) == (1 if extra == 0 else 2)
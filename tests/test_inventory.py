@@ -0,0 +1,67 @@
+import os
+import sys
+import json
+import random
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.estimator.inventory import iter_json_items
+
+
+def export(count: int, seed: int = 0) -> dict:
+    # Relic export keyed by id, with nested objects, lists, numbers and non-ASCII text
+    rng = random.Random(seed)
+    return {
+        f"relic_{i:04d}": {
+            "set": rng.choice(["Musketeer of Wild Wheat", "Genius of Brilliant Stars", "Космос"]),
+            "slot": rng.choice(["head", "hands", "body", "feet"]),
+            "level": rng.randint(0, 15),
+            "main": {"atk%": round(rng.uniform(5, 45), 1)},
+            "sub": [{"name": name, "value": f"{rng.uniform(1, 10):.1f}%"} for name in ("crit_rate", "spd")],
+            "locked": rng.random() < 0.5,
+            "note": None
+        }
+        for i in range(count)
+    }
+
+
+@pytest.mark.parametrize("top", ["object", "array"])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 13, 64, 97, 4096, 4099])
+def test_streamed_items_match_json_load(tmp_path, top, chunk_size):
+    data = export(60)
+    if top == "array":
+        data = list(data.values())
+    path = tmp_path / "export.json"
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("﻿\n\n    ")
+        json.dump(data, f, indent=4, ensure_ascii=False)
+
+    items = list(iter_json_items(str(path), chunk_size=chunk_size))
+
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        expected = json.load(f)
+    if top == "object":
+        assert items == list(expected.items())
+    else:
+        assert items == list(enumerate(expected))
+
+
+def test_every_chunk_boundary_of_an_indented_object(tmp_path):
+    path = tmp_path / "export.json"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(export(3), f, indent=4, ensure_ascii=False)
+    with open(path, 'r', encoding='utf-8') as f:
+        expected = list(json.load(f).items())
+
+    for chunk_size in range(1, os.path.getsize(path) + 2):
+        assert list(iter_json_items(str(path), chunk_size=chunk_size)) == expected
+
+
+def test_truncated_file_raises(tmp_path):
+    path = tmp_path / "export.json"
+    text = json.dumps(export(5), indent=4)
+    path.write_text(text[:len(text) // 2], encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iter_json_items(str(path), chunk_size=16))
@@ -0,0 +1,28 @@
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.match import NameIndex
+
+
+WORDS = ["night", "milky", "way", "in", "the", "cruising", "stellar", "sea", "good", "sleep", "well",
+         "before", "dawn", "echoes", "of", "coffin", "post", "op", "conversation"]
+
+
+def test_match_many_matches_match():
+    rng = random.Random(0)
+    names = ["_".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))) for _ in range(500)]
+    queries = [name[:rng.randint(3, len(name))] + rng.choice(["", "x", "_ab"]) for name in rng.sample(names, 300)]
+    queries += ["zzzz", "", "Night On The Milky Way!", names[0].upper(), f"images/{names[1]}.png"]
+    index = NameIndex(names, max_candidates=5)
+    assert index.match_many(queries) == [index.match(query) for query in queries]
+
+
+def test_match_many_edge_cases():
+    assert NameIndex(["night_on_the_milky_way"]).match_many([]) == []
+    matches = NameIndex([]).match_many(["in_the_night"])
+    assert matches[0].key is None and matches[0].score == 0.0
+    match, = NameIndex(["in_the_night", "in_the_nights"]).match_many(["In the Night"])
+    assert match.key == "in_the_night" and match.score == 1.0
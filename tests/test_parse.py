@@ -0,0 +1,66 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.bench_parse import LOOKUPS
+from benchmark.bench_scrapers import SCRAPERS, URLS
+from benchmark.page_server import PageServer
+from src import crawl
+from src.utils.fetch import Fetcher
+from src.utils.parse import available_backends, make_soup
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGES = os.path.join(FIXTURES, "pages")
+
+
+def page(key: str) -> bytes:
+    with open(os.path.join(PAGES, f"{key}.html"), 'rb') as f:
+        return f.read()
+
+
+def found(result) -> str:
+    # What a lookup found, comparable between trees
+    return "".join(map(str, result)) if isinstance(result, list) else str(result)
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("key", list(crawl.STRAINERS))
+def test_strained_lookup_matches_full(key, backend):
+    content = page(key)
+    full = LOOKUPS[key](make_soup(content, None, backend))
+    strained = LOOKUPS[key](make_soup(content, crawl.STRAINERS[key], backend))
+    assert full and found(strained) == found(full)
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_character_info_strained(backend):
+    url = "https://www.prydwen.gg/star-rail/characters/kafka"
+    content = page("character_info")
+    full = crawl.parse_character_info(make_soup(content, None, backend), url)
+    strained = crawl.parse_character_info(make_soup(content, crawl.STRAINERS["character_info"], backend), url)
+    assert strained == full
+    assert set(full) == {"name", "image", "rate", "element", "path", "sub_stat", "basic_stat"}
+
+
+@pytest.mark.parametrize("strained", [False, True])
+@pytest.mark.parametrize("backend", available_backends())
+def test_scrapers_output(monkeypatch, tmp_path, backend, strained):
+    # Every scraper gives the same JSON with any backend, strained or not
+    monkeypatch.setattr(crawl, "PARSER", backend)
+    if not strained:
+        for key in crawl.STRAINERS:
+            monkeypatch.setitem(crawl.STRAINERS, key, None)
+    with PageServer(PAGES) as server:
+        urls = {name: server.local_url(url) for name, url in URLS.items()}
+        for name, (scrape, _) in SCRAPERS.items():
+            save_path = str(tmp_path / f"{name}.json")
+            scrape(Fetcher(), save_path, urls)
+            with open(save_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with open(os.path.join(FIXTURES, "expected", f"{name}.json"), 'r', encoding='utf-8') as f:
+                assert data == json.load(f), name
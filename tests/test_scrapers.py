@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.bench_scrapers import SCRAPERS, URLS
+from benchmark.page_server import PageServer
+from src import crawl
+from src.utils.fetch import CacheMiss, Fetcher
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGES = os.path.join(FIXTURES, "pages")
+
+
+def expected(name: str) -> dict:
+    with open(os.path.join(FIXTURES, "expected", f"{name}.json"), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def scrape(name: str, fetcher: Fetcher, save_path: str, urls: dict):
+    scraper, _ = SCRAPERS[name]
+    changes = scraper(fetcher, save_path, urls)
+    with open(save_path, 'r', encoding='utf-8') as f:
+        return json.load(f), changes
+
+
+@pytest.fixture(scope="module")
+def recorded(tmp_path_factory):
+    # Records every page from the local server into a Fetcher cache, then stops
+    # the server: the tests below replay the cache without any network
+    cache_dir = str(tmp_path_factory.mktemp("cache"))
+    out_dir = tmp_path_factory.mktemp("recorded")
+    outputs = dict()
+    with PageServer(PAGES) as server:
+        urls = {name: server.local_url(url) for name, url in URLS.items()}
+        with Fetcher(cache_dir=cache_dir) as fetcher:
+            for name in SCRAPERS:
+                outputs[name], _ = scrape(name, fetcher, str(out_dir / f"{name}.json"), urls)
+    return cache_dir, urls, outputs
+
+
+@pytest.mark.parametrize("name", list(SCRAPERS))
+def test_recorded_output(recorded, name):
+    _, _, outputs = recorded
+    assert outputs[name] == expected(name)
+    _, check = SCRAPERS[name]
+    assert check(outputs[name], min_items=2) == []
+
+
+@pytest.mark.parametrize("name", list(SCRAPERS))
+def test_offline_replay(recorded, tmp_path, name):
+    cache_dir, urls, _ = recorded
+    index_path = os.path.join(cache_dir, "index.json")
+    with open(index_path, 'rb') as f:
+        index = f.read()
+
+    fetcher = Fetcher(cache_dir=cache_dir, offline=True)
+    data, _ = scrape(name, fetcher, str(tmp_path / f"{name}.json"), urls)
+    fetcher.close()
+    assert data == expected(name)
+    assert fetcher.stats["requests"] == 0 and fetcher.stats["cache_hits"] > 0
+    # Replaying never rewrites the cache index
+    with open(index_path, 'rb') as f:
+        assert f.read() == index
+
+
+@pytest.mark.parametrize("name", ["relic_sets", "lightcones", "characters"])
+def test_rerun_reports_no_changes(recorded, tmp_path, name):
+    cache_dir, urls, _ = recorded
+    save_path = str(tmp_path / f"{name}.json")
+    fetcher = Fetcher(cache_dir=cache_dir, offline=True)
+    _, first = scrape(name, fetcher, save_path, urls)
+    data, second = scrape(name, fetcher, save_path, urls)
+    assert sorted(first["added"]) == sorted(expected(name))
+    assert second == {"added": [], "changed": [], "removed": []}
+    assert data == expected(name)
+
+
+def test_offline_cache_miss(recorded):
+    cache_dir, _, _ = recorded
+    with pytest.raises(CacheMiss):
+        Fetcher(cache_dir=cache_dir, offline=True).get("http://127.0.0.1:1/not-recorded")
+
+
+def test_revalidation(tmp_path):
+    with PageServer(PAGES) as server:
+        url = server.local_url(URLS["relic_sets"])
+        with Fetcher(cache_dir=str(tmp_path)) as fetcher:
+            first = fetcher.get(url)
+            assert fetcher.get(url) == first
+        assert fetcher.stats["requests"] == 2 and fetcher.stats["not_modified"] == 1
+        assert server.stats["not_modified"] == 1
+
+
+def test_characters_concurrent_order(tmp_path):
+    # Character pages are fetched concurrently, the output keeps the list order
+    with PageServer(PAGES) as server:
+        save_path = str(tmp_path / "characters.json")
+        crawl.scrape_characters(server.local_url(URLS["characters"]), save_path, max_workers=4, rate_limit=100)
+        assert server.stats["requests"] == 3
+    with open(save_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    assert list(data) == ["kafka", "asta"]
+    assert data == expected("characters")
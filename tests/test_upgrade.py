@@ -0,0 +1,30 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.synthetic import vocabulary, random_characters, random_new_relics
+from src.estimator.scoring import RelicScorer
+from src.estimator.upgrade import UpgradeEstimator, remaining_upgrades
+
+
+def test_remaining_upgrades():
+    levels = np.arange(16)
+    assert remaining_upgrades(levels).tolist() == [5, 5, 5, 4, 4, 4, 3, 3, 3, 2, 2, 2, 1, 1, 1, 0]
+
+
+def test_levels_between_upgrades_estimate_alike():
+    vocab = vocabulary()
+    estimator = UpgradeEstimator(vocab, RelicScorer(vocab, random_characters(2)).weights[0])
+    relics = random_new_relics(vocab, 20, seed=3)
+    estimates = dict()
+    for level in range(16):
+        relics["level"] = np.full(20, level, dtype=np.int8)
+        estimates[level] = estimator.estimate(relics)["expected"]
+    for level in range(16):
+        start = level // 3 * 3
+        np.testing.assert_array_equal(estimates[level], estimates[start])
+    assert np.all(estimates[0] > estimates[3])
+    np.testing.assert_allclose(estimates[15], estimator.current(relics["sub"], relics["sub_value"]))